@@ -6,11 +6,18 @@ import psutil
 import math
 import urllib.request
 
-import integrationtest.data_file_checks as data_file_checks
-import integrationtest.log_file_checks as log_file_checks
+import daqsystemtest.log_scanner as log_scanner
 import integrationtest.data_classes as data_classes
+import daqsystemtest.data_file_validation as data_file_validation
+import daqsystemtest.integtest_scheduler as integtest_scheduler
 
-pytest_plugins = "integrationtest.integrationtest_drunc"
+pytest_plugins = [
+    "integrationtest.integrationtest_drunc",
+    "daqsystemtest.live_log_monitor",
+    "daqsystemtest.config_cache",
+    "daqsystemtest.performance_gate",
+    "daqsystemtest.queue_monitor",
+]
 
 # Values that help determine the running conditions
 number_of_data_producers = 3
@@ -112,6 +119,7 @@ conf_dict.dro_map_config.n_streams = number_of_data_producers
 conf_dict.dro_map_config.n_apps = number_of_readout_apps
 conf_dict.op_env = "integtest"
 conf_dict.session = "3ru1df"
+conf_dict.config_substitutions += integtest_scheduler.session_isolation_substitutions()
 conf_dict.tpg_enabled = False
 
 conf_dict.config_substitutions.append(
@@ -202,7 +210,7 @@ def test_log_files(run_nanorc):
 
     if check_for_logfile_errors:
         # Check that there are no warnings or errors in the log files
-        assert log_file_checks.logs_are_error_free(
+        assert log_scanner.logs_are_error_free(
             run_nanorc.log_files, True, True, ignored_logfile_problems
         )
 
@@ -253,17 +261,11 @@ def test_data_files(run_nanorc):
     # Run some tests on the output data file
     assert len(run_nanorc.data_files) == expected_number_of_data_files
 
-    for idx in range(len(run_nanorc.data_files)):
-        data_file = data_file_checks.DataFile(run_nanorc.data_files[idx])
-        assert data_file_checks.sanity_check(data_file)
-        assert data_file_checks.check_file_attributes(data_file)
-        assert data_file_checks.check_event_count(
-            data_file, local_expected_event_count, local_event_count_tolerance
-        )
-        for jdx in range(len(fragment_check_list)):
-            assert data_file_checks.check_fragment_count(
-                data_file, fragment_check_list[jdx]
-            )
-            assert data_file_checks.check_fragment_sizes(
-                data_file, fragment_check_list[jdx]
-            )
+    validations = data_file_validation.validate_data_files(
+        run_nanorc.data_files,
+        local_expected_event_count,
+        local_event_count_tolerance,
+        fragment_check_list,
+    )
+    for validation in validations:
+        assert validation.passed
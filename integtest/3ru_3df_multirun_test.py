@@ -5,11 +5,19 @@ import copy
 import math
 import urllib.request
 
-import integrationtest.data_file_checks as data_file_checks
-import integrationtest.log_file_checks as log_file_checks
+import daqsystemtest.log_scanner as log_scanner
 import integrationtest.data_classes as data_classes
+import daqsystemtest.data_file_validation as data_file_validation
+import daqsystemtest.dfo_balance as dfo_balance
+import daqsystemtest.integtest_scheduler as integtest_scheduler
 
-pytest_plugins = "integrationtest.integrationtest_drunc"
+pytest_plugins = [
+    "integrationtest.integrationtest_drunc",
+    "daqsystemtest.live_log_monitor",
+    "daqsystemtest.config_cache",
+    "daqsystemtest.performance_gate",
+    "daqsystemtest.queue_monitor",
+]
 
 # Values that help determine the running conditions
 number_of_data_producers = 2
@@ -19,6 +27,8 @@ trigger_rate = 3.0  # Hz
 run_duration = 20  # seconds
 data_rate_slowdown_factor = 1
 ta_prescale = 100
+dfo_busy_threshold = 2  # as in dfoconf-01
+dfo_free_threshold = 1
 
 # Default values for validation parameters
 expected_number_of_data_files = 3 * number_of_dataflow_apps
@@ -97,6 +107,7 @@ conf_dict.dro_map_config.n_streams = number_of_data_producers
 conf_dict.dro_map_config.n_apps = number_of_readout_apps
 conf_dict.op_env = "integtest"
 conf_dict.session = "3ru3df"
+conf_dict.config_substitutions += integtest_scheduler.session_isolation_substitutions()
 conf_dict.tpg_enabled = False
 conf_dict.n_df_apps = number_of_dataflow_apps
 
@@ -174,7 +185,7 @@ def test_nanorc_success(run_nanorc):
 def test_log_files(run_nanorc):
     if check_for_logfile_errors:
         # Check that there are no warnings or errors in the log files
-        assert log_file_checks.logs_are_error_free(
+        assert log_scanner.logs_are_error_free(
             run_nanorc.log_files, True, True, ignored_logfile_problems
         )
 
@@ -217,17 +228,34 @@ def test_data_files(run_nanorc):
         or len(run_nanorc.data_files) == low_number_of_files
     )
 
-    for idx in range(len(run_nanorc.data_files)):
-        data_file = data_file_checks.DataFile(run_nanorc.data_files[idx])
-        assert data_file_checks.sanity_check(data_file)
-        assert data_file_checks.check_file_attributes(data_file)
-        assert data_file_checks.check_event_count(
-            data_file, local_expected_event_count, local_event_count_tolerance
-        )
-        for jdx in range(len(fragment_check_list)):
-            assert data_file_checks.check_fragment_count(
-                data_file, fragment_check_list[jdx]
-            )
-            assert data_file_checks.check_fragment_sizes(
-                data_file, fragment_check_list[jdx]
-            )
+    validations = data_file_validation.validate_data_files(
+        run_nanorc.data_files,
+        local_expected_event_count,
+        local_event_count_tolerance,
+        fragment_check_list,
+    )
+    for validation in validations:
+        assert validation.passed
+
+
+def test_dfo_balance(run_nanorc):
+    # Report how evenly the DFO spread the trigger decisions over the dataflow apps;
+    # the record counts in test_data_files are what enforces it, this checks that the
+    # report is based on what the DFO and the trigger published
+    balance = dfo_balance.dataflow_app_balance(
+        run_nanorc.data_files,
+        run_nanorc.opmon_files,
+        dfo_busy_threshold,
+        dfo_free_threshold,
+    )
+    print("")
+    print("DFO load balancing:")
+    for line in dfo_balance.format_balance(balance, dfo_balance.inhibited_seconds(run_nanorc.opmon_files)):
+        print(line)
+    missing_fields = dfo_balance.missing_opmon_fields(run_nanorc.opmon_files)
+    assert not missing_fields, f"\N{POLICE CARS REVOLVING LIGHT} OpMon fields not published: {', '.join(missing_fields)} \N{POLICE CARS REVOLVING LIGHT}"
+    assert len(balance) == number_of_dataflow_apps
+    for app, app_balance in balance.items():
+        assert app_balance["decisions"] > 0, f"{app} wrote no trigger records"
+        assert app_balance["max_outstanding"] is not None, f"the DFO published no outstanding decisions of {app}"
+        assert app_balance["token_round_trip_max_ms"] is not None, f"the DFO published no completion times of {app}"
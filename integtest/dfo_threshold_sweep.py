@@ -0,0 +1,111 @@
+import pytest
+
+import integrationtest.data_classes as data_classes
+import daqsystemtest.benchmark as benchmark
+import daqsystemtest.dfo_balance as dfo_balance
+import daqsystemtest.integtest_scheduler as integtest_scheduler
+import daqsystemtest.queue_monitor as queue_monitor
+import daqsystemtest.scale_out as scale_out
+
+pytest_plugins = [
+    "integrationtest.integrationtest_drunc",
+    "daqsystemtest.live_log_monitor",
+    "daqsystemtest.config_cache",
+    "daqsystemtest.performance_gate",
+    "daqsystemtest.queue_monitor",
+]
+
+# Values that help determine the running conditions
+# the 3ru_3df_multirun_test topology, at a trigger rate that keeps the dataflow apps busy
+topology = scale_out.Topology(3, 2, 3)
+trigger_rate = 20.0  # Hz
+run_duration = 30  # seconds
+data_rate_slowdown_factor = 1
+minimum_cpu_count = 20
+minimum_free_memory_gb = 24
+
+# (busy_threshold, free_threshold) pairs of dfoconf-01 to sweep; (2, 1) is the default
+threshold_pairs = dfo_balance.default_threshold_pairs
+
+check_for_logfile_errors = False  # low thresholds are expected to inhibit the trigger
+live_log_action = "off"
+
+# The next three variable declarations *must* be present as globals in the test
+# file. They're read by the "fixtures" in conftest.py to determine how
+# to run the config generation and nanorc
+
+object_databases = ["config/daqsystemtest/integrationtest-objects.data.xml"]
+
+conf_dict = data_classes.drunc_config()
+conf_dict.op_env = "integtest"
+conf_dict.session = "dfosweep"
+conf_dict.config_substitutions += integtest_scheduler.session_isolation_substitutions()
+conf_dict.config_substitutions += queue_monitor.queue_monitoring_substitutions()
+conf_dict.tpg_enabled = False
+
+conf_dict.config_substitutions.append(
+    data_classes.config_substitution(
+        obj_id=conf_dict.session,
+        obj_class="Session",
+        updates={"data_rate_slowdown_factor": data_rate_slowdown_factor},
+    )
+)
+conf_dict.config_substitutions.append(
+    data_classes.config_substitution(
+        obj_class="RandomTCMakerConf",
+        updates={"trigger_rate_hz": trigger_rate},
+    )
+)
+conf_dict = topology.configure(conf_dict)
+
+# The results of every threshold pair, printed when the module's tests have finished
+scan = benchmark.Scan(
+    __file__,
+    dfo_balance.threshold_parameters(threshold_pairs),
+    f"DFO threshold sweep with {topology.name} at {trigger_rate} Hz:",
+    dfo_balance.format_results,
+)
+confgen_arguments = scan.confgen_arguments(conf_dict, dfo_balance.substitutions)
+sweep_summary = scan.summary
+
+# The commands to run in nanorc, as a list
+nanorc_command_list = (
+    "boot conf start 101 wait 5 enable-triggers wait ".split()
+    + [str(run_duration)]
+    + "disable-triggers wait 2 drain-dataflow wait 2 stop-trigger-sources stop scrap terminate".split()
+)
+
+
+# The tests themselves
+
+
+def test_nanorc_success(run_nanorc):
+    # Check that nanorc completed correctly
+    assert run_nanorc.completed_process.returncode == 0
+
+
+def test_threshold_point(run_nanorc):
+    parameters = scan.parameters()
+
+    run_metrics = benchmark.measure_run(run_nanorc.data_files, run_duration)
+    balance = dfo_balance.dataflow_app_balance(
+        run_nanorc.data_files,
+        run_nanorc.opmon_files,
+        parameters["busy_threshold"],
+        parameters["free_threshold"],
+    )
+    inhibited = dfo_balance.inhibited_seconds(run_nanorc.opmon_files)
+    print("")
+    for line in dfo_balance.format_balance(balance, inhibited):
+        print(line)
+
+    result = {
+        **parameters,
+        "records_per_second": run_metrics["sustained_trigger_rate_hz"],
+        "fairness": dfo_balance.fairness(app_balance["decisions"] for app_balance in balance.values()),
+        "inhibited_seconds": inhibited,
+        "dataflow_apps": balance,
+    }
+    scan.record(result)
+    assert run_metrics["record_count"] > 0
+    assert not dfo_balance.missing_opmon_fields(run_nanorc.opmon_files)
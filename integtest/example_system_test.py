@@ -2,11 +2,18 @@ import pytest
 import os
 import copy
 
-import integrationtest.data_file_checks as data_file_checks
-import integrationtest.log_file_checks as log_file_checks
+import daqsystemtest.log_scanner as log_scanner
 import integrationtest.data_classes as data_classes
+import daqsystemtest.data_file_validation as data_file_validation
+import daqsystemtest.integtest_scheduler as integtest_scheduler
 
-pytest_plugins = "integrationtest.integrationtest_drunc"
+pytest_plugins = [
+    "integrationtest.integrationtest_drunc",
+    "daqsystemtest.live_log_monitor",
+    "daqsystemtest.config_cache",
+    "daqsystemtest.performance_gate",
+    "daqsystemtest.queue_monitor",
+]
 
 # Values that help determine the running conditions
 run_duration = 20  # seconds
@@ -71,6 +78,9 @@ common_config_obj.op_env = "test"
 common_config_obj.config_db = (
     os.path.dirname(__file__) + "/../config/daqsystemtest/example-configs.data.xml"
 )
+common_config_obj.config_substitutions += (
+    integtest_scheduler.session_isolation_substitutions()
+)
 
 onebyone_local_conf = copy.deepcopy(common_config_obj)
 onebyone_local_conf.session = "local-1x1-config"
@@ -145,7 +155,7 @@ def test_log_files(run_nanorc):
 
     if check_for_logfile_errors:
         # Check that there are no warnings or errors in the log files
-        assert log_file_checks.logs_are_error_free(
+        assert log_scanner.logs_are_error_free(
             run_nanorc.log_files, True, True, ignored_logfile_problems
         )
 
@@ -204,19 +214,12 @@ def test_data_files(run_nanorc):
 
     all_ok = True
 
-    for idx in range(len(run_nanorc.data_files)):
-        data_file = data_file_checks.DataFile(run_nanorc.data_files[idx])
-        all_ok &= data_file_checks.sanity_check(data_file)
-        all_ok &= data_file_checks.check_file_attributes(data_file)
-        all_ok &= data_file_checks.check_event_count(
-            data_file, local_expected_event_count, local_event_count_tolerance
-        )
-        for jdx in range(len(fragment_check_list)):
-            all_ok &= data_file_checks.check_fragment_count(
-                data_file, fragment_check_list[jdx]
-            )
-            all_ok &= data_file_checks.check_fragment_sizes(
-                data_file, fragment_check_list[jdx]
-            )
+    validations = data_file_validation.validate_data_files(
+        run_nanorc.data_files,
+        local_expected_event_count,
+        local_event_count_tolerance,
+        fragment_check_list,
+    )
+    all_ok &= all(validation.passed for validation in validations)
 
     assert all_ok
@@ -0,0 +1,140 @@
+import pytest
+import functools
+import math
+import xml.etree.ElementTree as ET
+
+import integrationtest.data_classes as data_classes
+import daqsystemtest.benchmark as benchmark
+import daqsystemtest.data_file_validation as data_file_validation
+import daqsystemtest.integtest_scheduler as integtest_scheduler
+import daqsystemtest.latency_buffer_scan as latency_buffer_scan
+import daqsystemtest.oks_snapshot as oks_snapshot
+
+pytest_plugins = [
+    "integrationtest.integrationtest_drunc",
+    "daqsystemtest.live_log_monitor",
+    "daqsystemtest.config_cache",
+    "daqsystemtest.performance_gate",
+    "daqsystemtest.queue_monitor",
+    "daqsystemtest.process_monitor",
+]
+
+# Values that help determine the running conditions
+number_of_data_producers = 2
+run_duration = 20  # seconds
+readout_window_time_before = 1000000  # ticks, about 16 ms
+readout_window_time_after = 1000
+ticks_per_wibeth_frame = 2048
+wibeth_frame_size = 7200  # bytes
+
+# LatencyBuffer sizes (in frames) to scan, each with every allocation mode in latency_buffer_scan.allocation_modes;
+# the default size of def-latency-buf is added to the list
+latency_buffer_sizes = [250, 1000, 4000, 16000]
+try:
+    default_latency_buffer = oks_snapshot.default_snapshot().get("LatencyBuffer", latency_buffer_scan.latency_buffer_id)
+except (OSError, ET.ParseError):  # the OKS databases can't be read from here
+    default_latency_buffer = None
+default_latency_buffer_size = (
+    int(default_latency_buffer.attributes["size"]) if default_latency_buffer is not None else 139008
+)
+latency_buffer_sizes.append(default_latency_buffer_size)
+
+# Default values for validation parameters
+expected_number_of_data_files = 1
+check_for_logfile_errors = False  # the small buffers are expected to produce request-handler warnings
+live_log_action = "off"
+expected_event_count = run_duration
+expected_event_count_tolerance = 2
+minimum_free_memory_gb = 8  # the default-sized buffers hold about 1 GB per data producer
+
+frames_per_window = (readout_window_time_before + readout_window_time_after) / ticks_per_wibeth_frame
+wibeth_frag_params = {
+    "fragment_type_description": "WIBEth",
+    "fragment_type": "WIBEth",
+    "hdf5_source_subsystem": "Detector_Readout",
+    "expected_fragment_count": number_of_data_producers,
+    "min_size_bytes": 72 + wibeth_frame_size * (math.floor(frames_per_window) - 1),
+    "max_size_bytes": 72 + wibeth_frame_size * (math.ceil(frames_per_window) + 2),
+}
+triggercandidate_frag_params = {
+    "fragment_type_description": "Trigger Candidate",
+    "fragment_type": "Trigger_Candidate",
+    "hdf5_source_subsystem": "Trigger",
+    "expected_fragment_count": 1,
+    "min_size_bytes": 72,
+    "max_size_bytes": 216,
+}
+
+# The next three variable declarations *must* be present as globals in the test
+# file. They're read by the "fixtures" in conftest.py to determine how
+# to run the config generation and nanorc
+
+object_databases = ["config/daqsystemtest/integrationtest-objects.data.xml"]
+
+conf_dict = data_classes.drunc_config()
+conf_dict.dro_map_config.n_streams = number_of_data_producers
+conf_dict.op_env = "integtest"
+conf_dict.session = "lbscan"
+conf_dict.config_substitutions += integtest_scheduler.session_isolation_substitutions()
+conf_dict.tpg_enabled = False
+conf_dict.frame_file = "asset://?label=WIBEth&subsystem=readout"
+
+conf_dict.config_substitutions.append(
+    data_classes.config_substitution(
+        obj_class="RandomTCMakerConf",
+        updates={"trigger_rate_hz": 1},
+    )
+)
+conf_dict.config_substitutions.append(
+    data_classes.config_substitution(
+        obj_class="TCReadoutMap",
+        obj_id="def-random-readout",
+        updates={
+            "time_before": readout_window_time_before,
+            "time_after": readout_window_time_after,
+        },
+    )
+)
+
+# The results of every scan point are printed when the module's tests have finished
+scan = benchmark.Scan(
+    __file__,
+    latency_buffer_scan.scan_parameters(latency_buffer_sizes),
+    f"LatencyBuffer scan with a readout window of {readout_window_time_before + readout_window_time_after} ticks:",
+    functools.partial(latency_buffer_scan.format_results, default_size=default_latency_buffer_size),
+)
+confgen_arguments = scan.confgen_arguments(conf_dict, latency_buffer_scan.substitutions)
+scan_summary = scan.summary
+
+# The commands to run in nanorc, as a list
+nanorc_command_list = (
+    "boot conf start 101 wait 1 enable-triggers wait ".split()
+    + [str(run_duration)]
+    + "disable-triggers wait 2 drain-dataflow wait 2 stop-trigger-sources stop scrap terminate".split()
+)
+
+
+# The tests themselves
+
+
+def test_nanorc_success(run_nanorc):
+    # Check that nanorc completed correctly
+    assert run_nanorc.completed_process.returncode == 0
+
+
+def test_latency_buffer_point(run_nanorc):
+    parameters = scan.parameters()
+
+    # not asserted: a buffer that is too small for the readout window is a result of the scan, not a failure
+    data_files_passed = len(run_nanorc.data_files) == expected_number_of_data_files
+    validations = data_file_validation.validate_data_files(
+        run_nanorc.data_files,
+        expected_event_count,
+        expected_event_count_tolerance,
+        [triggercandidate_frag_params, wibeth_frag_params],
+    )
+    data_files_passed &= all(validation.passed for validation in validations)
+
+    result = latency_buffer_scan.point_result(parameters, run_nanorc, data_files_passed)
+    scan.record(result)
+    assert getattr(run_nanorc, "process_statistics", None), "no readout processes were sampled"
@@ -5,16 +5,27 @@ import copy
 import shutil
 import psutil
 
-import integrationtest.data_file_checks as data_file_checks
-import integrationtest.log_file_checks as log_file_checks
+import daqsystemtest.log_scanner as log_scanner
 import integrationtest.data_classes as data_classes
-
-pytest_plugins = "integrationtest.integrationtest_drunc"
+import daqsystemtest.data_file_validation as data_file_validation
+import daqsystemtest.data_file_index as data_file_index
+import daqsystemtest.integtest_scheduler as integtest_scheduler
+import daqsystemtest.disk_planner as disk_planner
+
+pytest_plugins = [
+    "integrationtest.integrationtest_drunc",
+    "daqsystemtest.live_log_monitor",
+    "daqsystemtest.config_cache",
+    "daqsystemtest.performance_gate",
+    "daqsystemtest.queue_monitor",
+    "daqsystemtest.disk_planner",
+]
 
 # Values that help determine the running conditions
 output_path_parameter = "."
 number_of_data_producers = 4
 run_duration = 40  # seconds
+number_of_runs = 2
 number_of_readout_apps = 3
 number_of_dataflow_apps = 1
 trigger_rate = 0.05  # Hz
@@ -23,15 +34,18 @@ readout_window_time_before = 100000000  # 1.616 second is the intention for b+a
 readout_window_time_after = 1000000
 trigger_record_max_window = 500000  # intention is 8 msec
 latency_buffer_size = 600000
+max_file_size = 4 * 1024 * 1024 * 1024
 data_rate_slowdown_factor = 1
 minimum_cpu_count = 24
 minimum_free_memory_gb = 52
-minimum_total_disk_space_gb = 32  # double what we need
-minimum_free_disk_space_gb = 24  # 50% more than what we need
+# validate and delete each data file as soon as it is closed, instead of keeping the whole output until test_cleanup
+rolling_output_pruning = True
+minimum_free_disk_space_gb = 13  # for the scheduler; the disk check below computes the need from the run parameters
 
 # Default values for validation parameters
 expected_number_of_data_files = 4 * number_of_dataflow_apps
 check_for_logfile_errors = True
+live_log_action = "abort"  # stop the session at the first unexpected log problem instead of finishing two long runs
 expected_event_count = 202
 expected_event_count_tolerance = 9
 
@@ -65,6 +79,24 @@ ignored_logfile_problems = {
 }
 
 # Determine if the conditions are right for these tests
+total_data_bytes = disk_planner.expected_data_bytes(
+    trigger_rate,
+    run_duration,
+    readout_window_time_before + readout_window_time_after,
+    number_of_data_producers * number_of_readout_apps,
+    number_of_runs,
+)
+if rolling_output_pruning:
+    needed_data_bytes = disk_planner.rolling_data_bytes(
+        max_file_size,
+        number_of_dataflow_apps,
+        disk_planner.record_data_bytes(trigger_record_max_window, number_of_data_producers * number_of_readout_apps),
+        total_data_bytes,
+    )
+else:
+    needed_data_bytes = total_data_bytes
+required_free_disk_space_gb = disk_planner.required_disk_space_gb(needed_data_bytes)
+
 sufficient_disk_space = True
 actual_output_path = output_path_parameter
 if output_path_parameter == ".":
@@ -73,12 +105,10 @@ disk_space = shutil.disk_usage(actual_output_path)
 total_disk_space_gb = disk_space.total / (1024 * 1024 * 1024)
 free_disk_space_gb = disk_space.free / (1024 * 1024 * 1024)
 print(
-    f"DEBUG: Space on disk for output path {actual_output_path}: total = {total_disk_space_gb} GB and free = {free_disk_space_gb} GB."
+    f"DEBUG: Space on disk for output path {actual_output_path}: total = {total_disk_space_gb} GB and free = {free_disk_space_gb} GB; "
+    f"the runs write {total_data_bytes / (1024 * 1024 * 1024):.1f} GB and need {required_free_disk_space_gb:.1f} GB free."
 )
-if (
-    total_disk_space_gb < minimum_total_disk_space_gb
-    or free_disk_space_gb < minimum_free_disk_space_gb
-):
+if free_disk_space_gb < required_free_disk_space_gb:
     sufficient_disk_space = False
 sufficient_resources_on_this_computer = True
 cpu_count = os.cpu_count()
@@ -103,6 +133,7 @@ conf_dict.dro_map_config.n_streams = number_of_data_producers
 conf_dict.dro_map_config.n_apps = number_of_readout_apps
 conf_dict.op_env = "integtest"
 conf_dict.session = "longwindow"
+conf_dict.config_substitutions += integtest_scheduler.session_isolation_substitutions()
 conf_dict.tpg_enabled = False
 conf_dict.n_df_apps = number_of_dataflow_apps
 conf_dict.fake_hsi_enabled = False
@@ -141,7 +172,7 @@ conf_dict.config_substitutions.append(
     data_classes.config_substitution(
         obj_class="DataStoreConf",
         obj_id="default",
-        updates={"max_file_size": 4 * 1024 * 1024 * 1024},
+        updates={"max_file_size": max_file_size},
     )
 )
 
@@ -181,6 +212,17 @@ else:
 # The tests themselves
 
 
+def validate_closed_data_file(file_name):
+    # called by disk_planner for each data file that the dataflow app has closed, while the run continues
+    return data_file_validation.validate_data_file(
+        file_name,
+        expected_event_count,
+        expected_event_count_tolerance,
+        [triggercandidate_frag_params, wibeth_frag_params],
+        print_report=False,
+    )
+
+
 def test_nanorc_success(run_nanorc):
     if not sufficient_resources_on_this_computer:
         pytest.skip(
@@ -215,7 +257,7 @@ def test_log_files(run_nanorc):
 
     if check_for_logfile_errors:
         # Check that there are no warnings or errors in the log files
-        assert log_file_checks.logs_are_error_free(
+        assert log_scanner.logs_are_error_free(
             run_nanorc.log_files, True, True, ignored_logfile_problems
         )
 
@@ -243,7 +285,7 @@ def test_data_files(run_nanorc):
             f"    (Free and total space are {free_disk_space_gb} GB and {total_disk_space_gb} GB.)"
         )
         print(
-            f"    (Minimums are {minimum_free_disk_space_gb} GB and {minimum_total_disk_space_gb} GB.)"
+            f"    (The test needs {required_free_disk_space_gb:.1f} GB free.)"
         )
         pytest.skip(
             f"The raw data output path ({actual_output_path}) does not have enough space to run this test."
@@ -255,23 +297,29 @@ def test_data_files(run_nanorc):
     fragment_check_list.append(wibeth_frag_params)  # WIBEth
 
     all_ok = True
-    # Run some tests on the output data file
-    all_ok &= len(run_nanorc.data_files) == expected_number_of_data_files
-
-    for idx in range(len(run_nanorc.data_files)):
-        data_file = data_file_checks.DataFile(run_nanorc.data_files[idx])
-        all_ok &= data_file_checks.sanity_check(data_file)
-        all_ok &= data_file_checks.check_file_attributes(data_file)
-        all_ok &= data_file_checks.check_event_count(
-            data_file, local_expected_event_count, local_event_count_tolerance
+    if rolling_output_pruning:
+        # the files were validated (and the ones that passed deleted) while the runs went on
+        validations = run_nanorc.pruned_data_files
+        all_ok &= len(validations) == expected_number_of_data_files
+        for file_name, error in run_nanorc.pruning_errors.items():
+            print(f"\N{POLICE CARS REVOLVING LIGHT} The validation of {file_name} raised an exception: {error}")
+        all_ok &= not run_nanorc.pruning_errors
+        # every output file that is left must have been validated (the ones that failed are kept)
+        unvalidated = disk_planner.unvalidated_data_files(run_nanorc.data_files, validations)
+        for data_file in unvalidated:
+            print(f"\N{POLICE CARS REVOLVING LIGHT} {data_file} was not validated by the rolling pruning")
+        all_ok &= not unvalidated
+    else:
+        # Run some tests on the output data file
+        all_ok &= len(run_nanorc.data_files) == expected_number_of_data_files
+
+        validations = data_file_validation.validate_data_files(
+            run_nanorc.data_files,
+            local_expected_event_count,
+            local_event_count_tolerance,
+            fragment_check_list,
         )
-        for jdx in range(len(fragment_check_list)):
-            all_ok &= data_file_checks.check_fragment_count(
-                data_file, fragment_check_list[jdx]
-            )
-            all_ok &= data_file_checks.check_fragment_sizes(
-                data_file, fragment_check_list[jdx]
-            )
+    all_ok &= all(validation.passed for validation in validations)
     assert all_ok, "\N{POLICE CARS REVOLVING LIGHT} One or more data file checks failed! \N{POLICE CARS REVOLVING LIGHT}"
 
 
@@ -281,9 +329,11 @@ def test_cleanup(run_nanorc):
             f"The raw data output path ({actual_output_path}) does not have enough space to run this test."
         )
 
+    # with rolling_output_pruning, only the files that failed their validation are left
+    remaining_data_files = [data_file for data_file in run_nanorc.data_files if data_file.exists()]
     pathlist_string = ""
     filelist_string = ""
-    for data_file in run_nanorc.data_files:
+    for data_file in remaining_data_files:
         filelist_string += " " + str(data_file)
         if str(data_file.parent) not in pathlist_string:
             pathlist_string += " " + str(data_file.parent)
@@ -297,8 +347,9 @@ def test_cleanup(run_nanorc):
         print("--------------------")
         os.system(f"ls -alF {filelist_string}")
 
-        for data_file in run_nanorc.data_files:
+        for data_file in remaining_data_files:
             data_file.unlink()
+            data_file_index.remove_index(data_file)
 
         print("--------------------")
         os.system(f"df -h {pathlist_string}")
@@ -0,0 +1,182 @@
+import pytest
+from pathlib import Path
+
+import daqsystemtest.log_scanner as log_scanner
+import integrationtest.data_classes as data_classes
+import daqsystemtest.benchmark as benchmark
+import daqsystemtest.data_file_validation as data_file_validation
+import daqsystemtest.integtest_scheduler as integtest_scheduler
+import daqsystemtest.numa_placement as numa_placement
+
+pytest_plugins = [
+    "integrationtest.integrationtest_drunc",
+    "daqsystemtest.live_log_monitor",
+    "daqsystemtest.config_cache",
+    "daqsystemtest.performance_gate",
+    "daqsystemtest.queue_monitor",
+    "daqsystemtest.process_monitor",
+    "daqsystemtest.numa_placement",
+]
+
+# Values that help determine the running conditions
+number_of_data_producers = 4
+data_rate_slowdown_factor = 1
+trigger_rate = 10  # Hz
+run_duration = 30  # seconds
+minimum_cpu_count = 12
+minimum_free_memory_gb = 16
+
+# Default values for validation parameters
+expected_number_of_data_files = 1
+check_for_logfile_errors = True
+expected_event_count = run_duration * trigger_rate
+expected_event_count_tolerance = expected_event_count // 10
+wibeth_frag_params = {
+    "fragment_type_description": "WIBEth",
+    "fragment_type": "WIBEth",
+    "hdf5_source_subsystem": "Detector_Readout",
+    "expected_fragment_count": number_of_data_producers,
+    "min_size_bytes": 7272,
+    "max_size_bytes": 14472,
+}
+triggercandidate_frag_params = {
+    "fragment_type_description": "Trigger Candidate",
+    "fragment_type": "Trigger_Candidate",
+    "hdf5_source_subsystem": "Trigger",
+    "expected_fragment_count": 1,
+    "min_size_bytes": 72,
+    "max_size_bytes": 216,
+}
+ignored_logfile_problems = {
+    "-controller": [
+        "Worker with pid \\d+ was terminated due to signal",
+        "Connection '.*' not found on the application registry",
+    ],
+    "local-connection-server": [
+        "errorlog: -",
+        "Worker with pid \\d+ was terminated due to signal",
+    ],
+    "log_.*_numa_": ["connect: Connection refused"],
+}
+
+numa_nodes = numa_placement.numa_nodes()
+if numa_placement.numad_running():
+    print("*** WARNING: 'numad' is running on this computer, it may move the pinned readout threads to other nodes.")
+
+# The next three variable declarations *must* be present as globals in the test
+# file. They're read by the "fixtures" in conftest.py to determine how
+# to run the config generation and nanorc
+
+object_databases = ["config/daqsystemtest/integrationtest-objects.data.xml"]
+
+conf_dict = data_classes.drunc_config()
+conf_dict.dro_map_config.n_streams = number_of_data_producers
+conf_dict.op_env = "integtest"
+conf_dict.session = "numa"
+conf_dict.config_substitutions += integtest_scheduler.session_isolation_substitutions()
+conf_dict.tpg_enabled = False
+conf_dict.frame_file = "asset://?label=WIBEth&subsystem=readout"
+
+conf_dict.config_substitutions.append(
+    data_classes.config_substitution(
+        obj_id=conf_dict.session,
+        obj_class="Session",
+        updates={"data_rate_slowdown_factor": data_rate_slowdown_factor},
+    )
+)
+conf_dict.config_substitutions.append(
+    data_classes.config_substitution(
+        obj_class="RandomTCMakerConf",
+        updates={"trigger_rate_hz": trigger_rate},
+    )
+)
+
+# "unpinned", "pinned_node<N>" for every NUMA node, and "cross_node<M>_cpus<N>" on multi-node computers
+# (numa_placement's plugin reads the placement of the running variant from variant_parameters)
+variant_parameters = numa_placement.placement_parameters(numa_nodes)
+
+# The commands to run in nanorc, as a list
+nanorc_command_list = (
+    "boot conf start 101 wait 2 enable-triggers wait ".split()
+    + [str(run_duration)]
+    + "disable-triggers wait 2 drain-dataflow wait 2 stop-trigger-sources stop scrap terminate".split()
+)
+
+
+def format_placement_changes(results):
+    changes = numa_placement.compare_placements(
+        {
+            result["placement"]: {metric: value for metric, value in result.items() if metric not in variant_parameters[result["placement"]]}
+            for result in results
+        }
+    )
+    return [
+        f"    {placement_name}: " + ", ".join(f"{metric} {change:+.1%}" for metric, change in sorted(metric_changes.items()))
+        for placement_name, metric_changes in sorted(changes.items())
+    ]
+
+
+# The results of every placement, compared with the unpinned run when the module's tests have finished
+scan = benchmark.Scan(
+    __file__,
+    variant_parameters,
+    f"NUMA placement compared with the unpinned run ({len(numa_nodes)} node(s) on this computer):",
+    format_placement_changes,
+)
+confgen_arguments = scan.confgen_arguments(conf_dict, numa_placement.substitutions)
+placement_summary = scan.summary
+
+
+# The tests themselves
+
+
+def test_nanorc_success(run_nanorc):
+    # Check that nanorc completed correctly
+    assert run_nanorc.completed_process.returncode == 0
+
+
+def test_log_files(run_nanorc):
+    if check_for_logfile_errors:
+        # Check that there are no warnings or errors in the log files
+        assert log_scanner.logs_are_error_free(
+            run_nanorc.log_files, True, True, ignored_logfile_problems
+        )
+
+
+def test_data_files(run_nanorc):
+    assert len(run_nanorc.data_files) == expected_number_of_data_files
+
+    validations = data_file_validation.validate_data_files(
+        run_nanorc.data_files,
+        expected_event_count,
+        expected_event_count_tolerance,
+        [triggercandidate_frag_params, wibeth_frag_params],
+    )
+    for validation in validations:
+        assert validation.passed
+
+
+def test_placement(run_nanorc):
+    placement = scan.parameters()
+
+    run_metrics = benchmark.measure_run(run_nanorc.data_files, run_duration)
+    readout_statistics = [
+        statistics
+        for name, statistics in run_nanorc.process_statistics.items()
+        if numa_placement.readout_app_pattern.search(name)
+    ]
+    result = {
+        **placement,
+        "records_per_second": run_metrics["record_count"] / run_duration,
+        "mb_per_second": run_metrics["bytes_per_second"] / (1024 * 1024),
+        **numa_placement.readout_request_latency(run_nanorc.opmon_files),
+        "readout_cpu_seconds": sum(statistics["cpu_seconds"] for statistics in readout_statistics),
+        "readout_minor_page_faults": sum(statistics["minor_page_faults"] for statistics in readout_statistics),
+    }
+    scan.record(result)
+
+    # the readout applications must have run where the placement put them
+    assert len(readout_statistics) > 0
+    if placement["cpus"] is not None:
+        for statistics in readout_statistics:
+            assert set(statistics["cpus"]) <= set(placement["cpus"])
@@ -0,0 +1,128 @@
+import pytest
+
+import integrationtest.data_classes as data_classes
+import daqsystemtest.benchmark as benchmark
+import daqsystemtest.integtest_scheduler as integtest_scheduler
+import daqsystemtest.oks_snapshot as oks_snapshot
+import daqsystemtest.queue_monitor as queue_monitor
+import daqsystemtest.queue_tuning as queue_tuning
+import daqsystemtest.scale_out as scale_out
+
+pytest_plugins = [
+    "integrationtest.integrationtest_drunc",
+    "daqsystemtest.live_log_monitor",
+    "daqsystemtest.config_cache",
+    "daqsystemtest.performance_gate",
+    "daqsystemtest.queue_monitor",
+]
+
+# Values that help determine the running conditions
+# the workload is the same for every tuning point: 2 readout apps x 2 streams x 3 dataflow apps at a fixed trigger rate
+topology = scale_out.Topology(2, 2, 3)
+trigger_rate = 10.0  # Hz
+run_duration = 30  # seconds
+data_rate_slowdown_factor = 1
+minimum_cpu_count = 17
+minimum_free_memory_gb = 24
+
+# The capacities to try for each QueueDescriptor; every queue type that is safe for the descriptor is tried as well
+tuned_queues = {
+    "trigger-records": [11, 50, 200],
+    "wib-eth-raw-input": [1000, 10000],
+}
+
+check_for_logfile_errors = False  # small queues are expected to produce push timeouts
+live_log_action = "off"
+
+# The next three variable declarations *must* be present as globals in the test
+# file. They're read by the "fixtures" in conftest.py to determine how
+# to run the config generation and nanorc
+
+object_databases = ["config/daqsystemtest/integrationtest-objects.data.xml"]
+
+conf_dict = data_classes.drunc_config()
+conf_dict.op_env = "integtest"
+conf_dict.session = "queuetune"
+conf_dict.config_substitutions += integtest_scheduler.session_isolation_substitutions()
+conf_dict.config_substitutions += queue_monitor.queue_monitoring_substitutions()
+conf_dict.tpg_enabled = False
+
+conf_dict.config_substitutions.append(
+    data_classes.config_substitution(
+        obj_id=conf_dict.session,
+        obj_class="Session",
+        updates={"data_rate_slowdown_factor": data_rate_slowdown_factor},
+    )
+)
+conf_dict.config_substitutions.append(
+    data_classes.config_substitution(
+        obj_class="RandomTCMakerConf",
+        updates={"trigger_rate_hz": trigger_rate},
+    )
+)
+conf_dict = topology.configure(conf_dict)
+
+snapshot = oks_snapshot.default_snapshot()
+queue_descriptors = queue_tuning.queue_descriptors(snapshot)
+
+variant_parameters = {}
+for descriptor_id, capacities in tuned_queues.items():
+    queue_types = queue_tuning.allowed_queue_types(queue_descriptors[descriptor_id]["queue_type"])
+    variant_parameters.update(queue_tuning.tuning_parameters(descriptor_id, capacities, queue_types))
+
+# The results of every tuning point; the recommended overlays are written when the module's tests have finished
+scan = benchmark.Scan(__file__, variant_parameters)
+confgen_arguments = scan.confgen_arguments(conf_dict, queue_tuning.substitutions)
+
+# The commands to run in nanorc, as a list
+nanorc_command_list = (
+    "boot conf start 101 wait 5 enable-triggers wait ".split()
+    + [str(run_duration)]
+    + "disable-triggers wait 2 drain-dataflow wait 2 stop-trigger-sources stop scrap terminate".split()
+)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def tuning_summary(tmp_path_factory):
+    yield
+    if not scan.results:
+        return
+    recommendations = queue_tuning.recommend(scan.results)
+    # one overlay for each OKS file that defines a tuned descriptor
+    overlays = queue_tuning.write_overlays(
+        recommendations, queue_descriptors, snapshot, tmp_path_factory.getbasetemp()
+    )
+    print("")
+    print("Queue tuning results:")
+    for result in sorted(scan.results, key=lambda result: (result["descriptor"], result["queue_type"], result["capacity"])):
+        print(
+            f"    {result['descriptor']} {result['queue_type']} capacity {result['capacity']}: "
+            f"{result['records_per_second']:.2f} records/s, {result['mb_per_second']:.2f} MB/s, "
+            f"{result['drop_fraction']:.1%} dropped, {result['push_timeouts']} push timeouts"
+        )
+    for overlay_path, changes in overlays.items():
+        for descriptor, (old, new) in sorted(changes.items()):
+            print(f"    recommended for {descriptor}: {new[0]}, capacity {new[1]} (was {old[0]}, capacity {old[1]})")
+        print(f"Recommended overlay written to {overlay_path}")
+
+
+# The tests themselves
+
+
+def test_nanorc_success(run_nanorc):
+    # Check that nanorc completed correctly
+    assert run_nanorc.completed_process.returncode == 0
+
+
+def test_tuning_point(run_nanorc):
+    parameters = scan.parameters()
+
+    run_metrics = benchmark.measure_run(run_nanorc.data_files, run_duration)
+    result = queue_tuning.point_result(
+        parameters,
+        run_metrics,
+        run_duration * trigger_rate,
+        sum(run_nanorc.queue_push_timeouts.values()),
+    )
+    scan.record(result)
+    assert run_metrics["record_count"] > 0
@@ -4,11 +4,18 @@ import re
 import copy
 import urllib.request
 
-import integrationtest.data_file_checks as data_file_checks
-import integrationtest.log_file_checks as log_file_checks
+import daqsystemtest.log_scanner as log_scanner
 import integrationtest.data_classes as data_classes
+import daqsystemtest.data_file_validation as data_file_validation
+import daqsystemtest.integtest_scheduler as integtest_scheduler
 
-pytest_plugins = "integrationtest.integrationtest_drunc"
+pytest_plugins = [
+    "integrationtest.integrationtest_drunc",
+    "daqsystemtest.live_log_monitor",
+    "daqsystemtest.config_cache",
+    "daqsystemtest.performance_gate",
+    "daqsystemtest.queue_monitor",
+]
 
 # Don't require frames file
 frame_file_required = False
@@ -111,6 +118,7 @@ conf_dict = data_classes.drunc_config()
 conf_dict.dro_map_config.n_streams = number_of_data_producers
 conf_dict.op_env = "integtest"
 conf_dict.session = "readout"
+conf_dict.config_substitutions += integtest_scheduler.session_isolation_substitutions()
 conf_dict.tpg_enabled = False
 conf_dict.frame_file = "asset://?label=ProtoWIB&subsystem=readout"  # ProtoWIB
 
@@ -225,7 +233,7 @@ def test_log_files(run_nanorc):
 
     if local_check_flag:
         # Check that there are no warnings or errors in the log files
-        assert log_file_checks.logs_are_error_free(
+        assert log_scanner.logs_are_error_free(
             run_nanorc.log_files, True, True, ignored_logfile_problems
         )
 
@@ -266,19 +274,12 @@ def test_data_files(run_nanorc):
     all_ok = True
     all_ok &= len(run_nanorc.data_files) == expected_number_of_data_files
 
-    for idx in range(len(run_nanorc.data_files)):
-        data_file = data_file_checks.DataFile(run_nanorc.data_files[idx])
-        all_ok &= data_file_checks.sanity_check(data_file)
-        all_ok &= data_file_checks.check_file_attributes(data_file)
-        all_ok &= data_file_checks.check_event_count(
-            data_file, local_expected_event_count, local_event_count_tolerance
-        )
-        for jdx in range(len(fragment_check_list)):
-            all_ok &= data_file_checks.check_fragment_count(
-                data_file, fragment_check_list[jdx]
-            )
-            all_ok &= data_file_checks.check_fragment_sizes(
-                data_file, fragment_check_list[jdx]
-            )
+    validations = data_file_validation.validate_data_files(
+        run_nanorc.data_files,
+        local_expected_event_count,
+        local_event_count_tolerance,
+        fragment_check_list,
+    )
+    all_ok &= all(validation.passed for validation in validations)
 
     assert all_ok
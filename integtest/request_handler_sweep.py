@@ -0,0 +1,142 @@
+import pytest
+import functools
+import math
+
+import integrationtest.data_classes as data_classes
+import daqsystemtest.benchmark as benchmark
+import daqsystemtest.data_file_validation as data_file_validation
+import daqsystemtest.integtest_scheduler as integtest_scheduler
+import daqsystemtest.latency_buffer_scan as latency_buffer_scan
+import daqsystemtest.queue_monitor as queue_monitor
+import daqsystemtest.request_handler_sweep as request_handler_sweep
+
+pytest_plugins = [
+    "integrationtest.integrationtest_drunc",
+    "daqsystemtest.live_log_monitor",
+    "daqsystemtest.config_cache",
+    "daqsystemtest.performance_gate",
+    "daqsystemtest.queue_monitor",
+]
+
+# Values that help determine the running conditions
+number_of_data_producers = 4
+trigger_rate = 50.0  # Hz, high enough that the data requests queue up in the request handlers
+run_duration = 20  # seconds
+readout_window_time_before = 1000
+readout_window_time_after = 1000
+ticks_per_wibeth_frame = 2048
+wibeth_frame_size = 7200  # bytes
+
+# The settings of the detector, TP, TA and TC request handlers to sweep: every thread count with every
+# pop policy and request timeout (None keeps the configured timeout of each handler)
+handler_thread_counts = [1, 2, 4]
+pop_policies = request_handler_sweep.default_pop_policies
+request_timeouts = [None, 1000]  # ms
+p99_budget_ms = 5.0  # the per-link interval-average p99 response time that a setting has to stay within
+
+# Default values for validation parameters
+expected_number_of_data_files = 1
+check_for_logfile_errors = False  # starved request handlers are expected to produce warnings
+live_log_action = "off"
+expected_event_count = run_duration * trigger_rate
+expected_event_count_tolerance = expected_event_count / 10
+minimum_cpu_count = 12
+minimum_free_memory_gb = 12
+
+frames_per_window = (readout_window_time_before + readout_window_time_after) / ticks_per_wibeth_frame
+wibeth_frag_params = {
+    "fragment_type_description": "WIBEth",
+    "fragment_type": "WIBEth",
+    "hdf5_source_subsystem": "Detector_Readout",
+    "expected_fragment_count": number_of_data_producers,
+    "min_size_bytes": 72 + wibeth_frame_size * (math.floor(frames_per_window) - 1),
+    "max_size_bytes": 72 + wibeth_frame_size * (math.ceil(frames_per_window) + 2),
+}
+triggercandidate_frag_params = {
+    "fragment_type_description": "Trigger Candidate",
+    "fragment_type": "Trigger_Candidate",
+    "hdf5_source_subsystem": "Trigger",
+    "expected_fragment_count": 1,
+    "min_size_bytes": 72,
+    "max_size_bytes": 216,
+}
+
+# The next three variable declarations *must* be present as globals in the test
+# file. They're read by the "fixtures" in conftest.py to determine how
+# to run the config generation and nanorc
+
+object_databases = ["config/daqsystemtest/integrationtest-objects.data.xml"]
+
+conf_dict = data_classes.drunc_config()
+conf_dict.dro_map_config.n_streams = number_of_data_producers
+conf_dict.op_env = "integtest"
+conf_dict.session = "rhsweep"
+conf_dict.config_substitutions += integtest_scheduler.session_isolation_substitutions()
+conf_dict.config_substitutions += queue_monitor.queue_monitoring_substitutions()
+conf_dict.tpg_enabled = False
+conf_dict.frame_file = "asset://?label=WIBEth&subsystem=readout"
+
+conf_dict.config_substitutions.append(
+    data_classes.config_substitution(
+        obj_class="RandomTCMakerConf",
+        updates={"trigger_rate_hz": trigger_rate},
+    )
+)
+conf_dict.config_substitutions.append(
+    data_classes.config_substitution(
+        obj_class="TCReadoutMap",
+        obj_id="def-random-readout",
+        updates={
+            "time_before": readout_window_time_before,
+            "time_after": readout_window_time_after,
+        },
+    )
+)
+
+# The results of every sweep point, printed when the module's tests have finished
+scan = benchmark.Scan(
+    __file__,
+    request_handler_sweep.sweep_parameters(handler_thread_counts, pop_policies, request_timeouts),
+    f"RequestHandler sweep at {trigger_rate} Hz, budget {p99_budget_ms} ms on the interval-average p99 response time:",
+    functools.partial(request_handler_sweep.format_results, p99_budget_ms=p99_budget_ms),
+)
+confgen_arguments = scan.confgen_arguments(conf_dict, request_handler_sweep.substitutions)
+sweep_summary = scan.summary
+
+# The commands to run in nanorc, as a list
+nanorc_command_list = (
+    "boot conf start 101 wait 1 enable-triggers wait ".split()
+    + [str(run_duration)]
+    + "disable-triggers wait 2 drain-dataflow wait 2 stop-trigger-sources stop scrap terminate".split()
+)
+
+
+# The tests themselves
+
+
+def test_nanorc_success(run_nanorc):
+    # Check that nanorc completed correctly
+    assert run_nanorc.completed_process.returncode == 0
+
+
+def test_request_handler_point(run_nanorc):
+    parameters = scan.parameters()
+
+    # not asserted: a setting that can't keep up with the trigger rate is a result of the sweep, not a failure
+    data_files_passed = len(run_nanorc.data_files) == expected_number_of_data_files
+    validations = data_file_validation.validate_data_files(
+        run_nanorc.data_files,
+        expected_event_count,
+        expected_event_count_tolerance,
+        [triggercandidate_frag_params, wibeth_frag_params],
+    )
+    data_files_passed &= all(validation.passed for validation in validations)
+
+    result = request_handler_sweep.point_result(
+        parameters,
+        request_handler_sweep.service_time_histograms(run_nanorc.opmon_files),
+        latency_buffer_scan.request_handler_warning_counts(run_nanorc.log_files),
+        data_files_passed,
+    )
+    scan.record(result)
+    assert result["links"], "no request handler published num_requests_handled and avg_request_response_time"
@@ -0,0 +1,189 @@
+import pytest
+import functools
+import math
+
+import daqsystemtest.log_scanner as log_scanner
+import integrationtest.data_classes as data_classes
+import daqsystemtest.benchmark as benchmark
+import daqsystemtest.data_file_validation as data_file_validation
+import daqsystemtest.integtest_scheduler as integtest_scheduler
+import daqsystemtest.scale_out as scale_out
+
+pytest_plugins = [
+    "integrationtest.integrationtest_drunc",
+    "daqsystemtest.live_log_monitor",
+    "daqsystemtest.config_cache",
+    "daqsystemtest.performance_gate",
+    "daqsystemtest.queue_monitor",
+]
+
+# Values that help determine the running conditions
+# (readout apps, streams per readout app, dataflow apps), in order of increasing size;
+# the topologies that don't fit on this computer are skipped
+topologies = [
+    scale_out.Topology(1, 1, 1),
+    scale_out.Topology(1, 2, 1),
+    scale_out.Topology(2, 2, 1),
+    scale_out.Topology(2, 2, 2),
+    scale_out.Topology(3, 2, 2),
+    scale_out.Topology(4, 2, 2),
+    scale_out.Topology(4, 4, 2),
+    scale_out.Topology(6, 4, 3),
+    scale_out.Topology(8, 4, 4),
+]
+# every topology runs at each of these trigger rates, to find the throughput at which it saturates
+trigger_rates = [5, 50, 200, 800]  # Hz
+run_duration = 20  # seconds
+data_rate_slowdown_factor = 1
+# 1.25 ms readout windows, so that at 800 Hz every data producer asks for all of its
+# data (about 220 MB/s of WIBEth frames); with the default few-frame windows even the
+# largest topology writes only a few MB/s at 800 Hz and never saturates
+readout_window_time_before = 76125  # ticks
+readout_window_time_after = 2000
+ticks_per_wibeth_frame = 2048
+wibeth_frame_size = 7200  # bytes
+frames_per_window = (readout_window_time_before + readout_window_time_after) / ticks_per_wibeth_frame
+minimum_cpu_count = 6  # what the smallest topology needs
+minimum_free_memory_gb = 8
+minimum_free_disk_space_gb = 25  # a saturated run writes as fast as the disk allows, about 1 GB/s for 20 s
+
+# Default values for validation parameters
+check_for_logfile_errors = True
+wibeth_frag_params = {
+    "fragment_type_description": "WIBEth",
+    "fragment_type": "WIBEth",
+    "hdf5_source_subsystem": "Detector_Readout",
+    "expected_fragment_count": 1,  # replaced by the number of data producers of each topology
+    "min_size_bytes": 72 + wibeth_frame_size * (math.floor(frames_per_window) - 1),
+    "max_size_bytes": 72 + wibeth_frame_size * (math.ceil(frames_per_window) + 2),
+}
+triggercandidate_frag_params = {
+    "fragment_type_description": "Trigger Candidate",
+    "fragment_type": "Trigger_Candidate",
+    "hdf5_source_subsystem": "Trigger",
+    "expected_fragment_count": 1,
+    "min_size_bytes": 72,
+    "max_size_bytes": 280,
+}
+hsi_frag_params = {
+    "fragment_type_description": "HSI",
+    "fragment_type": "Hardware_Signal",
+    "hdf5_source_subsystem": "HW_Signals_Interface",
+    "expected_fragment_count": 0,
+    "min_size_bytes": 72,
+    "max_size_bytes": 100,
+}
+ignored_logfile_problems = {
+    "-controller": [
+        "Worker with pid \\d+ was terminated due to signal 1",
+        "Connection '.*' not found on the application registry",
+    ],
+    "local-connection-server": [
+        "errorlog: -",
+        "Worker with pid \\d+ was terminated due to signal 1",
+    ],
+    "log_.*_scaleout_": ["connect: Connection refused"],
+}
+
+# The next three variable declarations *must* be present as globals in the test
+# file. They're read by the "fixtures" in conftest.py to determine how
+# to run the config generation and nanorc
+
+object_databases = ["config/daqsystemtest/integrationtest-objects.data.xml"]
+
+conf_dict = data_classes.drunc_config()
+conf_dict.op_env = "integtest"
+conf_dict.session = "scaleout"
+conf_dict.config_substitutions += integtest_scheduler.session_isolation_substitutions()
+conf_dict.tpg_enabled = False
+
+conf_dict.config_substitutions.append(
+    data_classes.config_substitution(
+        obj_id=conf_dict.session,
+        obj_class="Session",
+        updates={"data_rate_slowdown_factor": data_rate_slowdown_factor},
+    )
+)
+conf_dict.config_substitutions.append(
+    data_classes.config_substitution(
+        obj_class="TCReadoutMap",
+        obj_id="def-random-readout",
+        updates={
+            "time_before": readout_window_time_before,
+            "time_after": readout_window_time_after,
+        },
+    )
+)
+
+variant_parameters, skipped_topologies = scale_out.saturation_parameters(topologies, trigger_rates)
+if skipped_topologies:
+    print(f"The {', '.join(topology.name for topology in skipped_topologies)} topologies don't fit on this computer and won't be run.")
+
+# The result of every topology and trigger rate, turned into a scaling curve when the module's tests have finished
+scan = benchmark.Scan(
+    __file__,
+    variant_parameters,
+    "Scaling curve at saturation (throughput per data producer relative to the smallest topology):",
+    functools.partial(scale_out.format_results, run_duration=run_duration, highest_trigger_rate=max(trigger_rates)),
+)
+confgen_arguments = scale_out.topology_configs(conf_dict, variant_parameters)
+scaling_summary = scan.summary
+
+# The commands to run in nanorc, as a list
+nanorc_command_list = (
+    "boot conf start 101 wait 5 enable-triggers wait ".split()
+    + [str(run_duration)]
+    + "disable-triggers wait 2 drain-dataflow wait 2 stop-trigger-sources stop scrap terminate".split()
+)
+
+
+# The tests themselves
+
+
+def test_nanorc_success(run_nanorc):
+    # Check that nanorc completed correctly
+    assert run_nanorc.completed_process.returncode == 0
+
+
+def test_log_files(run_nanorc):
+    if check_for_logfile_errors:
+        # Check that there are no warnings or errors in the log files
+        assert log_scanner.logs_are_error_free(
+            run_nanorc.log_files, True, True, ignored_logfile_problems
+        )
+
+
+def test_data_files(run_nanorc):
+    parameters = scan.parameters()
+    topology = scale_out.Topology.from_parameters(parameters)
+    expected_event_count = topology.expected_event_count(run_duration, parameters["trigger_rate_hz"])
+    if parameters["trigger_rate_hz"] == min(trigger_rates):
+        expected_event_count_tolerance = max(expected_event_count / 10, 2)
+    else:
+        # above the lowest rate the session may be saturated, and then writes fewer records
+        expected_event_count_tolerance = expected_event_count
+
+    assert len(run_nanorc.data_files) == topology.expected_number_of_data_files()
+
+    validations = data_file_validation.validate_data_files(
+        run_nanorc.data_files,
+        expected_event_count,
+        expected_event_count_tolerance,
+        [triggercandidate_frag_params, hsi_frag_params, topology.fragment_params(wibeth_frag_params)],
+    )
+    for validation in validations:
+        assert validation.passed
+
+
+def test_scaling(run_nanorc):
+    parameters = scan.parameters()
+
+    metrics = benchmark.measure_run(run_nanorc.data_files, run_duration)
+    result = {
+        **parameters,
+        "record_count": metrics["record_count"],
+        "trigger_count": metrics["trigger_count"],
+        "mb_per_second": metrics["bytes_per_second"] / (1024 * 1024),
+    }
+    scan.record(result)
+    assert metrics["record_count"] > 0
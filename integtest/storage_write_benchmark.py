@@ -0,0 +1,97 @@
+import pytest
+
+import integrationtest.data_classes as data_classes
+import daqsystemtest.benchmark as benchmark
+import daqsystemtest.integtest_scheduler as integtest_scheduler
+import daqsystemtest.scale_out as scale_out
+import daqsystemtest.storage_benchmark as storage_benchmark
+
+pytest_plugins = [
+    "integrationtest.integrationtest_drunc",
+    "daqsystemtest.live_log_monitor",
+    "daqsystemtest.config_cache",
+    "daqsystemtest.performance_gate",
+    "daqsystemtest.queue_monitor",
+]
+
+# Values that help determine the running conditions
+# 2 readout apps x 2 streams x 2 dataflow apps, with a long readout window so that each record is about 1.5 MB
+topology = scale_out.Topology(2, 2, 2)
+readout_window_time_before = 100000  # ticks
+readout_window_time_after = 1000
+run_duration = 30  # seconds
+minimum_cpu_count = 10
+minimum_free_memory_gb = 16
+
+# The write-path settings to benchmark: every trigger rate with every max_file_size and retry policy
+trigger_rates = [5, 20, 40]  # Hz
+max_file_sizes = [
+    16 * 1024 * 1024,  # a rollover every few seconds
+    4 * 1024 * 1024 * 1024,  # the default: no rollover within a run
+]
+retry_policies = {name: storage_benchmark.retry_policies[name] for name in ["default_retry", "fast_retry"]}
+
+check_for_logfile_errors = False  # write retries at the highest rates are a result, not a failure
+live_log_action = "off"
+
+# The next three variable declarations *must* be present as globals in the test
+# file. They're read by the "fixtures" in conftest.py to determine how
+# to run the config generation and nanorc
+
+object_databases = ["config/daqsystemtest/integrationtest-objects.data.xml"]
+
+conf_dict = data_classes.drunc_config()
+conf_dict.op_env = "integtest"
+conf_dict.session = "storagebench"
+conf_dict.config_substitutions += integtest_scheduler.session_isolation_substitutions()
+conf_dict.tpg_enabled = False
+
+conf_dict.config_substitutions.append(
+    data_classes.config_substitution(
+        obj_class="TCReadoutMap",
+        obj_id="def-random-readout",
+        updates={
+            "time_before": readout_window_time_before,
+            "time_after": readout_window_time_after,
+        },
+    )
+)
+conf_dict = topology.configure(conf_dict)
+
+# The results of every benchmark point, printed when the module's tests have finished
+scan = benchmark.Scan(
+    __file__,
+    storage_benchmark.benchmark_parameters(trigger_rates, max_file_sizes, retry_policies),
+    f"HDF5DataStore write-path benchmark with {topology.name}:",
+    storage_benchmark.format_results,
+)
+confgen_arguments = scan.confgen_arguments(conf_dict, storage_benchmark.substitutions)
+benchmark_summary = scan.summary
+
+# The commands to run in nanorc, as a list
+nanorc_command_list = (
+    "boot conf start 101 wait 5 enable-triggers wait ".split()
+    + [str(run_duration)]
+    + "disable-triggers wait 2 drain-dataflow wait 2 stop-trigger-sources stop scrap terminate".split()
+)
+
+
+# The tests themselves
+
+
+def test_nanorc_success(run_nanorc):
+    # Check that nanorc completed correctly
+    assert run_nanorc.completed_process.returncode == 0
+
+
+def test_storage_point(run_nanorc):
+    parameters = scan.parameters()
+
+    dataflow_apps = storage_benchmark.dataflow_app_metrics(run_nanorc.data_files, run_nanorc.log_files, run_duration)
+    result = {
+        **parameters,
+        "total_mb_per_second": sum(app_metrics["mb_per_second"] for app_metrics in dataflow_apps.values()),
+        "dataflow_apps": dataflow_apps,
+    }
+    scan.record(result)
+    assert run_nanorc.data_files, "no data files were written"
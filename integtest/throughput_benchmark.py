@@ -0,0 +1,101 @@
+import pytest
+import os
+import functools
+from pathlib import Path
+
+import daqsystemtest.benchmark as benchmark
+
+pytest_plugins = [
+    "integrationtest.integrationtest_drunc",
+    "daqsystemtest.live_log_monitor",
+    "daqsystemtest.config_cache",
+    "daqsystemtest.performance_gate",
+    "daqsystemtest.queue_monitor",
+]
+
+# The sessions of these integtests are re-used, with the trigger rate and data-rate
+# slowdown factor of each one swept over the values listed here
+benchmarked_tests = {
+    "minimal_system_quick_test.py": {
+        "config": "MinimalSystem",
+        "trigger_rates": [1, 10, 100],
+    },
+    "3ru_1df_multirun_test.py": {
+        "config": "WIBEth_System",
+        "trigger_rates": [1, 10],
+    },
+    "long_window_readout_test.py": {
+        "config": "With_TR_Splitting",
+        "trigger_rates": [0.05, 0.1],
+    },
+}
+data_rate_slowdown_factors = [1, 10]
+run_duration = 30  # seconds
+check_for_logfile_errors = False  # high rates are expected to produce warnings
+minimum_cpu_count = 24
+minimum_free_memory_gb = 52
+
+# Measurements are appended to $DAQSYSTEMTEST_BENCHMARK_RESULTS, one JSON object per line
+
+object_databases = ["config/daqsystemtest/integrationtest-objects.data.xml"]
+
+variant_parameters = {}
+confgen_arguments = {}
+skipped_tests = []
+for test_file, settings in benchmarked_tests.items():
+    test_module = benchmark.load_integtest_module(Path(__file__).parent / test_file)
+    if not getattr(test_module, "sufficient_resources_on_this_computer", True) or not getattr(
+        test_module, "sufficient_disk_space", True
+    ):
+        skipped_tests.append(test_file)
+        continue
+    # (the session-isolation substitutions are already part of the original test's config)
+    base_config = test_module.confgen_arguments[settings["config"]]
+    sweep = benchmark.sweep_parameters(settings["config"], settings["trigger_rates"], data_rate_slowdown_factors)
+    variant_parameters.update(sweep)
+    confgen_arguments.update(
+        benchmark.parameter_variants(
+            base_config, sweep, functools.partial(benchmark.sweep_substitutions, base_config.session)
+        )
+    )
+if skipped_tests:
+    print(f"This computer doesn't have the resources for the sessions of {', '.join(skipped_tests)}, they won't be benchmarked.")
+
+# The commands to run in nanorc, as a list
+nanorc_command_list = (
+    "boot conf start 101 wait 1 enable-triggers wait ".split()
+    + [str(run_duration)]
+    + "disable-triggers wait 2 drain-dataflow wait 2 stop-trigger-sources stop scrap terminate".split()
+)
+
+# The tests themselves
+
+
+def test_nanorc_success(run_nanorc):
+    # Check that nanorc completed correctly
+    assert run_nanorc.completed_process.returncode == 0
+
+
+def test_throughput(run_nanorc):
+    variant_name = benchmark.current_variant()
+    parameters = variant_parameters[variant_name]
+    assert len(run_nanorc.data_files) > 0
+
+    metrics = benchmark.measure_run(run_nanorc.data_files, run_duration)
+    latency = benchmark.build_latency(run_nanorc.opmon_files)
+    metrics["tr_build_latency_p50_interval_max_ms"] = latency["p50_interval_max_ms"]
+    metrics["tr_build_latency_max_ms"] = latency["max_ms"]
+    entry = benchmark.append_result(
+        Path(__file__).name, variant_name, parameters, metrics
+    )
+
+    print("")
+    latency_text = (
+        f"TR build latency p50 {latency['p50_interval_max_ms']:.1f} ms, max {latency['max_ms']:.1f} ms (per-interval maxima)"
+        if latency["max_ms"] is not None
+        else "TR build latency not published"
+    )
+    print(f"Benchmark {variant_name}: {metrics['trigger_count']} triggers, {metrics['sustained_trigger_rate_hz']:.2f} Hz sustained, "
+          f"{metrics['bytes_per_second'] / (1024 * 1024):.2f} MB/s written, {latency_text}")
+    print(f"Result recorded in {os.environ.get(benchmark.results_env_var, benchmark.default_results_file)} ({entry['time']})")
+    assert metrics["record_count"] > 0
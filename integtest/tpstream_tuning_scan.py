@@ -0,0 +1,118 @@
+import pytest
+
+import integrationtest.data_classes as data_classes
+import daqsystemtest.benchmark as benchmark
+import daqsystemtest.integtest_scheduler as integtest_scheduler
+import daqsystemtest.queue_monitor as queue_monitor
+import daqsystemtest.tpstream_tuning as tpstream_tuning
+
+pytest_plugins = [
+    "integrationtest.integrationtest_drunc",
+    "daqsystemtest.live_log_monitor",
+    "daqsystemtest.config_cache",
+    "daqsystemtest.performance_gate",
+    "daqsystemtest.queue_monitor",
+]
+
+# Values that help determine the running conditions
+# the tpstream_writing_test system, with one run per tuning point
+number_of_data_producers = 2
+number_of_readout_apps = 1
+pulser_trigger_rate = 1.0  # Hz
+run_duration = 30  # seconds
+data_rate_slowdown_factor = 1  # the TP latency to disk assumes that data time follows the system clock
+minimum_cpu_count = 8
+minimum_free_memory_gb = 8
+
+# The TPStreamWriterConf settings to sweep: every accumulation interval (in ticks) with every inactivity time
+tp_accumulation_intervals = [31250000, 62500000, 250000000]  # 0.5 s, 1 s (the default) and 4 s
+# seconds; 1 s is the default.  Sub-second inactivity times aren't scanned, since the
+# coarse TP latency to disk can't tell them apart (see tpstream_tuning).
+inactivity_times = [1.0, 4.0]
+
+check_for_logfile_errors = False  # short inactivity times are expected to discard tardy TPs
+live_log_action = "off"
+
+# The next three variable declarations *must* be present as globals in the test
+# file. They're read by the "fixtures" in conftest.py to determine how
+# to run the config generation and nanorc
+
+object_databases = ["config/daqsystemtest/integrationtest-objects.data.xml"]
+
+conf_dict = data_classes.drunc_config()
+conf_dict.dro_map_config.n_streams = number_of_data_producers
+conf_dict.dro_map_config.n_apps = number_of_readout_apps
+conf_dict.op_env = "integtest"
+conf_dict.session = "tptuning"
+conf_dict.config_substitutions += integtest_scheduler.session_isolation_substitutions()
+conf_dict.config_substitutions += queue_monitor.queue_monitoring_substitutions()
+conf_dict.tpg_enabled = True
+conf_dict.frame_file = (
+    "asset://?checksum=dd156b4895f1b06a06b6ff38e37bd798"  # WIBEth All Zeros
+)
+
+conf_dict.config_substitutions.append(
+    data_classes.config_substitution(
+        obj_id=conf_dict.session,
+        obj_class="Session",
+        updates={"data_rate_slowdown_factor": data_rate_slowdown_factor},
+    )
+)
+conf_dict.config_substitutions.append(
+    data_classes.config_substitution(
+        obj_class="RandomTCMakerConf",
+        updates={"trigger_rate_hz": pulser_trigger_rate},
+    )
+)
+conf_dict.config_substitutions.append(
+    data_classes.config_substitution(
+        obj_class="LatencyBuffer", updates={"size": 200000}
+    )
+)
+conf_dict.config_substitutions.append(
+    data_classes.config_substitution(
+        obj_class="TAMakerPrescaleAlgorithm",
+        obj_id="dummy-ta-maker",
+        updates={"prescale": 25},
+    )
+)
+
+# The results of every tuning point, printed when the module's tests have finished
+scan = benchmark.Scan(
+    __file__,
+    tpstream_tuning.tuning_parameters(tp_accumulation_intervals, inactivity_times),
+    "TP stream latency vs completeness:",
+    tpstream_tuning.format_results,
+)
+confgen_arguments = scan.confgen_arguments(conf_dict, tpstream_tuning.substitutions)
+tuning_summary = scan.summary
+
+# The commands to run in nanorc, as a list
+nanorc_command_list = (
+    "boot conf wait 5".split()
+    + "start 101 wait 1 enable-triggers wait ".split()
+    + [str(run_duration)]
+    # long enough for the longest inactivity time to expire before the run stops
+    + "disable-triggers wait 5 drain-dataflow wait 2 stop-trigger-sources stop scrap terminate".split()
+)
+
+
+# The tests themselves
+
+
+def test_nanorc_success(run_nanorc):
+    # Check that nanorc completed correctly
+    assert run_nanorc.completed_process.returncode == 0
+
+
+def test_tuning_point(run_nanorc):
+    parameters = scan.parameters()
+
+    result = tpstream_tuning.point_result(
+        parameters,
+        run_nanorc.tpset_files,
+        run_nanorc.log_files,
+        run_nanorc.opmon_files,
+    )
+    scan.record(result)
+    assert result["timeslices"] > 0, "no TimeSlices were written"
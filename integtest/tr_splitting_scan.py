@@ -0,0 +1,153 @@
+import pytest
+import math
+
+import integrationtest.data_classes as data_classes
+import daqsystemtest.benchmark as benchmark
+import daqsystemtest.data_file_validation as data_file_validation
+import daqsystemtest.integtest_scheduler as integtest_scheduler
+import daqsystemtest.tr_splitting_scan as tr_splitting_scan
+
+pytest_plugins = [
+    "integrationtest.integrationtest_drunc",
+    "daqsystemtest.live_log_monitor",
+    "daqsystemtest.config_cache",
+    "daqsystemtest.performance_gate",
+    "daqsystemtest.queue_monitor",
+    "daqsystemtest.process_monitor",
+]
+
+# Values that help determine the running conditions
+# a fixed supernova-style readout window of about 1.6 s, split into records of different lengths
+number_of_data_producers = 2
+run_duration = 40  # seconds
+trigger_rate = 0.1  # Hz
+readout_window_time_before = 100000000
+readout_window_time_after = 1000000
+ticks_per_wibeth_frame = 2048
+wibeth_frame_size = 7200  # bytes
+minimum_cpu_count = 8
+minimum_free_memory_gb = 16
+minimum_free_disk_space_gb = 8
+
+# TRBConf.max_time_window values to scan (ticks); 0 writes each readout window as a single record
+max_time_windows = [0, 50000000, 10000000, 2000000, 500000]
+
+# Default values for validation parameters
+expected_number_of_data_files = 1
+expected_trigger_count = math.ceil(run_duration * trigger_rate)
+check_for_logfile_errors = True
+live_log_action = "off"
+
+readout_window = readout_window_time_before + readout_window_time_after
+triggercandidate_frag_params = {
+    "fragment_type_description": "Trigger Candidate",
+    "fragment_type": "Trigger_Candidate",
+    "hdf5_source_subsystem": "Trigger",
+    "expected_fragment_count": 1,
+    "min_size_bytes": 72,
+    "max_size_bytes": 216,
+}
+ignored_logfile_problems = {
+    "-controller": [
+        "Worker with pid \\d+ was terminated due to signal 1",
+        "Connection '.*' not found on the application registry",
+    ],
+    "local-connection-server": [
+        "errorlog: -",
+        "Worker with pid \\d+ was terminated due to signal 1",
+    ],
+    "log_.*_trsplit_": ["connect: Connection refused"],
+}
+
+# The next three variable declarations *must* be present as globals in the test
+# file. They're read by the "fixtures" in conftest.py to determine how
+# to run the config generation and nanorc
+
+object_databases = ["config/daqsystemtest/integrationtest-objects.data.xml"]
+
+conf_dict = data_classes.drunc_config()
+conf_dict.dro_map_config.n_streams = number_of_data_producers
+conf_dict.op_env = "integtest"
+conf_dict.session = "trsplit"
+conf_dict.config_substitutions += integtest_scheduler.session_isolation_substitutions()
+conf_dict.tpg_enabled = False
+conf_dict.fake_hsi_enabled = False
+conf_dict.frame_file = "asset://?label=WIBEth&subsystem=readout"
+
+conf_dict.config_substitutions.append(
+    data_classes.config_substitution(
+        obj_class="RandomTCMakerConf",
+        updates={"trigger_rate_hz": trigger_rate},
+    )
+)
+conf_dict.config_substitutions.append(
+    data_classes.config_substitution(
+        obj_class="TCReadoutMap",
+        obj_id="def-random-readout",
+        updates={
+            "time_before": readout_window_time_before,
+            "time_after": readout_window_time_after,
+        },
+    )
+)
+
+# The results of every scan point, printed when the module's tests have finished
+scan = benchmark.Scan(
+    __file__,
+    tr_splitting_scan.scan_parameters(max_time_windows),
+    f"TriggerRecord splitting scan with a readout window of {readout_window} ticks:",
+    tr_splitting_scan.format_results,
+)
+confgen_arguments = scan.confgen_arguments(conf_dict, tr_splitting_scan.substitutions)
+scan_summary = scan.summary
+
+# The commands to run in nanorc, as a list
+nanorc_command_list = (
+    "boot conf start 101 wait 5 enable-triggers wait ".split()
+    + [str(run_duration)]
+    + "disable-triggers wait 5 drain-dataflow wait 5 stop-trigger-sources stop scrap terminate".split()
+)
+
+
+# The tests themselves
+
+
+def test_nanorc_success(run_nanorc):
+    # Check that nanorc completed correctly
+    assert run_nanorc.completed_process.returncode == 0
+
+
+def test_splitting_point(run_nanorc):
+    parameters = scan.parameters()
+    max_time_window = parameters["max_time_window"]
+
+    record_window = min(max_time_window, readout_window) if max_time_window else readout_window
+    records_per_trigger = math.ceil(readout_window / record_window)
+    frames_per_record = record_window / ticks_per_wibeth_frame
+    wibeth_frag_params = {
+        "fragment_type_description": "WIBEth",
+        "fragment_type": "WIBEth",
+        "hdf5_source_subsystem": "Detector_Readout",
+        "expected_fragment_count": number_of_data_producers,
+        "min_size_bytes": 72,  # the last record of a sequence can be short
+        "max_size_bytes": 72 + wibeth_frame_size * (math.ceil(frames_per_record) + 2),
+    }
+    data_files_passed = len(run_nanorc.data_files) == expected_number_of_data_files
+    validations = data_file_validation.validate_data_files(
+        run_nanorc.data_files,
+        expected_trigger_count * records_per_trigger,
+        records_per_trigger,
+        [triggercandidate_frag_params, wibeth_frag_params],
+    )
+    data_files_passed &= all(validation.passed for validation in validations)
+
+    run_metrics = benchmark.measure_run(run_nanorc.data_files, run_duration)
+    result = tr_splitting_scan.point_result(
+        parameters,
+        run_metrics,
+        benchmark.build_latency(run_nanorc.opmon_files),
+        getattr(run_nanorc, "process_statistics", {}),
+        data_files_passed,
+    )
+    scan.record(result)
+    assert data_files_passed, "\N{POLICE CARS REVOLVING LIGHT} One or more data file checks failed! \N{POLICE CARS REVOLVING LIGHT}"
@@ -0,0 +1,300 @@
+"""Throughput measurements for integtest sessions, and the pieces that scans share.
+
+``sweep_parameters`` and ``sweep_substitutions`` describe a grid of trigger rates and
+data-rate slowdown factors over the ``drunc_config`` objects of existing integtests.
+After a session has run, ``measure_run`` derives from its output files
+
+* the sustained trigger rate (distinct trigger numbers per second of triggering),
+* the number of bytes written per second,
+
+and ``build_latency`` the TriggerRecord build latency from the OpMon entries that the
+DFO publishes about each dataflow application.  ``append_result`` adds one JSON line
+per measurement, tagged with the release, host and parameters, to
+``$DAQSYSTEMTEST_BENCHMARK_RESULTS`` (default
+``/tmp/pytest-of-$USER/daqsystemtest_benchmarks.jsonl``) for comparison across releases.
+
+A scan test keeps a ``Scan`` at module level::
+
+    scan = benchmark.Scan(
+        __file__, tr_splitting_scan.scan_parameters(max_time_windows), "Splitting scan:", tr_splitting_scan.format_results
+    )
+    confgen_arguments = scan.confgen_arguments(conf_dict, tr_splitting_scan.substitutions)
+    scan_summary = scan.summary
+
+Its tests take their parameters from ``scan.parameters()`` and hand their results to
+``scan.record``, and the title and the lines of format_results(results) are printed
+once the module's tests have finished.
+"""
+
+import copy
+import datetime
+import importlib.util
+import json
+import math
+import os
+import re
+import socket
+import statistics
+from pathlib import Path
+
+import h5py
+import pytest
+
+import daqsystemtest.data_file_index as data_file_index
+import daqsystemtest.dfo_balance as dfo_balance
+import daqsystemtest.opmon_files as opmon_files
+
+clock_frequency_hz = 62500000  # DUNE timestamp clock
+
+host_class_env_var = "DAQSYSTEMTEST_HOST_CLASS"
+results_env_var = "DAQSYSTEMTEST_BENCHMARK_RESULTS"
+default_results_file = (
+    f"/tmp/pytest-of-{os.environ.get('USER', 'unknown')}/daqsystemtest_benchmarks.jsonl"
+)
+
+
+def load_integtest_module(test_path):
+    "Import an integtest file (whose name may not be a valid module name) to reuse its settings"
+    test_path = Path(test_path)
+    module_name = "daqsystemtest_benchmark_" + test_path.stem.replace("-", "_")
+    spec = importlib.util.spec_from_file_location(module_name, test_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def current_variant():
+    "The confgen_arguments variant of the test that is running, or 'default' outside of a parametrized test"
+    current_test = os.environ.get("PYTEST_CURRENT_TEST", "")
+    match_obj = re.search(r".*\[(.+)\].*", current_test)
+    return match_obj.group(1) if match_obj else "default"
+
+
+def parameter_variants(base_config, variant_parameters, substitutions):
+    """confgen_arguments with one copy of base_config per entry of variant_parameters.
+
+    variant_parameters is {variant name: parameters}; substitutions(parameters) returns
+    the keyword arguments (obj_class, obj_id, updates) of the config substitutions that
+    make a copy into that variant.  They are appended last, so they take precedence
+    over the substitutions of base_config."""
+    import integrationtest.data_classes as data_classes
+
+    variants = {}
+    for variant_name, parameters in variant_parameters.items():
+        config = copy.deepcopy(base_config)
+        for substitution in substitutions(parameters):
+            config.config_substitutions.append(data_classes.config_substitution(**substitution))
+        variants[variant_name] = config
+    return variants
+
+
+def sweep_parameters(base_name, trigger_rates, slowdown_factors):
+    "{'<base_name>_<rate>Hz_slowdown<factor>': parameters} for every trigger rate and slowdown factor"
+    return {
+        f"{base_name}_{trigger_rate}Hz_slowdown{slowdown_factor}": {
+            "base_config": base_name,
+            "trigger_rate_hz": trigger_rate,
+            "data_rate_slowdown_factor": slowdown_factor,
+        }
+        for trigger_rate in trigger_rates
+        for slowdown_factor in slowdown_factors
+    }
+
+
+def sweep_substitutions(session, parameters):
+    "The substitutions of one sweep_parameters entry, for a configuration with the given session name"
+    return [
+        {"obj_class": "RandomTCMakerConf", "updates": {"trigger_rate_hz": parameters["trigger_rate_hz"]}},
+        {
+            "obj_id": session,
+            "obj_class": "Session",
+            "updates": {"data_rate_slowdown_factor": parameters["data_rate_slowdown_factor"]},
+        },
+    ]
+
+
+def record_point(test_file, variant_name, parameters, result, results):
+    """Add the result of one scan point to results, and its metrics (the entries of result
+    that aren't parameters) to the benchmark results file; returns the entry that was written"""
+    results.append(result)
+    return append_result(
+        Path(test_file).name,
+        variant_name,
+        parameters,
+        {metric: value for metric, value in result.items() if metric not in parameters},
+    )
+
+
+def summary_fixture(results, print_summary):
+    """A module-scoped autouse fixture that calls print_summary(results) once the tests of
+    the module have finished, if any results were recorded; assign it to a module global"""
+
+    @pytest.fixture(scope="module", autouse=True)
+    def summary():
+        yield
+        if results:
+            print("")
+            print_summary(results)
+
+    return summary
+
+
+class Scan:
+    """The {variant name: parameters} of a scan integtest and the results of its points.
+
+    ``summary`` is a module-scoped autouse fixture (see summary_fixture) that prints the
+    title and the lines of format_results(results); pytest only finds it when it is
+    assigned to a global of the test module.  It is None without format_results."""
+
+    def __init__(self, test_file, variant_parameters, title=None, format_results=None):
+        self.test_file = test_file
+        self.variant_parameters = variant_parameters
+        self.title = title
+        self.format_results = format_results
+        self.results = []
+        self.summary = summary_fixture(self.results, self.print_summary) if format_results else None
+
+    def confgen_arguments(self, base_config, substitutions):
+        return parameter_variants(base_config, self.variant_parameters, substitutions)
+
+    def parameters(self):
+        "The parameters of the variant that is running"
+        return self.variant_parameters[current_variant()]
+
+    def record(self, result):
+        "record_point for the variant that is running"
+        variant_name = current_variant()
+        return record_point(self.test_file, variant_name, self.variant_parameters[variant_name], result, self.results)
+
+    def print_summary(self, results):
+        if self.title:
+            print(self.title)
+        for line in self.format_results(results):
+            print(line)
+
+
+def triggering_duration(command_list):
+    "Seconds during which triggers are enabled in a drunc command list (summed over all of its runs)"
+    duration = 0
+    triggers_enabled = False
+    for index, command in enumerate(command_list):
+        if command == "enable-triggers":
+            triggers_enabled = True
+        elif command == "disable-triggers":
+            triggers_enabled = False
+        elif command == "wait" and triggers_enabled and index + 1 < len(command_list):
+            duration += float(command_list[index + 1])
+    return duration
+
+
+def record_times(file_name):
+    """(trigger number, trigger time in seconds, creation time or None) for every record in a file.
+
+    The trigger time is the earliest Fragment trigger_timestamp in the record.  The
+    creation time comes from HDF5, which stores it in whole seconds, so it can't
+    resolve differences of less than a second; this is the caveat that every coarse
+    latency taken from the output files shares."""
+    times = []
+    records = data_file_index.load_index(file_name)
+    with h5py.File(file_name, "r") as h5file:
+        for record in records:
+            timestamps = [
+                fragment.trigger_timestamp
+                for fragment in record.fragments
+                if fragment.trigger_timestamp is not None
+            ]
+            if not timestamps:
+                continue
+            creation_time = h5py.h5o.get_info(h5file[record.name].id).ctime
+            times.append(
+                (
+                    record.number,
+                    min(timestamps) / clock_frequency_hz,
+                    creation_time if creation_time > 0 else None,
+                )
+            )
+    return times
+
+
+def measure_run(data_files, run_duration):
+    "Throughput metrics of one run, from its output files"
+    trigger_numbers = set()
+    record_count = 0
+    bytes_written = 0
+    for file_name in data_files:
+        bytes_written += os.stat(file_name).st_size
+        for record in data_file_index.load_index(file_name):
+            record_count += 1
+            if record.number is not None:
+                trigger_numbers.add(record.number)
+
+    return {
+        "record_count": record_count,
+        "trigger_count": len(trigger_numbers),
+        "bytes_written": bytes_written,
+        "sustained_trigger_rate_hz": len(trigger_numbers) / run_duration,
+        "bytes_per_second": bytes_written / run_duration,
+    }
+
+
+def build_latency(opmon_file_names):
+    """TriggerRecord build latency, in milliseconds, from the DFO's DFApplicationInfo OpMon entries.
+
+    The DFO publishes for every dataflow application the longest time, in each
+    publication interval, from sending a TriggerDecision to getting its token back once
+    the record was written (``max_completion_time``).  Returns {'p50_interval_max_ms':
+    median of those interval maxima, 'max_ms': the largest}, with None values when no
+    record completed or the field isn't published."""
+    times_ms = [
+        sample[dfo_balance.completion_time_field] * dfo_balance.time_field_unit_s * 1000
+        for sample in opmon_files.read_samples(
+            opmon_file_names, dfo_balance.measurement_pattern(dfo_balance.dataflow_app_measurement)
+        )
+        if sample.get(dfo_balance.completion_time_field)
+    ]
+    return {
+        "p50_interval_max_ms": statistics.median(times_ms) if times_ms else None,
+        "max_ms": max(times_ms, default=None),
+    }
+
+
+def host_description():
+    cpu_model = ""
+    try:
+        with open("/proc/cpuinfo") as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith("model name"):
+                    cpu_model = line.split(":", 1)[1].strip()
+                    break
+    except OSError:
+        pass
+    memory_gb = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / (1024**3)
+    return {
+        "hostname": socket.gethostname(),
+        "cpu_count": os.cpu_count(),
+        "cpu_model": cpu_model,
+        "memory_gb": round(memory_gb, 1),
+        # hosts of the same class are expected to perform alike; $DAQSYSTEMTEST_HOST_CLASS overrides the default
+        "host_class": os.environ.get(
+            host_class_env_var, f"{os.cpu_count()}cpu_{math.ceil(memory_gb / 16) * 16}gb"
+        ),
+    }
+
+
+def append_result(test_name, variant_name, parameters, metrics, results_file=None):
+    "Add one measurement to the JSON-lines results file; returns the entry that was written"
+    if results_file is None:
+        results_file = os.environ.get(results_env_var, default_results_file)
+    entry = {
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "release": os.environ.get("DUNE_DAQ_BASE_RELEASE", ""),
+        "host": host_description(),
+        "test": test_name,
+        "variant": variant_name,
+        "parameters": parameters,
+        "metrics": metrics,
+    }
+    Path(results_file).parent.mkdir(parents=True, exist_ok=True)
+    with open(results_file, "a") as results:
+        results.write(json.dumps(entry) + "\n")
+    return entry
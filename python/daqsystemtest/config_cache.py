@@ -0,0 +1,283 @@
+"""Content-addressed cache of the configurations that integtests generate.
+
+This module is a pytest plugin.  When an integtest lists it in its ``pytest_plugins``
+and the cache is switched on, the setup of the config-generation fixture of
+``integrationtest.integrationtest_drunc`` (``create_config_files``) is keyed on a
+SHA-256 hash of
+
+* the ``confgen_arguments`` entry that is being generated (every field of the
+  ``drunc_config``, including its ``config_substitutions``),
+* the contents of the test's ``object_databases`` (and of the ``config_db`` of the
+  ``drunc_config``, if it has one) and of every ``*.data.xml`` and schema file that
+  they include, directly or indirectly,
+* the software release and work area (``key_environment_variables``),
+* the versions and Python sources of the packages that generate the configuration
+  (``generator_packages``), so that changing the config-generation code in a work
+  area gives new keys.
+
+The first time a key is seen, the fixture runs as usual and the directories that it
+produced are saved in the cache together with its (pickled) result.  Later sessions
+with the same key, e.g. the ``-n`` repeats of the bundle script, copy the saved files
+into their own temporary directory and use them as the value of the fixture instead
+of generating the configuration again.
+
+The cache is off unless ``$DAQSYSTEMTEST_CONFIG_CACHE_DIR`` names its directory (the
+bundle script's ``--config-cache <dir>`` option sets it).  It is limited to
+``max_cache_size_gb``; the least recently used entries are removed when it grows
+beyond that.  A test can set ``use_config_cache = False`` to always generate its
+configuration.
+"""
+
+import functools
+import hashlib
+import importlib.metadata
+import importlib.util
+import json
+import os
+import pickle
+import shutil
+import time
+from pathlib import Path
+
+import pytest
+
+import daqsystemtest.oks_snapshot as oks_snapshot
+
+config_fixture_name = "create_config_files"
+cache_dir_env_var = "DAQSYSTEMTEST_CONFIG_CACHE_DIR"
+max_cache_size_gb = 1.0
+key_environment_variables = ["DUNE_DAQ_BASE_RELEASE", "DBT_AREA_ROOT"]
+generator_packages = ["integrationtest", "daqconf", "confmodel", "conffwk"]
+
+result_file_name = "result.pickle"
+text_file_suffixes = [".xml", ".json", ".txt", ".sh"]
+
+
+def describe(obj):
+    "A JSON-serializable description of obj (e.g. a drunc_config), with every field that affects generation"
+    if isinstance(obj, (str, int, float, bool)) or obj is None:
+        return obj
+    if isinstance(obj, Path):
+        return str(obj)
+    if isinstance(obj, dict):
+        return {str(key): describe(value) for key, value in sorted(obj.items(), key=lambda item: str(item[0]))}
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        values = [describe(value) for value in obj]
+        return sorted(values, key=json.dumps) if isinstance(obj, (set, frozenset)) else values
+    if hasattr(obj, "__dict__"):
+        return {"__class__": type(obj).__name__, **describe(vars(obj))}
+    return repr(obj)
+
+
+@functools.lru_cache(maxsize=None)
+def generator_fingerprint(package_name):
+    "The installed version and a hash of the Python sources of a package, or '<missing>'"
+    try:
+        spec = importlib.util.find_spec(package_name)
+    except (ImportError, ValueError):
+        spec = None
+    if spec is None:
+        return "<missing>"
+    try:
+        version = importlib.metadata.version(package_name)
+    except importlib.metadata.PackageNotFoundError:
+        version = ""
+    digest = hashlib.sha256(version.encode())
+    if spec.submodule_search_locations:
+        source_files = sorted(
+            source_file for location in spec.submodule_search_locations for source_file in Path(location).rglob("*.py")
+        )
+    else:
+        source_files = [Path(spec.origin)] if spec.origin and spec.origin.endswith(".py") else []
+    for source_file in source_files:
+        digest.update(str(source_file).encode())
+        digest.update(source_file.read_bytes())
+    return f"{version}:{digest.hexdigest()}"
+
+
+def cache_key(confgen_config, object_databases, search_path):
+    digest = hashlib.sha256()
+    digest.update(json.dumps(describe(confgen_config), sort_keys=True).encode())
+    for variable in key_environment_variables:
+        digest.update(f"{variable}={os.environ.get(variable, '')}".encode())
+    for package_name in generator_packages:
+        digest.update(f"{package_name}={generator_fingerprint(package_name)}".encode())
+    roots = list(object_databases)
+    config_db = getattr(confgen_config.get("config"), "config_db", None)
+    if config_db:
+        roots.append(config_db)
+    for file_name, oks_file in sorted(oks_snapshot.include_graph(roots, search_path).items()):
+        digest.update(file_name.encode())
+        digest.update((oks_file.sha256 or "<missing>").encode())
+    return digest.hexdigest()
+
+
+def directory_size(path):
+    return sum(entry.stat().st_size for entry in Path(path).rglob("*") if entry.is_file())
+
+
+class ConfigCache:
+    def __init__(self, cache_dir, max_size_gb=max_cache_size_gb):
+        self.cache_dir = Path(cache_dir)
+        self.max_size_bytes = int(max_size_gb * 1024 * 1024 * 1024)
+
+    def entry_path(self, key):
+        return self.cache_dir / key
+
+    def lookup(self, key):
+        "The cache entry for key, or None; a hit marks the entry as recently used"
+        entry = self.entry_path(key)
+        if not (entry / result_file_name).exists():
+            return None
+        os.utime(entry)
+        return entry
+
+    def store(self, key, result, directories):
+        """Save a fixture result and copies of the directories that it refers to.
+
+        Returns False (and leaves the cache unchanged) when the result can't be pickled."""
+        try:
+            pickled_result = pickle.dumps((result, [str(directory) for directory in directories]))
+        except (pickle.PicklingError, AttributeError, TypeError):
+            return False
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        staging = self.cache_dir / f".{key}.tmp{os.getpid()}"
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir()
+        for index, directory in enumerate(directories):
+            shutil.copytree(directory, staging / str(index), symlinks=True)
+        (staging / result_file_name).write_bytes(pickled_result)
+        try:
+            os.rename(staging, self.entry_path(key))
+        except OSError:
+            # another process stored the same key first
+            shutil.rmtree(staging, ignore_errors=True)
+        self.evict()
+        return True
+
+    def restore(self, entry, destination):
+        "Copy a cache entry's directories under destination; returns the fixture result, pointing at the copies"
+        result, directories = pickle.loads((entry / result_file_name).read_bytes())
+        path_map = {}
+        for index, directory in enumerate(directories):
+            copy = Path(destination) / Path(directory).name
+            shutil.copytree(entry / str(index), copy, symlinks=True)
+            path_map[directory] = str(copy)
+        # generated files may refer to each other by absolute path
+        for copy in path_map.values():
+            for text_file in Path(copy).rglob("*"):
+                if text_file.suffix not in text_file_suffixes or not text_file.is_file():
+                    continue
+                text = text_file.read_text(errors="surrogateescape")
+                relocated_text = text
+                for old, new in path_map.items():
+                    relocated_text = relocated_text.replace(old, new)
+                if relocated_text != text:
+                    text_file.write_text(relocated_text, errors="surrogateescape")
+        return relocate(result, path_map)
+
+    def evict(self):
+        "Remove the least recently used entries until the cache fits within its size limit"
+        entries = [entry for entry in self.cache_dir.iterdir() if entry.is_dir() and not entry.name.startswith(".")]
+        sizes = {entry: directory_size(entry) for entry in entries}
+        total_size = sum(sizes.values())
+        for entry in sorted(entries, key=lambda entry: entry.stat().st_mtime):
+            if total_size <= self.max_size_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total_size -= sizes[entry]
+
+
+def result_directories(result, base_dir):
+    "The directories under base_dir that the attributes of a fixture result refer to"
+    base_dir = Path(base_dir).resolve()
+    directories = []
+    for value in vars(result).values() if hasattr(result, "__dict__") else []:
+        for item in value if isinstance(value, (list, tuple)) else [value]:
+            if isinstance(item, (str, Path)) and Path(item).is_dir() and base_dir in Path(item).resolve().parents:
+                if Path(item) not in directories:
+                    directories.append(Path(item))
+    return directories
+
+
+def relocate(obj, path_map):
+    "Replace the directories in path_map (and paths inside them) in the attributes of obj"
+    if isinstance(obj, (str, Path)):
+        for old, new in path_map.items():
+            if str(obj) == old or str(obj).startswith(old + os.sep):
+                relocated = new + str(obj)[len(old) :]
+                return Path(relocated) if isinstance(obj, Path) else relocated
+        return obj
+    if isinstance(obj, list):
+        return [relocate(item, path_map) for item in obj]
+    if isinstance(obj, tuple):
+        return tuple(relocate(item, path_map) for item in obj)
+    if isinstance(obj, dict):
+        return {key: relocate(value, path_map) for key, value in obj.items()}
+    if hasattr(obj, "__dict__"):
+        for name, value in vars(obj).items():
+            setattr(obj, name, relocate(value, path_map))
+    return obj
+
+
+def confgen_config_for(request):
+    "What is being generated: the parameter of the fixture and, when it names one, the confgen_arguments entry"
+    param = getattr(request, "param", None)
+    confgen_arguments = getattr(request.module, "confgen_arguments", {})
+    try:
+        config = confgen_arguments.get(param)
+    except TypeError:
+        config = None
+    return {"param": param, "config": config}
+
+
+def cache_enabled(request):
+    return bool(os.environ.get(cache_dir_env_var)) and getattr(request.module, "use_config_cache", True)
+
+
+# {FixtureDef: (cache, key, entry)} for the fixture setup that is in progress
+lookups = {}
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_fixture_setup(fixturedef, request):
+    if fixturedef.argname != config_fixture_name or not cache_enabled(request):
+        yield
+        return
+
+    test_dir = Path(request.module.__file__).parent
+    search_path = oks_snapshot.database_search_path([Path.cwd(), test_dir.parent])
+    key = cache_key(
+        confgen_config_for(request),
+        getattr(request.module, "object_databases", []),
+        search_path,
+    )
+    cache = ConfigCache(os.environ[cache_dir_env_var])
+    entry = cache.lookup(key)
+    lookups[fixturedef] = (cache, key, entry)
+    try:
+        outcome = yield
+    finally:
+        del lookups[fixturedef]
+
+    if entry is None and outcome.excinfo is None:
+        result = outcome.get_result()
+        base_dir = request.getfixturevalue("tmp_path_factory").getbasetemp()
+        if cache.store(key, result, result_directories(result, base_dir)):
+            print(f"Configuration saved in cache entry {key[:12]}")
+
+
+@pytest.hookimpl(tryfirst=True, specname="pytest_fixture_setup")
+def pytest_fixture_setup_from_cache(fixturedef, request):
+    "On a cache hit, the restored result is the value of the fixture, and the fixture function doesn't run"
+    cache, key, entry = lookups.get(fixturedef, (None, None, None))
+    if entry is None:
+        return None
+
+    start_time = time.monotonic()
+    destination = request.getfixturevalue("tmp_path_factory").mktemp("cached_config")
+    result = cache.restore(entry, destination)
+    # what pytest's own pytest_fixture_setup records once a fixture has run
+    fixturedef.cached_result = (result, fixturedef.cache_key(request), None)
+    print(f"Configuration restored from cache entry {key[:12]} in {time.monotonic() - start_time:.2f} s")
+    return result
@@ -0,0 +1,200 @@
+"""Persistent sidecar index of HDF5 raw-data and TP-stream output files.
+
+The first time a file is opened through ``open_data_file`` (or ``load_index``), its
+record/fragment index -- record and sequence numbers, fragment types, sizes, SourceIDs,
+file offsets and the timestamp window of every fragment -- is written next to it as
+``<file>.index.json``.  Later validations and ad-hoc queries load that sidecar instead
+of walking the HDF5 file again.  The sidecar stores the path, size and modification
+time of the file that it describes, and is rebuilt automatically when any of them no
+longer match.  ``dataflow_app`` tells which dataflow application wrote a data file (or
+a log file) from its name.
+
+Ad-hoc queries can be made from the command line::
+
+    python -m daqsystemtest.data_file_index <file.hdf5> [--fragment-type WIBEth]
+"""
+
+import argparse
+import json
+import os
+import re
+from pathlib import Path
+
+import h5py
+
+import daqsystemtest.lazy_data_file as lazy_data_file
+
+index_format_version = 1
+index_suffix = ".index.json"
+dataflow_app_pattern = re.compile(r"_(df-\d+)[_.]")  # in data file and log file names
+
+fragment_columns = [
+    "path",
+    "subsystem",
+    "source_id",
+    "fragment_type",
+    "size",
+    "offset",
+    "trigger_timestamp",
+    "window_begin",
+    "window_end",
+]
+
+
+def dataflow_app(file_name):
+    "The dataflow application ('df-01') in the name of a data or log file, or 'unknown'"
+    match_obj = dataflow_app_pattern.search(Path(file_name).name)
+    return match_obj.group(1) if match_obj else "unknown"
+
+
+def index_path(file_name):
+    file_path = Path(file_name)
+    return file_path.with_name(file_path.name + index_suffix)
+
+
+def file_signature(file_name):
+    stat_result = os.stat(file_name)
+    return {
+        "path": str(Path(file_name).resolve()),
+        "size": stat_result.st_size,
+        "mtime_ns": stat_result.st_mtime_ns,
+    }
+
+
+def records_to_json(records, signature):
+    json_records = []
+    for record in records:
+        json_records.append(
+            {
+                "name": record.name,
+                "headers": record.header_paths,
+                # stored column-wise, which keeps the sidecar small and quick to parse
+                "fragments": {
+                    column: [getattr(fragment, column) for fragment in record.fragments]
+                    for column in fragment_columns
+                },
+            }
+        )
+    return {
+        "format_version": index_format_version,
+        "file": signature,
+        "records": json_records,
+    }
+
+
+def records_from_json(index_json):
+    records = []
+    for json_record in index_json["records"]:
+        record = lazy_data_file.RecordEntry(json_record["name"])
+        record.header_paths = json_record["headers"]
+        columns = json_record["fragments"]
+        record.fragments = [
+            lazy_data_file.FragmentEntry(*values)
+            for values in zip(*(columns[column] for column in fragment_columns))
+        ]
+        records.append(record)
+    return records
+
+
+def write_index(file_name, records):
+    "Write the sidecar for file_name; failures (e.g. a read-only directory) are not fatal"
+    sidecar = index_path(file_name)
+    temporary_sidecar = sidecar.with_name(sidecar.name + f".tmp{os.getpid()}")
+    try:
+        with open(temporary_sidecar, "w") as index_file:
+            json.dump(records_to_json(records, file_signature(file_name)), index_file)
+        os.replace(temporary_sidecar, sidecar)
+    except OSError as error:
+        print(f"WARNING: unable to write the index for {file_name}: {error}")
+
+
+def read_valid_index(file_name):
+    "The records from file_name's sidecar, or None if there is no sidecar or it is out of date"
+    try:
+        with open(index_path(file_name)) as index_file:
+            index_json = json.load(index_file)
+    except (OSError, ValueError):
+        return None
+    if index_json.get("format_version") != index_format_version:
+        return None
+    if index_json.get("file") != file_signature(file_name):
+        return None
+    return records_from_json(index_json)
+
+
+def load_index(file_name):
+    "The record index of file_name, from its sidecar when that is current, otherwise freshly built (and saved)"
+    records = read_valid_index(file_name)
+    if records is None:
+        with h5py.File(file_name, "r") as h5file:
+            records = lazy_data_file.build_record_index(h5file, read_headers=True)
+        write_index(file_name, records)
+    return records
+
+
+def open_data_file(file_name):
+    "A LazyDataFile whose index comes from the sidecar when possible"
+    return lazy_data_file.LazyDataFile(file_name, load_index(file_name))
+
+
+def remove_index(file_name):
+    index_path(file_name).unlink(missing_ok=True)
+
+
+def summarize(records, hdf5_source_subsystem=None, fragment_type=None):
+    "Per fragment type: fragment count, SourceIDs, size range and timestamp range"
+    summary = {}
+    for record in records:
+        for fragment in record.fragments:
+            if hdf5_source_subsystem is not None and fragment.subsystem != hdf5_source_subsystem:
+                continue
+            if fragment_type is not None and fragment.fragment_type != fragment_type:
+                continue
+            entry = summary.setdefault(
+                (fragment.subsystem, fragment.fragment_type),
+                {
+                    "fragment_count": 0,
+                    "source_ids": set(),
+                    "min_size": fragment.size,
+                    "max_size": fragment.size,
+                    "first_window_begin": None,
+                    "last_window_end": None,
+                },
+            )
+            entry["fragment_count"] += 1
+            entry["source_ids"].add(fragment.source_id)
+            entry["min_size"] = min(entry["min_size"], fragment.size)
+            entry["max_size"] = max(entry["max_size"], fragment.size)
+            if fragment.window_begin is not None:
+                if entry["first_window_begin"] is None or fragment.window_begin < entry["first_window_begin"]:
+                    entry["first_window_begin"] = fragment.window_begin
+                if entry["last_window_end"] is None or fragment.window_end > entry["last_window_end"]:
+                    entry["last_window_end"] = fragment.window_end
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the sidecar index of HDF5 output files")
+    parser.add_argument("files", nargs="+", help="HDF5 files to query")
+    parser.add_argument("--subsystem", default=None, help="only report this HDF5 source subsystem")
+    parser.add_argument("--fragment-type", default=None, help="only report this fragment type")
+    args = parser.parse_args(argv)
+
+    for file_name in args.files:
+        records = load_index(file_name)
+        record_numbers = sorted({record.number for record in records if record.number is not None})
+        print(f"{file_name}: {len(records)} records", end="")
+        if record_numbers:
+            print(f" (record numbers {record_numbers[0]} to {record_numbers[-1]})", end="")
+        print("")
+        for (subsystem, fragment_type), entry in sorted(
+            summarize(records, args.subsystem, args.fragment_type).items()
+        ):
+            print(
+                f"    {subsystem} {fragment_type}: {entry['fragment_count']} fragments from {len(entry['source_ids'])} SourceIDs, "
+                f"sizes {entry['min_size']}-{entry['max_size']} bytes, timestamps {entry['first_window_begin']}-{entry['last_window_end']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
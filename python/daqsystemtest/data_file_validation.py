@@ -0,0 +1,276 @@
+"""Single-pass validation of HDF5 raw-data and TP-stream files.
+
+The functions in ``integrationtest.data_file_checks`` each walk every record in a file,
+so validating a file against N fragment-parameter dicts costs roughly 2N+2 passes over
+its ``RawData`` groups.  ``validate_data_file`` visits each record once, feeds every
+fragment dataset it finds to all of the registered checks (using the index that
+data_file_index keeps next to each file, so no fragment payloads are read), and returns a
+``DataFileValidation`` that holds the verdict, the details of each check and the
+per-SourceID size statistics of each fragment type (see fragment_statistics).
+``validate_data_files`` does the same for a list of files, validating each file in
+its own worker process.
+
+The fragment-parameter dicts are the ones that the integtests already define, e.g.::
+
+    wibeth_frag_params = {
+        "fragment_type_description": "WIBEth",
+        "fragment_type": "WIBEth",
+        "hdf5_source_subsystem": "Detector_Readout",
+        "expected_fragment_count": 2,
+        "min_size_bytes": 7272,
+        "max_size_bytes": 14472,
+    }
+"""
+
+import concurrent.futures
+import os
+import time
+
+import integrationtest.data_file_checks as data_file_checks
+import daqsystemtest.fragment_statistics as fragment_statistics
+import daqsystemtest.data_file_index as data_file_index
+
+# limit on the number of per-record problems that are printed for a single check
+max_reported_problems = 20
+
+# wall-clock seconds spent in validate_data_files, summed over the calls in this process
+validation_time = 0.0
+
+
+class CheckResult:
+    def __init__(self, description):
+        self.description = description
+        self.passed = True
+        self.problems = []
+        self.summary = ""
+
+    def fail(self, message):
+        self.passed = False
+        self.problems.append(message)
+
+    def print_report(self):
+        if self.passed:
+            print(f"\N{WHITE HEAVY CHECK MARK} {self.summary}")
+            return
+        for message in self.problems[:max_reported_problems]:
+            print(f"\N{POLICE CARS REVOLVING LIGHT} {message} \N{POLICE CARS REVOLVING LIGHT}")
+        if len(self.problems) > max_reported_problems:
+            print(
+                f"\N{POLICE CARS REVOLVING LIGHT} ... and {len(self.problems) - max_reported_problems} more problems in the '{self.description}' check \N{POLICE CARS REVOLVING LIGHT}"
+            )
+
+
+class FragmentCheck:
+    "Count and size bookkeeping for one fragment-parameter dict, filled in during the pass over the file"
+
+    def __init__(self, params):
+        self.params = params
+        self.count_result = CheckResult(
+            f"{params['fragment_type_description']} fragment count"
+        )
+        self.size_result = CheckResult(
+            f"{params['fragment_type_description']} fragment sizes"
+        )
+        self.record_fragment_count = 0
+        self.record_indices = []
+        self.source_ids = []
+        self.sizes = []
+        self.statistics = {}
+
+    def matches(self, subsystem, fragment_type):
+        return (
+            subsystem == self.params["hdf5_source_subsystem"]
+            and fragment_type == self.params["fragment_type"]
+        )
+
+    def start_record(self):
+        self.record_fragment_count = 0
+
+    def add_fragment(self, record_index, record_name, dataset_name, source_id, size):
+        self.record_fragment_count += 1
+        self.record_indices.append(record_index)
+        self.source_ids.append(source_id)
+        self.sizes.append(size)
+        if size < self.params["min_size_bytes"] or size > self.params["max_size_bytes"]:
+            self.size_result.fail(
+                f"{self.params['fragment_type_description']} fragment {dataset_name} in record {record_name} has size {size}, outside range [{self.params['min_size_bytes']}, {self.params['max_size_bytes']}]"
+            )
+
+    def end_record(self, record_name):
+        if self.record_fragment_count != self.params["expected_fragment_count"]:
+            self.count_result.fail(
+                f"Record {record_name} has an unexpected number of {self.params['fragment_type_description']} fragments: {self.record_fragment_count} (expected {self.params['expected_fragment_count']})"
+            )
+
+    def finish(self, record_count):
+        self.statistics = fragment_statistics.size_statistics(
+            self.record_indices, self.source_ids, self.sizes, record_count
+        )
+        self.count_result.summary = f"{self.params['fragment_type_description']} fragment count of {self.params['expected_fragment_count']} confirmed in all {record_count} records"
+        self.size_result.summary = f"All {self.params['fragment_type_description']} fragments in {record_count} records have sizes between {self.params['min_size_bytes']} and {self.params['max_size_bytes']}"
+
+
+class DataFileValidation:
+    "The outcome of validating one file: its record count and size, and a list of CheckResults"
+
+    def __init__(self, file_name):
+        self.file_name = str(file_name)
+        self.record_count = 0
+        self.size_bytes = 0
+        self.checks = []
+        self.fragment_statistics = {}
+
+    @property
+    def passed(self):
+        return all(check.passed for check in self.checks)
+
+    @property
+    def failed_checks(self):
+        return [check for check in self.checks if not check.passed]
+
+    def print_report(self):
+        print("")  # Clear potential dot from pytest
+        print(f"Validation of {self.file_name} ({self.record_count} records):")
+        for check in self.checks:
+            check.print_report()
+        for description, statistics in self.fragment_statistics.items():
+            for line in fragment_statistics.format_statistics(description, statistics):
+                print(line)
+
+
+def validate_data_file(
+    file_name,
+    expected_event_count=None,
+    event_count_tolerance=0,
+    fragment_check_list=None,
+    check_record_headers=True,
+    check_attributes=True,
+    print_report=True,
+):
+    """Validate a raw-data or TP-stream file with a single pass over its records.
+
+    This performs the equivalent of data_file_checks.sanity_check (when
+    check_record_headers is set), check_file_attributes, check_event_count (when
+    expected_event_count is given), and check_fragment_count plus check_fragment_sizes
+    for every dict in fragment_check_list.
+    """
+    validation = DataFileValidation(file_name)
+    validation.size_bytes = os.path.getsize(file_name)
+    fragment_checks = [FragmentCheck(params) for params in fragment_check_list or []]
+    header_result = CheckResult("record headers")
+
+    with data_file_index.open_data_file(file_name) as data_file:
+        validation.record_count = len(data_file.records)
+
+        for record_index, record in enumerate(data_file.records):
+            for fragment_check in fragment_checks:
+                fragment_check.start_record()
+            for fragment in record.fragments:
+                for fragment_check in fragment_checks:
+                    if fragment_check.matches(fragment.subsystem, fragment.fragment_type):
+                        fragment_check.add_fragment(
+                            record_index,
+                            record.name,
+                            fragment.path,
+                            fragment.source_id,
+                            fragment.size,
+                        )
+            if len(record.header_paths) != 1:
+                header_result.fail(
+                    f"Record {record.name} has {len(record.header_paths)} {record.header_name} datasets (expected 1)"
+                )
+            for fragment_check in fragment_checks:
+                fragment_check.end_record(record.name)
+
+        if check_attributes:
+            attribute_result = CheckResult("file attributes")
+            attribute_result.summary = "All Attribute tests passed"
+            if not data_file_checks.check_file_attributes(data_file):
+                attribute_result.fail(f"File attribute check failed for {file_name}")
+
+    if check_record_headers:
+        header_result.summary = "Sanity-check passed"
+        validation.checks.append(header_result)
+
+    if check_attributes:
+        validation.checks.append(attribute_result)
+
+    if expected_event_count is not None:
+        event_count_result = CheckResult("record count")
+        min_event_count = expected_event_count - event_count_tolerance
+        max_event_count = expected_event_count + event_count_tolerance
+        if validation.record_count < min_event_count or validation.record_count > max_event_count:
+            event_count_result.fail(
+                f"Record count {validation.record_count} is outside the tolerance of {event_count_tolerance} from an expected value of {expected_event_count}"
+            )
+        event_count_result.summary = f"Record count {validation.record_count} is within a tolerance of {event_count_tolerance} from an expected value of {expected_event_count}"
+        validation.checks.append(event_count_result)
+
+    for fragment_check in fragment_checks:
+        fragment_check.finish(validation.record_count)
+        validation.fragment_statistics[
+            fragment_check.params["fragment_type_description"]
+        ] = fragment_check.statistics
+        validation.checks.append(fragment_check.count_result)
+        validation.checks.append(fragment_check.size_result)
+
+    if print_report:
+        validation.print_report()
+    return validation
+
+
+def validate_data_files(
+    file_names,
+    expected_event_count=None,
+    event_count_tolerance=0,
+    fragment_check_list=None,
+    check_record_headers=True,
+    check_attributes=True,
+    max_workers=None,
+):
+    """Validate several files concurrently, one worker process per file.
+
+    The arguments are applied to every file in the same way as validate_data_file.
+    Returns the list of DataFileValidations in the same order as file_names; the
+    reports are printed in that order once all of the workers have finished.
+    """
+    global validation_time
+    start_time = time.perf_counter()
+    file_names = list(file_names)
+    if max_workers is None:
+        max_workers = min(len(file_names), os.cpu_count())
+
+    if len(file_names) < 2 or max_workers < 2:
+        validations = [
+            validate_data_file(
+                file_name,
+                expected_event_count,
+                event_count_tolerance,
+                fragment_check_list,
+                check_record_headers,
+                check_attributes,
+                print_report=False,
+            )
+            for file_name in file_names
+        ]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(
+                    validate_data_file,
+                    file_name,
+                    expected_event_count,
+                    event_count_tolerance,
+                    fragment_check_list,
+                    check_record_headers,
+                    check_attributes,
+                    False,
+                )
+                for file_name in file_names
+            ]
+            validations = [future.result() for future in futures]
+    validation_time += time.perf_counter() - start_time
+
+    for validation in validations:
+        validation.print_report()
+    return validations
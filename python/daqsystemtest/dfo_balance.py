@@ -0,0 +1,203 @@
+"""How evenly the DataFlowOrchestrator spreads trigger decisions over the dataflow applications.
+
+The DFO sends each TriggerDecision to a dataflow application that holds tokens
+(``df-tokens``); an application counts as busy once ``busy_threshold`` of its decisions
+are outstanding and as free again when it is down to ``free_threshold``, and while
+every application is busy the DFO inhibits the trigger.  ``dataflow_app_balance``
+reports for each dataflow application
+
+* the decisions assigned to it (the distinct trigger numbers in its output files),
+* its token round-trip time (from assignment to the returned token, the
+  ``max_completion_time`` in microseconds) and number of outstanding decisions
+  (``outstanding_decisions``), from the DFO's ``DFApplicationInfo`` OpMon entries
+  about that application,
+* the time it spent busy and how many busy intervals it had, from those entries and
+  the busy/free thresholds,
+
+``inhibited_seconds`` the time that the trigger was inhibited (the ``lc_kDead``
+milliseconds of the ``ModuleLevelTriggerInfo`` entries, which the trigger publishes
+per interval), and ``fairness`` Jain's fairness index of the decisions per
+application (1.0 is a perfectly even spread).  ``missing_opmon_fields`` lists the
+fields that a session didn't publish, so that a test can check that the metrics are
+based on data.  ``threshold_parameters`` and ``substitutions`` describe a sweep over
+the DFO thresholds, and ``format_results`` lays it out for the sweep's summary.
+"""
+
+import re
+
+import daqsystemtest.data_file_index as data_file_index
+import daqsystemtest.opmon_files as opmon_files
+
+dfo_conf_id = "dfoconf-01"
+dataflow_app_measurement = "DFApplicationInfo"
+outstanding_field = "outstanding_decisions"
+completion_time_field = "max_completion_time"  # microseconds
+trigger_measurement = "ModuleLevelTriggerInfo"
+dead_time_field = "lc_kDead"  # milliseconds since the previous publication
+dataflow_app_pattern = re.compile(r"df-\d+")
+time_field_unit_s = 1e-6
+balanced_fairness = 0.95  # a fairness index below this counts as unbalanced
+default_threshold_pairs = [(1, 0), (2, 1), (4, 2), (8, 4)]  # (busy_threshold, free_threshold)
+
+
+def threshold_parameters(threshold_pairs=default_threshold_pairs, td_send_retries=None):
+    "{'busy<busy threshold>_free<free threshold>': parameters}"
+    parameters = {}
+    for busy_threshold, free_threshold in threshold_pairs:
+        point = {"busy_threshold": busy_threshold, "free_threshold": free_threshold}
+        if td_send_retries is not None:
+            point["td_send_retries"] = td_send_retries
+        parameters[f"busy{busy_threshold}_free{free_threshold}"] = point
+    return parameters
+
+
+def substitutions(parameters):
+    return [{"obj_id": dfo_conf_id, "obj_class": "DFOConf", "updates": dict(parameters)}]
+
+
+def measurement_pattern(measurement):
+    return re.compile(rf"(^|\.){measurement}$")
+
+
+def missing_opmon_fields(opmon_file_names):
+    "The '<measurement>.<field>' names that the balance metrics need and that no OpMon entry published"
+    needed = {
+        dataflow_app_measurement: [outstanding_field, completion_time_field],
+        trigger_measurement: [dead_time_field],
+    }
+    missing = []
+    for measurement, fields in needed.items():
+        samples = opmon_files.read_samples(opmon_file_names, measurement_pattern(measurement))
+        for field in fields:
+            if not any(field in sample for sample in samples):
+                missing.append(f"{measurement}.{field}")
+    return missing
+
+
+def decisions_per_app(data_files):
+    "{dataflow application: number of trigger decisions that it wrote records for}"
+    decisions = {}
+    for file_name in data_files:
+        app = data_file_index.dataflow_app(file_name)
+        if app == "unknown":  # e.g. TP-stream files
+            continue
+        trigger_numbers = {record.number for record in data_file_index.load_index(file_name) if record.number is not None}
+        decisions[app] = decisions.get(app, 0) + len(trigger_numbers)
+    return decisions
+
+
+def fairness(values):
+    "Jain's fairness index: 1.0 when all values are equal, 1/n when one value has everything"
+    values = list(values)
+    if not values or not any(values):
+        return None
+    return sum(values) ** 2 / (len(values) * sum(value * value for value in values))
+
+
+def dataflow_app(sample):
+    match_obj = dataflow_app_pattern.search(sample["source"])
+    return match_obj.group(0) if match_obj else None
+
+
+def busy_time(samples, busy_threshold, free_threshold):
+    "(seconds busy, number of busy intervals) from a time series of outstanding decisions"
+    busy_seconds = 0.0
+    intervals = 0
+    busy = False
+    previous_time = None
+    for sample_time, outstanding in samples:
+        if busy and previous_time is not None:
+            busy_seconds += sample_time - previous_time
+        if not busy and outstanding >= busy_threshold:
+            busy = True
+            intervals += 1
+        elif busy and outstanding <= free_threshold:
+            busy = False
+        previous_time = sample_time
+    return busy_seconds, intervals
+
+
+def dataflow_app_balance(data_files, opmon_file_names, busy_threshold, free_threshold):
+    """{dataflow application: {'decisions', 'token_round_trip_max_ms', 'max_outstanding',
+    'busy_seconds', 'busy_intervals'}}"""
+    outstanding = {}
+    round_trips = {}
+    for sample in opmon_files.read_samples(opmon_file_names, measurement_pattern(dataflow_app_measurement)):
+        app = dataflow_app(sample)
+        if app is None:
+            continue
+        if outstanding_field in sample:
+            outstanding.setdefault(app, []).append((sample["time"], sample[outstanding_field]))
+        if sample.get(completion_time_field, 0) > 0:
+            round_trips.setdefault(app, []).append(sample[completion_time_field])
+
+    decisions = decisions_per_app(data_files)
+    balance = {}
+    for app in sorted(set(decisions) | set(outstanding) | set(round_trips)):
+        app_outstanding = outstanding.get(app, [])
+        busy_seconds, busy_intervals = (
+            busy_time(app_outstanding, busy_threshold, free_threshold) if app_outstanding else (None, None)
+        )
+        balance[app] = {
+            "decisions": decisions.get(app, 0),
+            "token_round_trip_max_ms": max(round_trips[app]) * time_field_unit_s * 1000 if app in round_trips else None,
+            "max_outstanding": max(value for sample_time, value in app_outstanding) if app_outstanding else None,
+            "busy_seconds": busy_seconds,
+            "busy_intervals": busy_intervals,
+        }
+    return balance
+
+
+def inhibited_seconds(opmon_file_names):
+    "Seconds that the trigger was inhibited, or None if the trigger doesn't publish it"
+    total_ms = None
+    for sample in opmon_files.read_samples(opmon_file_names, measurement_pattern(trigger_measurement)):
+        if dead_time_field in sample:
+            total_ms = (total_ms or 0.0) + sample[dead_time_field]
+    return total_ms / 1000 if total_ms is not None else None
+
+
+def format_balance(balance, inhibited=None):
+    lines = []
+    for app, app_balance in balance.items():
+        round_trip = (
+            f"{app_balance['token_round_trip_max_ms']:.1f} ms"
+            if app_balance["token_round_trip_max_ms"] is not None
+            else "not published"
+        )
+        busy = (
+            f"busy {app_balance['busy_seconds']:.1f} s in {app_balance['busy_intervals']} intervals"
+            if app_balance["busy_seconds"] is not None
+            else "busy time not published"
+        )
+        lines.append(f"    {app}: {app_balance['decisions']} decisions, max token round trip {round_trip}, {busy}")
+    index = fairness(app_balance["decisions"] for app_balance in balance.values())
+    if index is not None:
+        verdict = "balanced" if index >= balanced_fairness else "\N{POLICE CARS REVOLVING LIGHT} NOT balanced"
+        lines.append(f"    fairness index {index:.3f}: {verdict}")
+    if inhibited is not None:
+        lines.append(f"    trigger inhibited for {inhibited:.1f} s")
+    return lines
+
+
+def best_thresholds(results):
+    "The sweep result with the highest throughput, the fairest spread breaking ties; None for no results"
+    if not results:
+        return None
+    return max(results, key=lambda result: (result["records_per_second"], result["fairness"] or 0.0))
+
+
+def format_results(results):
+    "Lines of a table of the sweep results, and the thresholds with the highest throughput"
+    lines = []
+    for result in sorted(results, key=lambda result: result["busy_threshold"]):
+        inhibited = f"{result['inhibited_seconds']:.1f} s" if result["inhibited_seconds"] is not None else "not published"
+        index = f"{result['fairness']:.3f}" if result["fairness"] is not None else "n/a"
+        lines.append(
+            f"    busy_threshold {result['busy_threshold']}, free_threshold {result['free_threshold']}: "
+            f"{result['records_per_second']:.2f} records/s, fairness {index}, inhibited {inhibited}"
+        )
+    best = best_thresholds(results)
+    if best is not None:
+        lines.append(f"Highest throughput with busy_threshold {best['busy_threshold']}, free_threshold {best['free_threshold']}")
+    return lines
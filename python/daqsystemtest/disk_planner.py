@@ -0,0 +1,168 @@
+"""Disk space planning and rolling pruning of the raw-data output of integtests.
+
+``expected_data_bytes`` computes how much raw data a session writes from its trigger
+rate, run length, readout window, number of data producers and frame size, so that a
+test can decide before booting whether its output fits on the disk.  When it doesn't
+fit all at once, the test can set ``rolling_output_pruning = True``.  This module is a
+pytest plugin that then validates every output file as soon as the dataflow
+application has closed it (HDF5DataStore writes to ``<name>.hdf5.writing`` and renames
+the file when it is complete), using the test module's
+``validate_closed_data_file(file_name)`` function, and deletes the files that passed
+while the run continues.  The disk then only has to hold the files that are open, or
+closed and not yet validated, which ``rolling_data_bytes`` estimates.
+
+The validations of the pruned files (and of the failed files, which are kept for
+inspection) are attached to the fixture's result as ``run_nanorc.pruned_data_files``,
+and the files whose validation raised an exception (which are kept as well) as
+``run_nanorc.pruning_errors``.  ``unvalidated_data_files`` lists the output files of
+a session that the pruner didn't validate, so that a test can check that every file
+went through its validation.
+"""
+
+import math
+import threading
+import traceback
+from pathlib import Path
+
+import pytest
+
+import daqsystemtest.data_file_index as data_file_index
+
+wibeth_frame_size = 7200  # bytes
+ticks_per_wibeth_frame = 2048
+fragment_header_size = 72  # bytes
+hdf5_overhead_fraction = 0.02  # record headers, trigger candidates and HDF5 metadata
+default_safety_factor = 1.5
+closed_file_glob = "*.hdf5"
+poll_interval = 2.0  # seconds
+
+
+def frames_per_window(readout_window_ticks, ticks_per_frame=ticks_per_wibeth_frame):
+    return math.ceil(readout_window_ticks / ticks_per_frame) + 1
+
+
+def record_data_bytes(readout_window_ticks, data_producers, frame_size=wibeth_frame_size, ticks_per_frame=ticks_per_wibeth_frame):
+    "Bytes of detector data that one trigger reads out, over all data producers"
+    fragment_size = fragment_header_size + frame_size * frames_per_window(readout_window_ticks, ticks_per_frame)
+    return data_producers * fragment_size * (1 + hdf5_overhead_fraction)
+
+
+def expected_data_bytes(
+    trigger_rate,
+    run_duration,
+    readout_window_ticks,
+    data_producers,
+    number_of_runs=1,
+    frame_size=wibeth_frame_size,
+    ticks_per_frame=ticks_per_wibeth_frame,
+):
+    "Bytes of raw data that a session writes in total"
+    triggers_per_run = math.ceil(trigger_rate * run_duration)
+    return number_of_runs * triggers_per_run * record_data_bytes(readout_window_ticks, data_producers, frame_size, ticks_per_frame)
+
+
+def rolling_data_bytes(
+    max_file_size,
+    dataflow_apps,
+    largest_record_bytes,
+    total_data_bytes=None,
+):
+    """Bytes that have to be on disk at the same time with rolling pruning.
+
+    Each dataflow application has at most one file open (which can grow to
+    max_file_size plus the record that pushed it over) and one closed file waiting for
+    its validation.  Never more than the whole output, when total_data_bytes is given."""
+    peak = dataflow_apps * 2 * (max_file_size + largest_record_bytes)
+    if total_data_bytes is not None:
+        peak = min(peak, total_data_bytes)
+    return peak
+
+
+def required_disk_space_gb(data_bytes, safety_factor=default_safety_factor):
+    return data_bytes * safety_factor / (1024 * 1024 * 1024)
+
+
+def unvalidated_data_files(data_files, validations):
+    "The data files (.hdf5) that none of the validations (DataFileValidations) covers"
+    validated = {Path(validation.file_name).resolve() for validation in validations}
+    return [
+        data_file
+        for data_file in data_files
+        if Path(data_file).suffix == ".hdf5" and Path(data_file).resolve() not in validated
+    ]
+
+
+class RollingPruner:
+    """Validates each closed output file under base_dir with validate(file_name), which
+    returns a DataFileValidation, and deletes the file (and its index) if it passed.
+
+    Files that were there before the pruner was created are left alone.  A file whose
+    validation raises is kept, and the exception is recorded in errors ({file name:
+    traceback text}) instead of stopping the pruning of the other files."""
+
+    def __init__(self, base_dir, validate, interval=poll_interval):
+        self.base_dir = Path(base_dir)
+        self.validate = validate
+        self.interval = interval
+        self.validations = {}
+        self.errors = {}
+        self.earlier_files = set(self.closed_files())
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+
+    def closed_files(self):
+        return [str(path) for path in self.base_dir.rglob(closed_file_glob)]
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        "Stops the polling, then validates and prunes the files that were closed last"
+        self._stop_event.set()
+        self._thread.join()
+        self.prune()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.prune()
+
+    def prune(self):
+        for file_name in sorted(self.closed_files()):
+            if file_name in self.earlier_files or file_name in self.validations or file_name in self.errors:
+                continue
+            try:
+                validation = self.validate(file_name)
+            except Exception:
+                self.errors[file_name] = traceback.format_exc()
+                print(f"\N{POLICE CARS REVOLVING LIGHT} The validation of {file_name} failed, the file is kept: {self.errors[file_name]}")
+                continue
+            self.validations[file_name] = validation
+            if validation.passed:
+                Path(file_name).unlink()
+                data_file_index.remove_index(file_name)
+            else:
+                validation.print_report()
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_fixture_setup(fixturedef, request):
+    if fixturedef.argname != "run_nanorc" or not getattr(request.module, "rolling_output_pruning", False):
+        yield
+        return
+
+    base_dir = request.getfixturevalue("tmp_path_factory").getbasetemp()
+    pruner = RollingPruner(base_dir, request.module.validate_closed_data_file)
+    pruner.start()
+    outcome = yield
+    pruner.stop()
+    if outcome.excinfo is not None:
+        return
+
+    run_nanorc = outcome.get_result()
+    run_nanorc.pruned_data_files = list(pruner.validations.values())
+    run_nanorc.pruning_errors = dict(pruner.errors)
+    deleted = sum(1 for validation in run_nanorc.pruned_data_files if validation.passed)
+    print("")
+    print(f"Rolling pruning validated {len(pruner.validations)} data files and deleted {deleted} of them")
+    if pruner.errors:
+        print(f"\N{POLICE CARS REVOLVING LIGHT} {len(pruner.errors)} data files could not be validated \N{POLICE CARS REVOLVING LIGHT}")
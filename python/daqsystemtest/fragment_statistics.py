@@ -0,0 +1,132 @@
+"""NumPy-based fragment statistics for HDF5 raw-data and TP-stream files.
+
+``size_statistics`` turns the (record, SourceID, size) triplets of one fragment type into
+per-SourceID size distributions, percentiles, outliers and the number of records that
+miss a fragment, in one vectorized step.  ``read_fragment_headers`` reads the 72-byte
+Fragment headers of many fragments into a single structured array in one gather from a
+memory map of the file, without touching the fragment payloads.
+"""
+
+import re
+
+import numpy as np
+
+# daqdataformats::FragmentHeader (version 5), as written at the start of every fragment dataset
+fragment_header_dtype = np.dtype(
+    [
+        ("fragment_header_marker", "<u4"),
+        ("version", "<u4"),
+        ("size", "<u8"),
+        ("trigger_number", "<u8"),
+        ("trigger_timestamp", "<u8"),
+        ("window_begin", "<u8"),
+        ("window_end", "<u8"),
+        ("run_number", "<u4"),
+        ("error_bits", "<u4"),
+        ("fragment_type", "<u4"),
+        ("sequence_number", "<u2"),
+        ("detector_id", "<u2"),
+        ("source_id_version", "<u2"),
+        ("source_id_subsystem", "<u2"),
+        ("source_id", "<u4"),
+    ]
+)
+fragment_header_size = fragment_header_dtype.itemsize  # 72 bytes
+
+# e.g. "Detector_Readout_0x00000064_WIBEth" or "Trigger_0x00002710_Trigger_Candidate"
+fragment_dataset_name_pattern = re.compile(
+    r"^(?P<subsystem>.+?)_0x(?P<source_id>[0-9a-fA-F]+)_(?P<fragment_type>.+)$"
+)
+
+percentiles = [1, 50, 90, 99]
+outlier_iqr_factor = 1.5
+
+
+def parse_fragment_dataset_name(dataset_name):
+    "Returns (subsystem, source_id, fragment_type) for a fragment dataset, or None for anything else"
+    match_obj = fragment_dataset_name_pattern.match(dataset_name.split("/")[-1])
+    if match_obj is None:
+        return None
+    return (
+        match_obj.group("subsystem"),
+        int(match_obj.group("source_id"), 16),
+        match_obj.group("fragment_type"),
+    )
+
+
+def size_statistics(record_indices, source_ids, sizes, record_count):
+    """Per-SourceID size and count statistics for one fragment type.
+
+    record_indices, source_ids and sizes are equal-length sequences with one entry per
+    fragment.  Returns a dict keyed by SourceID, each entry holding the fragment count,
+    the number of records without a fragment from that SourceID, min/mean/max/std and
+    percentile sizes, and the record indices of the size outliers (outside the Tukey
+    fences, outlier_iqr_factor * IQR beyond the quartiles).
+    """
+    record_indices = np.asarray(record_indices, dtype=np.int64)
+    source_ids = np.asarray(source_ids, dtype=np.int64)
+    sizes = np.asarray(sizes, dtype=np.int64)
+    statistics = {}
+    if sizes.size == 0:
+        return statistics
+
+    order = np.lexsort((sizes, source_ids))
+    sorted_ids = source_ids[order]
+    sorted_sizes = sizes[order]
+    sorted_records = record_indices[order]
+    unique_ids, first_index, counts = np.unique(
+        sorted_ids, return_index=True, return_counts=True
+    )
+
+    for source_id, start, count in zip(unique_ids, first_index, counts):
+        group_sizes = sorted_sizes[start : start + count]
+        group_records = sorted_records[start : start + count]
+        quantiles = np.percentile(group_sizes, [25, 75] + percentiles)
+        q1, q3 = quantiles[0], quantiles[1]
+        iqr = q3 - q1
+        outlier_mask = (group_sizes < q1 - outlier_iqr_factor * iqr) | (
+            group_sizes > q3 + outlier_iqr_factor * iqr
+        )
+        statistics[int(source_id)] = {
+            "fragment_count": int(count),
+            "records_without_fragment": int(
+                record_count - np.unique(group_records).size
+            ),
+            "min_size": int(group_sizes[0]),
+            "max_size": int(group_sizes[-1]),
+            "mean_size": float(group_sizes.mean()),
+            "std_size": float(group_sizes.std()),
+            "percentile_sizes": {
+                p: float(value) for p, value in zip(percentiles, quantiles[2:])
+            },
+            "outlier_records": sorted(int(r) for r in group_records[outlier_mask]),
+        }
+    return statistics
+
+
+def read_fragment_headers(file_name, offsets):
+    """The Fragment headers of the fragments that start at the given byte offsets of a file,
+    as one array of dtype fragment_header_dtype.
+
+    The offsets are those of contiguously stored fragment datasets (see
+    lazy_data_file.FragmentEntry.offset), each at least fragment_header_size bytes long."""
+    offsets = np.asarray(offsets, dtype=np.int64)
+    if offsets.size == 0:
+        return np.zeros(0, dtype=fragment_header_dtype)
+    file_map = np.memmap(file_name, dtype=np.uint8, mode="r")
+    header_bytes = file_map[offsets[:, None] + np.arange(fragment_header_size)]
+    return np.ascontiguousarray(header_bytes).view(fragment_header_dtype)[:, 0]
+
+
+def format_statistics(description, statistics):
+    "One summary line per SourceID, for printing alongside the validation report"
+    lines = []
+    for source_id, entry in sorted(statistics.items()):
+        percentile_text = ", ".join(
+            f"p{p}={value:.0f}" for p, value in entry["percentile_sizes"].items()
+        )
+        lines.append(
+            f"    {description} 0x{source_id:08x}: {entry['fragment_count']} fragments, sizes min={entry['min_size']} {percentile_text} max={entry['max_size']}, "
+            f"{len(entry['outlier_records'])} outliers, missing from {entry['records_without_fragment']} records"
+        )
+    return lines
@@ -0,0 +1,365 @@
+"""Resource-aware scheduler for running several integtests concurrently on one host.
+
+Each integtest can declare what it needs from the computer through the module-level
+globals ``minimum_cpu_count``, ``minimum_free_memory_gb`` and
+``minimum_free_disk_space_gb``.  The scheduler reads those values (without importing
+the test), packs as many tests onto the host as fit, and runs each one in its own
+working directory with its own pytest ``--basetemp`` and its own connectivity-service
+port.  Two instances of the same test file are never run at the same time, since
+they would share a session name.
+
+With ``--split-variants``, each ``confgen_arguments`` variant of a test file is run as
+a job of its own (through the pytest node IDs of that variant), so that the scheduler
+can fit the variants of a long test in between the jobs of other test files.  The
+variants of a file share its resource minimums, and they still run one after another:
+they share the file's session name, which the Session substitutions and the session's
+processes and log files are keyed on.
+
+This module is normally invoked through ``daqsystemtest_integtest_bundle.sh --parallel``.
+"""
+
+import argparse
+import ast
+import datetime
+import os
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import psutil
+
+# Values that are assumed for tests that don't declare their needs
+default_cpu_count = 4
+default_free_memory_gb = 4
+default_free_disk_space_gb = 2
+
+connectivity_port_env_var = "DAQSYSTEMTEST_CONNECTIVITY_PORT"
+first_connectivity_port = 15000
+poll_interval = 1.0  # seconds
+
+
+class TestRequirements:
+    def __init__(self, cpu_count, free_memory_gb, free_disk_space_gb):
+        self.cpu_count = cpu_count
+        self.free_memory_gb = free_memory_gb
+        self.free_disk_space_gb = free_disk_space_gb
+
+    def fits_within(self, cpu_count, free_memory_gb, free_disk_space_gb):
+        return (
+            self.cpu_count <= cpu_count
+            and self.free_memory_gb <= free_memory_gb
+            and self.free_disk_space_gb <= free_disk_space_gb
+        )
+
+    def __str__(self):
+        return f"{self.cpu_count} CPUs, {self.free_memory_gb} GB memory, {self.free_disk_space_gb} GB disk"
+
+
+def read_test_requirements(test_path):
+    "Read the resource minimums that an integtest declares as module-level literals"
+    tree = ast.parse(Path(test_path).read_text(), filename=str(test_path))
+    declared = {}
+    for node in tree.body:
+        if (
+            isinstance(node, ast.Assign)
+            and len(node.targets) == 1
+            and isinstance(node.targets[0], ast.Name)
+        ):
+            try:
+                declared[node.targets[0].id] = ast.literal_eval(node.value)
+            except ValueError:
+                pass
+    return TestRequirements(
+        declared.get("minimum_cpu_count", default_cpu_count),
+        declared.get("minimum_free_memory_gb", default_free_memory_gb),
+        declared.get("minimum_free_disk_space_gb", default_free_disk_space_gb),
+    )
+
+
+def session_isolation_substitutions():
+    """Config substitutions that move the connectivity service to the port that the
+    scheduler assigned to this test.  Returns an empty list when the test is run on
+    its own, so the standard configuration is used unchanged."""
+    port = os.environ.get(connectivity_port_env_var)
+    if port is None:
+        return []
+
+    import integrationtest.data_classes as data_classes
+
+    # mirrors the local-connection-server definition in config/daqsystemtest/ccm.data.xml
+    connection_server_command = [
+        "Process PID $$;",
+        "trap 'pkill -INT -P $$' EXIT;",
+        f"gunicorn -b 0.0.0.0:{port} --workers=1 --worker-class=gthread --threads=2 --timeout 5000000000 --log-level=info connection-service.connection-flask:app",
+    ]
+    return [
+        data_classes.config_substitution(
+            obj_id="local-connectivity-service",
+            obj_class="Service",
+            updates={"port": int(port)},
+        ),
+        data_classes.config_substitution(
+            obj_id="local-connection-server",
+            obj_class="ConnectionService",
+            updates={"commandline_parameters": connection_server_command},
+        ),
+    ]
+
+
+def read_test_variants(test_path):
+    """{variant name: [pytest node IDs]} of an integtest, from pytest's own collection.
+
+    Tests that aren't parametrized go with the first variant.  Returns an empty dict for
+    a test without parametrized variants."""
+    completed = subprocess.run(
+        [sys.executable, "-m", "pytest", "--collect-only", "-q", "-p", "no:cacheprovider", str(test_path)],
+        cwd=Path(test_path).resolve().parent,
+        capture_output=True,
+        text=True,
+    )
+    variants = {}
+    unparametrized = []
+    for line in completed.stdout.splitlines():
+        match_obj = re.match(r"^\S+?::(\S+)\[(.+)\]$", line.strip())
+        if match_obj:
+            variants.setdefault(match_obj.group(2), []).append(
+                f"{Path(test_path).resolve()}::{match_obj.group(1)}[{match_obj.group(2)}]"
+            )
+            continue
+        match_obj = re.match(r"^\S+?::(\S+)$", line.strip())
+        if match_obj:
+            unparametrized.append(f"{Path(test_path).resolve()}::{match_obj.group(1)}")
+    if variants:
+        next(iter(variants.values())).extend(unparametrized)
+    return variants
+
+
+def port_is_free(port):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        try:
+            sock.bind(("", port))
+        except OSError:
+            return False
+    return True
+
+
+class ScheduledTest:
+    def __init__(self, test_path, iteration, requirements, variant=None, node_ids=None):
+        self.test_path = Path(test_path).resolve()
+        self.name = self.test_path.name
+        self.iteration = iteration
+        self.requirements = requirements
+        self.variant = variant
+        self.node_ids = node_ids
+        self.process = None
+        self.port = None
+        self.work_dir = None
+        self.log_path = None
+        self.start_time = None
+        self.end_time = None
+        self.returncode = None
+
+    @property
+    def label(self):
+        return self.name if self.variant is None else f"{self.name}[{self.variant}]"
+
+    def conflicts_with(self, other):
+        "Jobs of the same test file never run together, since their sessions have the same name"
+        return other.name == self.name
+
+    @property
+    def elapsed(self):
+        if self.start_time is None:
+            return 0.0
+        end_time = self.end_time if self.end_time is not None else time.monotonic()
+        return end_time - self.start_time
+
+    def launch(self, top_dir, port):
+        self.port = port
+        job_name = self.test_path.stem if self.variant is None else f"{self.test_path.stem}_{self.variant}"
+        self.work_dir = top_dir / f"{job_name}_{self.iteration}"
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        self.log_path = self.work_dir / "pytest_output.log"
+        env = dict(os.environ)
+        env[connectivity_port_env_var] = str(port)
+        command = [
+            sys.executable,
+            "-m",
+            "pytest",
+            "-s",
+            *(self.node_ids if self.node_ids else [str(self.test_path)]),
+            f"--basetemp={self.work_dir / 'pytest'}",
+        ]
+        self.start_time = time.monotonic()
+        with open(self.log_path, "w") as log_file:
+            self.process = subprocess.Popen(
+                command,
+                cwd=self.work_dir,
+                env=env,
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+            )
+
+    def poll(self):
+        if self.process is None or self.returncode is not None:
+            return self.returncode
+        self.returncode = self.process.poll()
+        if self.returncode is not None:
+            self.end_time = time.monotonic()
+        return self.returncode
+
+
+class IntegtestScheduler:
+    def __init__(self, tests, output_path, bundle_log_file=None, stop_on_failure=False):
+        self.pending = list(tests)
+        self.running = []
+        self.finished = []
+        self.output_path = Path(output_path)
+        self.bundle_log_file = bundle_log_file
+        self.stop_on_failure = stop_on_failure
+
+        disk_space = shutil.disk_usage(self.output_path)
+        self.cpu_count = os.cpu_count()
+        self.free_memory_gb = psutil.virtual_memory().available / (1024 * 1024 * 1024)
+        self.free_disk_space_gb = disk_space.free / (1024 * 1024 * 1024)
+
+        # first-fit decreasing: place the biggest tests first, keeping the repeat order of each test
+        self.pending.sort(
+            key=lambda test: (
+                -test.requirements.cpu_count,
+                -test.requirements.free_memory_gb,
+            )
+        )
+
+    def report(self, message):
+        print(message, flush=True)
+        if self.bundle_log_file is not None:
+            with open(self.bundle_log_file, "a") as log_file:
+                log_file.write(message + "\n")
+
+    def unreserved_resources(self):
+        cpu_count = self.cpu_count
+        free_memory_gb = self.free_memory_gb
+        free_disk_space_gb = self.free_disk_space_gb
+        for test in self.running:
+            cpu_count -= test.requirements.cpu_count
+            free_memory_gb -= test.requirements.free_memory_gb
+            free_disk_space_gb -= test.requirements.free_disk_space_gb
+        return cpu_count, free_memory_gb, free_disk_space_gb
+
+    def next_free_port(self):
+        ports_in_use = [test.port for test in self.running]
+        port = first_connectivity_port
+        while port in ports_in_use or not port_is_free(port):
+            port += 1
+        return port
+
+    def launch_what_fits(self, top_dir):
+        for test in list(self.pending):
+            if any(test.conflicts_with(other) for other in self.running):
+                continue
+            # a test that is bigger than the whole computer is allowed to run on its own
+            if self.running and not test.requirements.fits_within(
+                *self.unreserved_resources()
+            ):
+                continue
+            test.launch(top_dir, self.next_free_port())
+            self.pending.remove(test)
+            self.running.append(test)
+            self.report(
+                f"===== Launched {test.label} (iteration {test.iteration}, needs {test.requirements}, connectivity port {test.port})"
+            )
+
+    def collect_finished(self):
+        for test in list(self.running):
+            if test.poll() is None:
+                continue
+            self.running.remove(test)
+            self.finished.append(test)
+            if self.bundle_log_file is not None:
+                with open(self.bundle_log_file, "a") as log_file:
+                    log_file.write(f"===== Running {test.label}\n")
+                    log_file.write(test.log_path.read_text())
+            status = "passed" if test.returncode == 0 else "FAILED"
+            print(
+                f"===== Finished {test.label} (iteration {test.iteration}) {status} in {test.elapsed:.1f} s, output in {test.log_path}",
+                flush=True,
+            )
+            if test.returncode != 0 and self.stop_on_failure:
+                self.pending = []
+
+    def run(self, top_dir):
+        top_dir = Path(top_dir)
+        self.report(
+            f"===== Host has {self.cpu_count} CPUs, {self.free_memory_gb:.1f} GB free memory and {self.free_disk_space_gb:.1f} GB free disk in {self.output_path}"
+        )
+        wallclock_start = time.monotonic()
+        while self.pending or self.running:
+            self.launch_what_fits(top_dir)
+            time.sleep(poll_interval)
+            self.collect_finished()
+        wallclock_time = time.monotonic() - wallclock_start
+
+        serial_time = sum(test.elapsed for test in self.finished)
+        self.report("")
+        self.report("+++++ Parallel schedule summary +++++")
+        for test in self.finished:
+            status = "passed" if test.returncode == 0 else "FAILED"
+            self.report(
+                f"    {test.label} (iteration {test.iteration}): {status}, {test.elapsed:.1f} s"
+            )
+        self.report(f"Sum of individual test times (serial estimate): {serial_time:.1f} s")
+        self.report(f"Wall-clock time of the parallel schedule: {wallclock_time:.1f} s")
+        if wallclock_time > 0:
+            self.report(
+                f"Time saved: {serial_time - wallclock_time:.1f} s (speedup {serial_time / wallclock_time:.2f}x)"
+            )
+        return all(test.returncode == 0 for test in self.finished)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run integtests concurrently, packed onto this host according to their declared resource needs"
+    )
+    parser.add_argument("tests", nargs="+", help="integtest files to run")
+    parser.add_argument("-n", type=int, default=1, help="number of times to run each individual test")
+    parser.add_argument("-N", type=int, default=1, help="number of times to run the full set of tests")
+    parser.add_argument("--stop-on-failure", action="store_true", help="don't launch further tests after a failure")
+    parser.add_argument(
+        "--split-variants",
+        action="store_true",
+        help="run each confgen_arguments variant of a test as a job of its own, so they can fit in between other tests",
+    )
+    parser.add_argument("--log-file", default=None, help="bundle log file to append test output to")
+    parser.add_argument(
+        "--output-path",
+        default=f"/tmp/pytest-of-{os.environ.get('USER', 'unknown')}",
+        help="directory under which each test gets its own working area",
+    )
+    args = parser.parse_args(argv)
+
+    tests = []
+    for overall_loop in range(args.N):
+        for test_path in args.tests:
+            requirements = read_test_requirements(test_path)
+            variants = read_test_variants(test_path) if args.split_variants else {}
+            for individual_loop in range(args.n):
+                iteration = overall_loop * args.n + individual_loop
+                if not variants:
+                    tests.append(ScheduledTest(test_path, iteration, requirements))
+                for variant, node_ids in variants.items():
+                    tests.append(ScheduledTest(test_path, iteration, requirements, variant, node_ids))
+
+    timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+    top_dir = Path(args.output_path) / f"daqsystemtest_parallel_{timestamp}"
+    top_dir.mkdir(parents=True, exist_ok=True)
+    scheduler = IntegtestScheduler(tests, top_dir, args.log_file, args.stop_on_failure)
+    return 0 if scheduler.run(top_dir) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
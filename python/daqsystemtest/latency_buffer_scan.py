@@ -0,0 +1,117 @@
+"""Helpers for scanning LatencyBuffer settings.
+
+``scan_parameters`` lists every combination of ``def-latency-buf`` size and allocation
+mode (``numa_aware``, ``preallocation``, ``intrinsic_allocator``), and ``substitutions``
+resizes the buffer and switches on the allocation of a mode.  ``point_result``
+condenses what one session showed (the readout applications' memory use and page
+faults from process_monitor, the request-handler warnings in the readout logs, and
+whether the data files passed validation) into a dict, and
+``smallest_sustaining_sizes`` picks, for each allocation mode, the smallest buffer with
+which the readout window was served without problems.
+"""
+
+import re
+
+import daqsystemtest.log_scanner as log_scanner
+
+latency_buffer_id = "def-latency-buf"
+
+allocation_modes = {
+    "default": {},
+    "preallocation": {"preallocation": True},
+    "intrinsic_allocator": {"intrinsic_allocator": True},
+    "numa_aware": {"numa_aware": True, "numa_node": 0},  # node 0 exists on every host
+}
+
+# the datahandlinglibs issues with which the readout request handlers report that the
+# buffer didn't hold the requested data: (issue class, start of its message)
+request_handler_issues = {
+    "empty_buffer": ("RequestOnEmptyBuffer", "Request on empty buffer"),
+    "timeout": ("VerboseRequestTimedOut", "Request timed out"),
+    "data_not_found": ("TrmWithEmptyFragment", "Trigger Matching result with empty fragment"),
+}
+request_handler_warnings = {
+    kind: re.compile("|".join(rf"\b{re.escape(text)}\b" for text in issue))
+    for kind, issue in request_handler_issues.items()
+}
+readout_app_pattern = re.compile(r"^ru")  # application names
+readout_log_pattern = re.compile(r"_ru[^/]*$")  # log file names, log_<user>_<session>_<application>...
+
+
+def scan_parameters(sizes, modes=allocation_modes):
+    "{'<mode>_<size>': parameters} for every size and allocation mode"
+    return {f"{mode_name}_{size}": {"mode": mode_name, "size": size} for mode_name in modes for size in sizes}
+
+
+def substitutions(parameters, modes=allocation_modes):
+    return [
+        {
+            "obj_id": latency_buffer_id,
+            "obj_class": "LatencyBuffer",
+            "updates": {"size": parameters["size"], **modes[parameters["mode"]]},
+        }
+    ]
+
+
+def request_handler_warning_counts(log_files):
+    "{warning kind: number of lines} in the logs of the readout applications"
+    counts = {kind: 0 for kind in request_handler_warnings}
+    scanner = log_scanner.LogScanner()
+    for log_file in log_files:
+        if not readout_log_pattern.search(str(log_file)):
+            continue
+        for line in scanner.scan_file(log_file).all_problems():
+            for kind, pattern in request_handler_warnings.items():
+                if pattern.search(line):
+                    counts[kind] += 1
+    return counts
+
+
+def point_result(parameters, run_nanorc, data_files_passed):
+    "Summary of one scan point"
+    process_statistics = getattr(run_nanorc, "process_statistics", {})
+    readout_statistics = [
+        statistics
+        for name, statistics in process_statistics.items()
+        if readout_app_pattern.search(name)
+    ]
+    warning_counts = request_handler_warning_counts(run_nanorc.log_files)
+    return {
+        **parameters,
+        "readout_max_rss_bytes": sum(statistics["max_rss_bytes"] for statistics in readout_statistics),
+        "readout_minor_page_faults": sum(statistics["minor_page_faults"] for statistics in readout_statistics),
+        "readout_major_page_faults": sum(statistics["major_page_faults"] for statistics in readout_statistics),
+        "request_handler_warnings": warning_counts,
+        "data_files_passed": data_files_passed,
+        "sustained": data_files_passed and not any(warning_counts.values()),
+    }
+
+
+def smallest_sustaining_sizes(results):
+    "{mode: smallest size that sustained the readout window, or None}"
+    smallest = {}
+    for result in results:
+        smallest.setdefault(result["mode"], None)
+        if result["sustained"] and (
+            smallest[result["mode"]] is None or result["size"] < smallest[result["mode"]]
+        ):
+            smallest[result["mode"]] = result["size"]
+    return smallest
+
+
+def format_results(results, default_size=None):
+    lines = []
+    for result in sorted(results, key=lambda result: (result["mode"], result["size"])):
+        warnings_text = ", ".join(f"{kind}={count}" for kind, count in result["request_handler_warnings"].items())
+        status = "sustained" if result["sustained"] else "NOT sustained"
+        lines.append(
+            f"    {result['mode']:>20} size {result['size']:>8}: {status}, readout RSS {result['readout_max_rss_bytes'] / (1024 * 1024):.0f} MB, "
+            f"page faults {result['readout_minor_page_faults']} minor / {result['readout_major_page_faults']} major, warnings {warnings_text}"
+        )
+    for mode, size in smallest_sustaining_sizes(results).items():
+        if size is None:
+            lines.append(f"    {mode}: no scanned size sustained the readout window")
+        else:
+            comparison = f" ({size / default_size:.0%} of the default {default_size})" if default_size else ""
+            lines.append(f"    {mode}: smallest sustaining size is {size}{comparison}")
+    return lines
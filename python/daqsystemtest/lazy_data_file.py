@@ -0,0 +1,219 @@
+"""Lazy, bounded-memory access to the records in an HDF5 raw-data or TP-stream file.
+
+``LazyDataFile`` can be used wherever ``integrationtest.data_file_checks.DataFile`` is
+expected (it has the same ``h5file``, ``events`` and ``name`` members), but it also
+builds an index of every record and every fragment dataset in it (name, SourceID,
+fragment type, size and byte offset in the file) when it is opened.  Fragment payloads
+are only read when asked for, either as a read-only memory-mapped view or in
+fixed-size chunks, so the memory needed to check a file does not grow with the size
+of its fragments.
+"""
+
+import os
+import re
+
+import h5py
+import numpy as np
+
+import daqsystemtest.fragment_statistics as fragment_statistics
+
+record_name_pattern = re.compile(
+    r"^(?P<prefix>[A-Za-z]+)(?P<number>\d+)(\.(?P<sequence>\d+))?$"
+)
+default_chunk_size = 1024 * 1024  # bytes
+
+
+class FragmentEntry:
+    __slots__ = (
+        "path",
+        "subsystem",
+        "source_id",
+        "fragment_type",
+        "size",
+        "offset",
+        "trigger_timestamp",
+        "window_begin",
+        "window_end",
+    )
+
+    def __init__(
+        self,
+        path,
+        subsystem,
+        source_id,
+        fragment_type,
+        size,
+        offset,
+        trigger_timestamp=None,
+        window_begin=None,
+        window_end=None,
+    ):
+        self.path = path
+        self.subsystem = subsystem
+        self.source_id = source_id
+        self.fragment_type = fragment_type
+        self.size = size
+        self.offset = offset  # None when the dataset isn't stored contiguously
+        # filled in from the Fragment header when the index is built with read_headers=True
+        self.trigger_timestamp = trigger_timestamp
+        self.window_begin = window_begin
+        self.window_end = window_end
+
+
+class RecordEntry:
+    __slots__ = ("name", "number", "sequence_number", "header_paths", "fragments")
+
+    def __init__(self, name):
+        self.name = name
+        match_obj = record_name_pattern.match(name)
+        self.number = int(match_obj.group("number")) if match_obj else None
+        self.sequence_number = (
+            int(match_obj.group("sequence"))
+            if match_obj and match_obj.group("sequence")
+            else 0
+        )
+        self.header_paths = []
+        self.fragments = []
+
+    @property
+    def header_name(self):
+        match_obj = record_name_pattern.match(self.name)
+        return f"{match_obj.group('prefix')}Header" if match_obj else "Header"
+
+
+def set_header_fields(fragment, header):
+    fragment.trigger_timestamp = int(header["trigger_timestamp"])
+    fragment.window_begin = int(header["window_begin"])
+    fragment.window_end = int(header["window_end"])
+
+
+def build_record_index(h5file, read_headers=False):
+    """Index every record in an open h5py.File.
+
+    No dataset contents are read, except for the Fragment headers (the first 72 bytes
+    of each fragment) when read_headers is set.  The headers of contiguously stored
+    fragments are read together in one batch once every record has been indexed.
+    """
+    records = []
+    batched_fragments = []  # contiguous fragments whose headers are read in one batch
+    for record_name in sorted(h5file.keys()):
+        record = RecordEntry(record_name)
+        records.append(record)
+        raw_data = h5file[record_name].get("RawData")
+        if raw_data is None:
+            continue
+        header_name = record.header_name
+
+        def index_dataset(name, obj):
+            if not isinstance(obj, h5py.Dataset):
+                return
+            path = f"{record_name}/RawData/{name}"
+            if name.split("/")[-1] == header_name:
+                record.header_paths.append(path)
+                return
+            parsed_name = fragment_statistics.parse_fragment_dataset_name(name)
+            if parsed_name is None:
+                return
+            subsystem, source_id, fragment_type = parsed_name
+            fragment = FragmentEntry(
+                path,
+                subsystem,
+                source_id,
+                fragment_type,
+                obj.shape[0],
+                obj.id.get_offset(),
+            )
+            if read_headers and fragment.size >= fragment_statistics.fragment_header_size:
+                if fragment.offset is not None:
+                    batched_fragments.append(fragment)
+                else:
+                    header = np.frombuffer(
+                        obj[: fragment_statistics.fragment_header_size].tobytes(),
+                        dtype=fragment_statistics.fragment_header_dtype,
+                    )[0]
+                    set_header_fields(fragment, header)
+            record.fragments.append(fragment)
+
+        raw_data.visititems(index_dataset)
+
+    if batched_fragments:
+        headers = fragment_statistics.read_fragment_headers(
+            h5file.filename, [fragment.offset for fragment in batched_fragments]
+        )
+        for fragment, header in zip(batched_fragments, headers):
+            set_header_fields(fragment, header)
+    return records
+
+
+class LazyDataFile:
+    def __init__(self, filename, records=None):
+        self.name = str(filename)
+        self.h5file = h5py.File(filename, "r")
+        self.records = (
+            records if records is not None else build_record_index(self.h5file)
+        )
+        self.events = [record.name for record in self.records]
+        self._file_map = None
+        self._file_descriptor = None
+
+    def close(self):
+        if self._file_descriptor is not None:
+            os.close(self._file_descriptor)
+            self._file_descriptor = None
+        self._file_map = None
+        self.h5file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def fragments(self, hdf5_source_subsystem=None, fragment_type=None):
+        "Yields (record, fragment) pairs, optionally restricted to one subsystem and/or fragment type"
+        for record in self.records:
+            for fragment in record.fragments:
+                if (
+                    hdf5_source_subsystem is not None
+                    and fragment.subsystem != hdf5_source_subsystem
+                ):
+                    continue
+                if fragment_type is not None and fragment.fragment_type != fragment_type:
+                    continue
+                yield record, fragment
+
+    def fragment_view(self, fragment, start=0, stop=None):
+        """A read-only view of (part of) a fragment's bytes.
+
+        Contiguous datasets are served from a memory map of the whole file, so no
+        bytes are read until the view is used; other datasets are read through h5py.
+        """
+        stop = fragment.size if stop is None else min(stop, fragment.size)
+        if fragment.offset is None:
+            return self.h5file[fragment.path][start:stop]
+        if self._file_map is None:
+            self._file_map = np.memmap(self.name, dtype=np.uint8, mode="r")
+        return self._file_map[fragment.offset + start : fragment.offset + stop]
+
+    def iter_fragment_chunks(self, fragment, chunk_size=default_chunk_size):
+        "Yields a fragment's bytes in pieces of at most chunk_size bytes"
+        if fragment.offset is None:
+            dataset = self.h5file[fragment.path]
+            for start in range(0, fragment.size, chunk_size):
+                yield dataset[start : start + chunk_size]
+            return
+        if self._file_descriptor is None:
+            self._file_descriptor = os.open(self.name, os.O_RDONLY)
+        for start in range(0, fragment.size, chunk_size):
+            length = min(chunk_size, fragment.size - start)
+            yield np.frombuffer(
+                os.pread(self._file_descriptor, length, fragment.offset + start),
+                dtype=np.uint8,
+            )
+
+    def fragment_header(self, fragment):
+        "The fragment's daqdataformats FragmentHeader as a numpy record"
+        header_bytes = np.array(
+            self.fragment_view(fragment, 0, fragment_statistics.fragment_header_size)
+        )
+        return header_bytes.view(fragment_statistics.fragment_header_dtype)[0]
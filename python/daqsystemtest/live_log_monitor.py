@@ -0,0 +1,159 @@
+"""Watch the log files of a DAQ session while the drunc commands are still running.
+
+This module is a pytest plugin.  When an integtest lists it in its ``pytest_plugins``,
+an asyncio tailer is started in a background thread each time the ``run_nanorc``
+fixture starts a session.  The tailer picks up every ``log_*.txt`` file that appears
+under pytest's base temporary directory, follows it with the incremental
+``log_scanner.LogScanner`` and checks new lines against the test's
+``ignored_logfile_problems``.  What happens at the first problem that isn't ignored is
+set by the module-level ``live_log_action`` global of the test:
+
+* ``"flag"`` (the default): the problem, and when it was seen, is reported straight away;
+* ``"abort"``: the problem is reported and the drunc processes that ``run_nanorc``
+  started (the shell, its process manager and the applications that it launched) are
+  terminated, so that ``run_nanorc`` finishes early (and test_nanorc_success fails);
+* ``"off"``: no live monitoring.
+
+Nothing is aborted in tests that set ``check_for_logfile_errors = False``.  When the
+session has finished, what the tailer has read is handed over to
+``log_scanner.default_scanner``, so the ``test_log_files`` check only needs to read the
+last lines of each log file.
+"""
+
+import asyncio
+import signal
+import threading
+import time
+from pathlib import Path
+
+import psutil
+import pytest
+
+import daqsystemtest.log_scanner as log_scanner
+
+default_action = "flag"
+poll_interval = 0.5  # seconds
+log_file_glob = "log_*.txt"
+drunc_command_marker = "drunc"  # in the command line of the processes that "abort" terminates
+terminate_timeout = 10  # seconds
+
+
+class LiveLogMonitor:
+    def __init__(self, watch_dir, ignored_problem_map={}, action=default_action):
+        self.watch_dir = Path(watch_dir)
+        self.ignored_problem_map = ignored_problem_map
+        self.action = action
+        self.scanner = log_scanner.LogScanner()
+        # logs of earlier sessions in the same pytest run are not ours to judge
+        self.preexisting_logs = set(self.find_logs())
+        self.first_problem = None
+        self.aborted = False
+        self.start_time = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def find_logs(self):
+        return [str(path) for path in self.watch_dir.rglob(log_file_glob)]
+
+    def start(self):
+        self.start_time = time.monotonic()
+        self._thread = threading.Thread(
+            target=asyncio.run, args=(self.watch(),), daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    async def watch(self):
+        tails = {}
+        while not self._stop_event.is_set():
+            for log_file in self.find_logs():
+                if log_file not in tails and log_file not in self.preexisting_logs:
+                    tails[log_file] = asyncio.create_task(self.tail(log_file))
+            await asyncio.sleep(poll_interval)
+        for task in tails.values():
+            await task
+
+    async def tail(self, log_file):
+        ignore_patterns = log_scanner.ignore_patterns_for_file(
+            log_file, self.ignored_problem_map
+        )
+        while True:
+            finishing = self._stop_event.is_set()
+            # a line that is still being written is left for the next scan
+            state = self.scanner.scan_file(log_file, ignore_patterns, final=False)
+            if state.problems and self.first_problem is None:
+                await self.problem_found(log_file, state.problems[0])
+            if finishing:
+                break
+            await asyncio.sleep(poll_interval)
+
+    async def problem_found(self, log_file, line):
+        elapsed = time.monotonic() - self.start_time
+        self.first_problem = (log_file, line, elapsed)
+        print("")
+        print(
+            f"\N{POLICE CARS REVOLVING LIGHT} Problem seen in {Path(log_file).name} {elapsed:.1f} s into the session: {line} \N{POLICE CARS REVOLVING LIGHT}",
+            flush=True,
+        )
+        if self.action == "abort":
+            print("Aborting the session", flush=True)
+            self.aborted = True
+            processes = terminate_session_processes()
+            # wait for them without blocking the tails of the other log files
+            await asyncio.get_running_loop().run_in_executor(
+                None, psutil.wait_procs, processes, terminate_timeout
+            )
+
+
+def drunc_processes():
+    "The drunc processes that this pytest process started, with every process that they launched"
+    processes = []
+    for child in psutil.Process().children():
+        try:
+            if any(drunc_command_marker in part for part in child.cmdline()):
+                processes += [child] + child.children(recursive=True)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return processes
+
+
+def terminate_session_processes():
+    "Send SIGTERM to the drunc process tree of the session; returns the processes that were signalled"
+    processes = drunc_processes()
+    for process in processes:
+        try:
+            process.send_signal(signal.SIGTERM)
+        except psutil.NoSuchProcess:
+            pass
+    return processes
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_fixture_setup(fixturedef, request):
+    if fixturedef.argname != "run_nanorc":
+        yield
+        return
+
+    action = getattr(request.module, "live_log_action", default_action)
+    if action == "abort" and not getattr(request.module, "check_for_logfile_errors", True):
+        action = "flag"
+    if action == "off":
+        yield
+        return
+
+    monitor = LiveLogMonitor(
+        request.getfixturevalue("tmp_path_factory").getbasetemp(),
+        getattr(request.module, "ignored_logfile_problems", {}),
+        action,
+    )
+    monitor.start()
+    try:
+        yield
+    finally:
+        monitor.stop()
+        log_scanner.default_scanner.states.update(monitor.scanner.states)
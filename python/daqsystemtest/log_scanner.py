@@ -0,0 +1,209 @@
+"""Incremental scanning of DAQ application log files for errors and warnings.
+
+``logs_are_error_free`` accepts the same arguments as
+``integrationtest.log_file_checks.logs_are_error_free``, but works differently:
+
+* the ignore patterns that apply to a log file (from every key of the
+  ignored-problem map that matches the file name) are compiled into one combined
+  regular expression, once per distinct pattern set;
+* each file is read in large binary blocks, and only the lines that contain one of
+  the problem markers are decoded and compared against the ignore patterns;
+* a ``LogScanner`` remembers how far it has read each file (and the problems it found
+  there), so that checking the same files again, e.g. after each run of a multi-run
+  session, only reads the bytes that were added since the previous check.  The verdict
+  still covers the whole file.
+
+Truncated or replaced log files are detected (from their size and inode) and scanned
+again from the start.  A last line that doesn't end in a newline yet may still be
+being written: the stored offset stops before it, and it is only checked by a final
+scan (the default), whose verdict on it is replaced by the next scan of the file.
+"""
+
+import functools
+import os
+import re
+import time
+from pathlib import Path
+
+# lines containing one of these are considered to be problems, as in log_file_checks
+problem_markers = [b"ERROR", b"WARNING", b"FATAL"]
+problem_pattern = re.compile(b"|".join(re.escape(marker) for marker in problem_markers))
+
+block_size = 4 * 1024 * 1024  # bytes
+
+
+@functools.lru_cache(maxsize=None)
+def compile_ignore_patterns(patterns):
+    "One regular expression that matches a line if any of the (tuple of) patterns does, or None for no patterns"
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+
+
+def ignore_patterns_for_file(log_file, ignored_problem_map):
+    "The tuple of ignore patterns from every ignored_problem_map key that matches the log file name"
+    patterns = []
+    for key, key_patterns in ignored_problem_map.items():
+        if re.search(key, str(log_file)):
+            patterns.extend(key_patterns)
+    return tuple(patterns)
+
+
+class LogFileState:
+    "What is known about one log file: how far it has been read and what was found there"
+
+    def __init__(self, inode):
+        self.inode = inode
+        self.offset = 0
+        self.line_count = 0
+        self.problems = []
+        self.ignored_problem_count = 0
+        # what the last final scan found in an unterminated last line, which isn't part of offset
+        self.trailing_problems = []
+        self.trailing_ignored_problem_count = 0
+
+    def all_problems(self):
+        return self.problems + self.trailing_problems
+
+
+class LogScanner:
+    def __init__(self, block_size=block_size):
+        self.block_size = block_size
+        self.states = {}
+        self.bytes_scanned = 0
+        self.scan_time = 0.0  # seconds spent in logs_are_error_free
+
+    def forget(self, log_file=None):
+        "Drop what is known about one log file, or about all of them"
+        if log_file is None:
+            self.states = {}
+        else:
+            self.states.pop(str(log_file), None)
+
+    def scan_file(self, log_file, ignore_patterns=(), final=True):
+        """Read the part of log_file that hasn't been seen yet; returns its LogFileState.
+
+        The ignore patterns are expected to be the same for every scan of a given file.
+        An unterminated last line is only checked when final is set, for files that
+        aren't being written any more.
+        """
+        key = str(log_file)
+        stat_result = os.stat(log_file)
+        state = self.states.get(key)
+        if (
+            state is None
+            or state.inode != stat_result.st_ino
+            or stat_result.st_size < state.offset
+        ):
+            state = LogFileState(stat_result.st_ino)
+            self.states[key] = state
+        state.trailing_problems = []
+        state.trailing_ignored_problem_count = 0
+        if stat_result.st_size == state.offset:
+            return state
+
+        ignore_regex = compile_ignore_patterns(ignore_patterns)
+        with open(log_file, "rb") as log:
+            log.seek(state.offset)
+            remainder = b""
+            while True:
+                block = log.read(self.block_size)
+                if not block:
+                    break
+                self.bytes_scanned += len(block)
+                block = remainder + block
+                last_newline = block.rfind(b"\n")
+                remainder = block[last_newline + 1 :]
+                self.scan_lines(block[: last_newline + 1], state, ignore_regex)
+            state.offset = log.tell() - len(remainder)
+        if final and remainder:
+            trailing_state = LogFileState(state.inode)
+            self.scan_lines(remainder, trailing_state, ignore_regex)
+            state.trailing_problems = trailing_state.problems
+            state.trailing_ignored_problem_count = trailing_state.ignored_problem_count
+        return state
+
+    def scan_lines(self, lines, state, ignore_regex):
+        if not lines:
+            return
+        state.line_count += lines.count(b"\n")
+        search_start = 0
+        while True:
+            match_obj = problem_pattern.search(lines, search_start)
+            if match_obj is None:
+                break
+            line_start = lines.rfind(b"\n", 0, match_obj.start()) + 1
+            line_end = lines.find(b"\n", match_obj.end())
+            if line_end < 0:
+                line_end = len(lines)
+            search_start = line_end + 1
+            line = lines[line_start:line_end].decode(errors="replace").rstrip("\r")
+            if ignore_regex is not None and ignore_regex.search(line):
+                state.ignored_problem_count += 1
+            else:
+                state.problems.append(line)
+
+    def logs_are_error_free(
+        self,
+        log_file_names,
+        show_all_problems=True,
+        print_logfilename_for_problems=True,
+        ignored_problem_map={},
+    ):
+        start_time = time.perf_counter()
+        try:
+            return self.report_problems(
+                log_file_names,
+                show_all_problems,
+                print_logfilename_for_problems,
+                ignored_problem_map,
+            )
+        finally:
+            self.scan_time += time.perf_counter() - start_time
+
+    def report_problems(
+        self,
+        log_file_names,
+        show_all_problems,
+        print_logfilename_for_problems,
+        ignored_problem_map,
+    ):
+        all_ok = True
+        for log_file in log_file_names:
+            state = self.scan_file(
+                log_file, ignore_patterns_for_file(log_file, ignored_problem_map)
+            )
+            problems = state.all_problems()
+            if not problems:
+                continue
+            all_ok = False
+            if print_logfilename_for_problems:
+                print("----------")
+                print(f"Problem(s) found in logfile {Path(log_file).name}:")
+            for line in problems:
+                print(line)
+            ignored_problem_count = state.ignored_problem_count + state.trailing_ignored_problem_count
+            if ignored_problem_count > 0:
+                print(f"({ignored_problem_count} ignored problem(s) not shown)")
+            if not show_all_problems:
+                break
+        return all_ok
+
+
+# shared by the tests in one pytest process, so that repeated checks of a session's logs are incremental
+default_scanner = LogScanner()
+
+
+def logs_are_error_free(
+    log_file_names,
+    show_all_problems=True,
+    print_logfilename_for_problems=True,
+    ignored_problem_map={},
+):
+    "Drop-in replacement for log_file_checks.logs_are_error_free that uses default_scanner"
+    return default_scanner.logs_are_error_free(
+        log_file_names,
+        show_all_problems,
+        print_logfilename_for_problems,
+        ignored_problem_map,
+    )
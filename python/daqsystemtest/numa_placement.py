@@ -0,0 +1,183 @@
+"""NUMA placement of the readout applications and their latency buffers.
+
+``placement_parameters`` lists the placements of the readout applications on this
+computer's NUMA nodes, and ``substitutions`` places the latency buffers of one of them:
+
+* ``unpinned``: the configuration as it is,
+* ``pinned_node<N>``: the readout applications run on the cores of node N, and
+  ``def-latency-buf`` is allocated NUMA-aware on node N,
+* ``cross_node<M>_cpus<N>``: (on computers with more than one node) the buffers are
+  allocated on node M while the applications run on the cores of node N, which is the
+  cross-socket penalty that a wrong placement costs.
+
+The generated readout applications run on the shared ``vlocalhost``, whose
+ProcessingResource the other applications and the DPDK receivers use too, and a
+config substitution can't move them to another VirtualHost.  So the cores are not
+configured: this module is also a pytest plugin, and while ``run_nanorc`` runs a
+``ReadoutPinner`` sets the CPU affinity of every thread of the readout processes to
+the cores of the current variant's placement, which it finds in the test's
+``variant_parameters``.  Test-global ``enforce_numa_placement = False`` leaves the
+affinity to the applications.
+
+``readout_request_latency`` gives the response times of the readout data handlers
+(from request_handler_sweep.service_time_histograms), so that the placements can be
+compared on latency as well as on throughput.
+"""
+
+import os
+import re
+from pathlib import Path
+
+import psutil
+import pytest
+
+import daqsystemtest.benchmark as benchmark
+import daqsystemtest.process_monitor as process_monitor
+import daqsystemtest.request_handler_sweep as request_handler_sweep
+
+node_directory = Path("/sys/devices/system/node")
+latency_buffer_id = "def-latency-buf"
+readout_app_pattern = re.compile(r"^ru")
+
+
+def parse_cpu_list(text):
+    "'0-3,8,10-11' -> [0, 1, 2, 3, 8, 10, 11]"
+    cpus = []
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def numa_nodes():
+    "{node number: [cpus]} of this computer; a single node with every CPU when there is no NUMA information"
+    nodes = {}
+    for cpulist_path in sorted(node_directory.glob("node[0-9]*/cpulist")):
+        cpus = parse_cpu_list(cpulist_path.read_text())
+        if cpus:
+            nodes[int(cpulist_path.parent.name[len("node"):])] = cpus
+    if not nodes:
+        nodes[0] = sorted(os.sched_getaffinity(0))
+    return nodes
+
+
+def numad_running():
+    "True if the numad daemon, which moves processes between nodes, is running"
+    for process in psutil.process_iter(["name"]):
+        if process.info["name"] == "numad":
+            return True
+    return False
+
+
+def placement_parameters(nodes=None):
+    "{placement name: placement} with every placement of the module docstring"
+    if nodes is None:
+        nodes = numa_nodes()
+    placements = {"unpinned": (None, None)}
+    for node in nodes:
+        placements[f"pinned_node{node}"] = (node, node)
+    if len(nodes) > 1:
+        first, second = sorted(nodes)[:2]
+        placements[f"cross_node{first}_cpus{second}"] = (second, first)
+
+    return {
+        placement_name: {
+            "placement": placement_name,
+            "cpu_node": cpu_node,
+            "memory_node": memory_node,
+            "cpus": nodes[cpu_node] if cpu_node is not None else None,
+        }
+        for placement_name, (cpu_node, memory_node) in placements.items()
+    }
+
+
+def substitutions(placement):
+    if placement["memory_node"] is None:
+        return []
+    return [
+        {
+            "obj_id": latency_buffer_id,
+            "obj_class": "LatencyBuffer",
+            "updates": {"numa_aware": True, "numa_node": placement["memory_node"]},
+        },
+    ]
+
+
+class ReadoutPinner(process_monitor.ProcessMonitor):
+    "Keeps every thread of the readout processes on the given CPUs"
+
+    def __init__(self, cpus, root_pid=None, interval=process_monitor.sample_interval):
+        super().__init__(root_pid, interval)
+        self.cpus = set(cpus)
+        self.pinned_threads = set()  # (pid, thread id)
+
+    def sample(self):
+        for process in self.root.children(recursive=True):
+            try:
+                if not readout_app_pattern.search(process_monitor.application_name(process)):
+                    continue
+                for thread in process.threads():
+                    if (process.pid, thread.id) in self.pinned_threads:
+                        continue
+                    os.sched_setaffinity(thread.id, self.cpus)
+                    self.pinned_threads.add((process.pid, thread.id))
+            except (psutil.NoSuchProcess, psutil.AccessDenied, ProcessLookupError, PermissionError):
+                continue
+
+
+def readout_request_latency(opmon_file_names):
+    """{'readout_p99_interval_avg_ms', 'readout_max_response_ms'}: the worst interval-average
+    p99 and the largest response time of the readout applications' data handlers, or
+    None values when they published none"""
+    histograms = [
+        histogram
+        for link, histogram in request_handler_sweep.service_time_histograms(opmon_file_names).items()
+        if readout_app_pattern.search(link)
+    ]
+    return {
+        "readout_p99_interval_avg_ms": max((histogram["p99_interval_avg_ms"] for histogram in histograms), default=None),
+        "readout_max_response_ms": max((histogram["max_ms"] for histogram in histograms), default=None),
+    }
+
+
+def compare_placements(results):
+    """Change of each metric of every placement relative to the unpinned run.
+
+    results is {placement name: {metric: value}}; returns {placement name: {metric: relative change}}"""
+    reference = results.get("unpinned")
+    if reference is None:
+        return {}
+    changes = {}
+    for placement_name, metrics in results.items():
+        if placement_name == "unpinned":
+            continue
+        changes[placement_name] = {
+            metric: (value - reference[metric]) / reference[metric]
+            for metric, value in metrics.items()
+            if isinstance(value, (int, float)) and reference.get(metric)
+        }
+    return changes
+
+
+def current_placement(request):
+    return getattr(request.module, "variant_parameters", {}).get(benchmark.current_variant())
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_fixture_setup(fixturedef, request):
+    if fixturedef.argname != "run_nanorc" or not getattr(request.module, "enforce_numa_placement", True):
+        yield
+        return
+    placement = current_placement(request)
+    if placement is None or placement["cpus"] is None:
+        yield
+        return
+
+    pinner = ReadoutPinner(placement["cpus"])
+    pinner.start()
+    outcome = yield
+    pinner.stop()
+    if outcome.excinfo is None:
+        outcome.get_result().pinned_threads = len(pinner.pinned_threads)
@@ -0,0 +1,221 @@
+"""Python view of the daqsystemtest OKS databases, for test tooling.
+
+``include_graph`` walks the ``<include>`` graph that starts at one or more OKS data
+files and records the SHA-256 of every file in it; the config cache keys its entries
+on those hashes.  ``build_snapshot`` also parses every
+data file in the graph once, into an ``OksSnapshot``: a table of all objects (class,
+UID, attributes and relationships) and an index of which objects refer to each object,
+which the scans use to look up configuration objects.
+
+Schema files are part of the include graph but are not parsed.  Sessions are booted
+by the C++ OKS loaders, which read the XML themselves, so the snapshot is not used (and
+not needed) when a session is generated or booted.  ``default_snapshot`` returns the
+snapshot of the default root, parsed the first time that it is asked for in a process.
+The databases can also be queried from the command line::
+
+    python -m daqsystemtest.oks_snapshot --query LatencyBuffer def-latency-buf
+"""
+
+import argparse
+import functools
+import hashlib
+import os
+import re
+import sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+default_root = "config/daqsystemtest/integrationtest-objects.data.xml"
+
+include_pattern = re.compile(r'<file\s+path="([^"]+)"\s*/>')
+
+integer_types = ["s8", "u8", "s16", "u16", "s32", "u32", "s64", "u64"]
+float_types = ["float", "double"]
+
+
+def convert_value(oks_type, text):
+    if oks_type in integer_types:
+        return int(text, 0)
+    if oks_type in float_types:
+        return float(text)
+    if oks_type == "bool":
+        return text in ["1", "true"]
+    return text
+
+
+class OksObject:
+    __slots__ = ("class_name", "uid", "file_name", "attributes", "relations")
+
+    def __init__(self, class_name, uid, file_name):
+        self.class_name = class_name
+        self.uid = uid
+        self.file_name = file_name
+        self.attributes = {}  # name: value, or list of values for multi-value attributes
+        self.relations = {}  # name: list of (class, UID)
+
+    @property
+    def key(self):
+        return (self.class_name, self.uid)
+
+    def __repr__(self):
+        return f"{self.uid}@{self.class_name}"
+
+
+class OksFile:
+    __slots__ = ("name", "path", "sha256", "includes")
+
+    def __init__(self, name, path):
+        self.name = name  # as written in the <include> (or given as a root)
+        self.path = path  # None when the file can't be found in the search path
+        self.sha256 = None
+        self.includes = []
+
+
+def database_search_path(extra_dirs=[]):
+    "The directories that OKS include paths are relative to: $DUNEDAQ_DB_PATH, then extra_dirs"
+    search_path = [Path(entry) for entry in os.environ.get("DUNEDAQ_DB_PATH", "").split(":") if entry]
+    return search_path + [Path(entry) for entry in extra_dirs]
+
+
+def find_database_file(file_name, search_path):
+    if Path(file_name).is_absolute():
+        return str(file_name) if Path(file_name).exists() else None
+    for directory in search_path:
+        candidate = Path(directory) / file_name
+        if candidate.exists():
+            return str(candidate.resolve())
+    return None
+
+
+def include_graph(roots, search_path):
+    "Returns {file name: OksFile} for every file reachable from roots through <include> elements"
+    files = {}
+    pending = list(roots)
+    while pending:
+        file_name = str(pending.pop())
+        if file_name in files:
+            continue
+        oks_file = OksFile(file_name, find_database_file(file_name, search_path))
+        files[file_name] = oks_file
+        if oks_file.path is None:
+            continue
+        content = Path(oks_file.path).read_bytes()
+        oks_file.sha256 = hashlib.sha256(content).hexdigest()
+        oks_file.includes = include_pattern.findall(content.decode(errors="replace"))
+        pending.extend(reversed(oks_file.includes))
+    return files
+
+
+def parse_objects(file_name, path):
+    "The objects defined in one OKS data file"
+    objects = []
+    for element in ET.parse(path).getroot().iter("obj"):
+        obj = OksObject(element.get("class"), element.get("id"), file_name)
+        for child in element:
+            if child.tag == "attr":
+                oks_type = child.get("type", "-")
+                data = child.findall("data")
+                if data:
+                    obj.attributes[child.get("name")] = [convert_value(oks_type, item.get("val")) for item in data]
+                elif "val" in child.attrib:
+                    obj.attributes[child.get("name")] = convert_value(oks_type, child.get("val"))
+                else:
+                    obj.attributes[child.get("name")] = []
+            elif child.tag == "rel":
+                refs = child.findall("ref")
+                if refs:
+                    obj.relations[child.get("name")] = [(ref.get("class"), ref.get("id")) for ref in refs]
+                elif child.get("id"):
+                    obj.relations[child.get("name")] = [(child.get("class"), child.get("id"))]
+                else:
+                    obj.relations[child.get("name")] = []
+        objects.append(obj)
+    return objects
+
+
+class OksSnapshot:
+    def __init__(self, roots, files, objects):
+        self.roots = list(roots)
+        self.files = files
+        self.objects = {}
+        self.objects_by_class = {}
+        self.referrers_by_key = {}
+        for obj in objects:
+            self.objects[obj.key] = obj
+            self.objects_by_class.setdefault(obj.class_name, []).append(obj)
+        for obj in objects:
+            for relation_name, targets in obj.relations.items():
+                for target in targets:
+                    self.referrers_by_key.setdefault(target, []).append((obj, relation_name))
+
+    def get(self, class_name, uid):
+        return self.objects.get((class_name, uid))
+
+    def objects_of_class(self, class_name):
+        return list(self.objects_by_class.get(class_name, []))
+
+    def find(self, uid):
+        "All objects with the given UID, whatever their class"
+        return [obj for obj in self.objects.values() if obj.uid == uid]
+
+    def related(self, obj, relation_name):
+        "The objects that obj refers to through one of its relationships (unknown ones are left out)"
+        return [self.objects[target] for target in obj.relations.get(relation_name, []) if target in self.objects]
+
+    def referrers(self, obj):
+        "(object, relationship name) pairs for every object that refers to obj"
+        return list(self.referrers_by_key.get(obj.key, []))
+
+
+def build_snapshot(roots=[default_root], search_path=None):
+    if search_path is None:
+        search_path = database_search_path([Path.cwd()])
+    files = include_graph(roots, search_path)
+    objects = []
+    for oks_file in files.values():
+        if oks_file.path is not None and oks_file.path.endswith(".data.xml"):
+            objects.extend(parse_objects(oks_file.name, oks_file.path))
+    return OksSnapshot(roots, files, objects)
+
+
+@functools.lru_cache(maxsize=None)
+def default_snapshot():
+    "The snapshot of the default root, parsed when first needed"
+    return build_snapshot()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the objects of OKS databases")
+    parser.add_argument("roots", nargs="*", default=[default_root], help="OKS data files at the top of the include graph")
+    parser.add_argument("--query", nargs="+", metavar=("CLASS", "UID"), default=None, help="print the objects of a class, or one object")
+    args = parser.parse_args(argv)
+
+    snapshot = build_snapshot(args.roots)
+    missing_files = [oks_file.name for oks_file in snapshot.files.values() if oks_file.path is None]
+    print(
+        f"{len(snapshot.objects)} objects of {len(snapshot.objects_by_class)} classes from {len(snapshot.files)} files"
+        + (f" ({len(missing_files)} not found: {' '.join(missing_files)})" if missing_files else "")
+    )
+    if args.query is None:
+        return 0
+    if len(args.query) > 1:
+        selected = [snapshot.get(args.query[0], args.query[1])]
+        if selected[0] is None:
+            print(f"No {args.query[0]} object with UID {args.query[1]}")
+            return 1
+    else:
+        selected = snapshot.objects_of_class(args.query[0])
+    for obj in selected:
+        print(f"{obj!r} ({obj.file_name})")
+        for name, value in obj.attributes.items():
+            print(f"    {name} = {value}")
+        for name, targets in obj.relations.items():
+            print(f"    {name} -> {', '.join(f'{uid}@{class_name}' for class_name, uid in targets)}")
+        referrers = snapshot.referrers(obj)
+        if referrers:
+            print(f"    referred to by {', '.join(f'{referrer!r}.{name}' for referrer, name in referrers)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""Reading the OpMon files that the applications of an integtest session write.
+
+The sessions publish their operational monitoring to ``info*.json`` files (the
+``local-opmon-uri`` OpMonURI), one JSON-encoded OpMon entry per line.  ``read_samples``
+turns the entries of one kind of measurement into flat dicts with the time of the
+entry, its run number (when the entry carries one), where it came from, and the
+numeric values of its data.
+"""
+
+import datetime
+import json
+from pathlib import Path
+
+opmon_file_glob = "info*.json"
+
+
+def opmon_value(value):
+    "The number in an OpMon value ({'uint8Value': '12'} and the like), or None"
+    if isinstance(value, dict):
+        value = next(iter(value.values()), None)
+    if isinstance(value, bool):
+        return int(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def entry_time(entry):
+    text = entry.get("time", "")
+    try:
+        return datetime.datetime.fromisoformat(text.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def file_versions(base_dir):
+    "{path: modification time} of the OpMon files under base_dir"
+    return {str(path): path.stat().st_mtime_ns for path in Path(base_dir).rglob(opmon_file_glob)}
+
+
+def files_written_since(base_dir, earlier_versions):
+    "The OpMon files under base_dir that are new or have changed since file_versions returned earlier_versions"
+    return [
+        path
+        for path, mtime_ns in file_versions(base_dir).items()
+        if earlier_versions.get(path) != mtime_ns
+    ]
+
+
+def read_samples(opmon_files, measurement_pattern):
+    """Samples of the measurements whose name matches measurement_pattern, in time order.
+
+    Each sample is a dict with time, run, application, source (the application and the
+    substructure, joined with '/') and the numeric fields of the entry.  Lines that
+    aren't OpMon entries are skipped."""
+    samples = []
+    for opmon_file in opmon_files:
+        with open(opmon_file, errors="replace") as opmon_lines:
+            for line in opmon_lines:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(entry, dict) or not measurement_pattern.search(entry.get("measurement", "")):
+                    continue
+                timestamp = entry_time(entry)
+                if timestamp is None:
+                    continue
+                origin = entry.get("origin", {})
+                application = origin.get("application", "?")
+                fields = {}
+                for name, value in entry.get("data", {}).items():
+                    number = opmon_value(value)
+                    if number is not None:
+                        fields[name] = number
+                samples.append(
+                    {
+                        "time": timestamp,
+                        "run": entry.get("custom_origin", {}).get("run"),
+                        "application": application,
+                        "source": "/".join([application] + list(origin.get("substructure", []))),
+                        **fields,
+                    }
+                )
+    samples.sort(key=lambda sample: sample["time"])
+    return samples
@@ -0,0 +1,188 @@
+"""Performance measurements of integtest sessions, and a gate against stored baselines.
+
+This module is a pytest plugin and a command-line tool.
+
+As a plugin (listed in an integtest's ``pytest_plugins``), it records, for every
+``confgen_arguments`` variant that a test runs, one measurement in the JSON-lines file
+named by ``$DAQSYSTEMTEST_PERFORMANCE_MEASUREMENTS`` (nothing is recorded when that
+variable isn't set).  A measurement holds the records per second and MB per second
+written while triggers were enabled (see benchmark.measure_run) and the TriggerRecord
+build latency (the median of the DFO's per-interval maxima, see benchmark.build_latency),
+which are measured as soon as the session has finished (data files that the disk_planner
+plugin has already validated and deleted count with the record count and size from
+their validation), and the time that the test then spends checking the log files and
+validating the data files (which includes loading the data-file index that the first
+measurement built).
+
+From the command line, the measurements are compared with a baseline file that holds
+the expected value of each metric per host class, test and variant::
+
+    python -m daqsystemtest.performance_gate <measurements> --baseline-file <baselines.json> [--update-baseline]
+
+A metric regresses when it is worse than its baseline by more than its tolerance (see
+``metric_tolerances``); the tool then exits with a non-zero status.  Variants without
+a baseline are reported but don't fail the gate.  With ``--update-baseline`` the
+measured values replace those in the baseline file.
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+import daqsystemtest.benchmark as benchmark
+import daqsystemtest.data_file_validation as data_file_validation
+import daqsystemtest.log_scanner as log_scanner
+
+measurements_env_var = "DAQSYSTEMTEST_PERFORMANCE_MEASUREMENTS"
+
+# metric: (True if bigger is better, allowed relative change, allowed absolute change)
+# a metric regresses only if it is worse than its baseline by more than both of the allowed changes
+metric_tolerances = {
+    "records_per_second": (True, 0.10, 0.0),
+    "mb_per_second": (True, 0.10, 0.0),
+    "tr_build_latency_ms": (False, 0.25, 5.0),
+    "log_scan_time_s": (False, 0.50, 1.0),
+    "validation_time_s": (False, 0.50, 1.0),
+}
+
+
+def throughput_metrics(run_nanorc, command_list):
+    """Records per second, MB per second and build latency of a session.
+
+    Files that the disk_planner plugin validated and deleted during the session count
+    with the record count and size from their validation; the other data files are
+    measured from disk."""
+    duration = benchmark.triggering_duration(command_list)
+    pruned_files = [
+        validation for validation in getattr(run_nanorc, "pruned_data_files", []) if validation.passed
+    ]
+    pruned_paths = {Path(validation.file_name).resolve() for validation in pruned_files}
+    data_files = [
+        data_file for data_file in run_nanorc.data_files if Path(data_file).resolve() not in pruned_paths
+    ]
+    if duration <= 0 or not (data_files or pruned_files):
+        return {}
+    run_metrics = benchmark.measure_run(data_files, duration)
+    record_count = run_metrics["record_count"] + sum(validation.record_count for validation in pruned_files)
+    bytes_written = run_metrics["bytes_written"] + sum(validation.size_bytes for validation in pruned_files)
+    metrics = {
+        "records_per_second": record_count / duration,
+        "mb_per_second": bytes_written / duration / (1024 * 1024),
+    }
+    build_latency = benchmark.build_latency(getattr(run_nanorc, "opmon_files", []))["p50_interval_max_ms"]
+    if build_latency is not None:
+        metrics["tr_build_latency_ms"] = build_latency
+    return metrics
+
+
+# the outermost wrapper, so that the other plugins (e.g. disk_planner stopping its pruner,
+# queue_monitor collecting the OpMon files) have finished with run_nanorc before it is measured
+@pytest.hookimpl(hookwrapper=True, tryfirst=True)
+def pytest_fixture_setup(fixturedef, request):
+    outcome = yield
+    if fixturedef.argname != "run_nanorc" or measurements_env_var not in os.environ:
+        return
+    if outcome.excinfo is not None:
+        return
+
+    run_nanorc = outcome.get_result()
+    test_name = Path(request.module.__file__).name
+    variant_name = benchmark.current_variant()
+    # measured straight away, since some tests delete their data files
+    metrics = throughput_metrics(
+        run_nanorc, list(getattr(request.module, "nanorc_command_list", []))
+    )
+    log_scan_start = log_scanner.default_scanner.scan_time
+    validation_start = data_file_validation.validation_time
+
+    def record_measurement():
+        metrics["log_scan_time_s"] = log_scanner.default_scanner.scan_time - log_scan_start
+        metrics["validation_time_s"] = data_file_validation.validation_time - validation_start
+        benchmark.append_result(
+            test_name, variant_name, {}, metrics, os.environ[measurements_env_var]
+        )
+
+    # the log and data-file checks of this variant have run by the time the fixture is torn down
+    fixturedef.addfinalizer(record_measurement)
+
+
+def latest_measurements(measurements_file):
+    "{(host class, test, variant): metrics} with the last measurement of each"
+    latest = {}
+    with open(measurements_file) as measurements:
+        for line in measurements:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            latest[(entry["host"]["host_class"], entry["test"], entry["variant"])] = entry["metrics"]
+    return latest
+
+
+def compare_metric(metric, value, baseline_value):
+    "Returns (regressed, relative change) for one metric"
+    bigger_is_better, relative_tolerance, absolute_tolerance = metric_tolerances[metric]
+    change = value - baseline_value
+    worsening = -change if bigger_is_better else change
+    relative_change = change / baseline_value if baseline_value else 0.0
+    regressed = worsening > absolute_tolerance and worsening > relative_tolerance * abs(baseline_value)
+    return regressed, relative_change
+
+
+def compare(measurements, baselines):
+    "Print a comparison of every measured variant with its baseline; returns True if nothing regressed"
+    all_ok = True
+    for (host_class, test_name, variant_name), metrics in sorted(measurements.items()):
+        baseline = baselines.get(host_class, {}).get(test_name, {}).get(variant_name)
+        print(f"{test_name} [{variant_name}] on {host_class}:")
+        if baseline is None:
+            print("    no baseline for this host class, not compared")
+            continue
+        for metric, value in sorted(metrics.items()):
+            if metric not in metric_tolerances or metric not in baseline:
+                continue
+            regressed, relative_change = compare_metric(metric, value, baseline[metric])
+            if regressed:
+                all_ok = False
+                print(
+                    f"\N{POLICE CARS REVOLVING LIGHT} {metric} = {value:.3f}, baseline {baseline[metric]:.3f} ({relative_change:+.1%}) \N{POLICE CARS REVOLVING LIGHT}"
+                )
+            else:
+                print(
+                    f"\N{WHITE HEAVY CHECK MARK} {metric} = {value:.3f}, baseline {baseline[metric]:.3f} ({relative_change:+.1%})"
+                )
+    return all_ok
+
+
+def update_baselines(measurements, baselines):
+    for (host_class, test_name, variant_name), metrics in measurements.items():
+        baselines.setdefault(host_class, {}).setdefault(test_name, {})[variant_name] = {
+            metric: value for metric, value in metrics.items() if metric in metric_tolerances
+        }
+    return baselines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare integtest performance measurements with stored baselines")
+    parser.add_argument("measurements", help="JSON-lines measurements file written by the performance_gate plugin")
+    parser.add_argument("--baseline-file", required=True, help="JSON file with the baseline per host class, test and variant")
+    parser.add_argument("--update-baseline", action="store_true", help="store the measured values as the new baseline")
+    args = parser.parse_args(argv)
+
+    measurements = latest_measurements(args.measurements)
+    baseline_path = Path(args.baseline_file)
+    baselines = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+
+    all_ok = compare(measurements, baselines)
+    if args.update_baseline:
+        baseline_path.write_text(json.dumps(update_baselines(measurements, baselines), indent=2, sort_keys=True) + "\n")
+        print(f"Baselines updated in {baseline_path}")
+        return 0
+    return 0 if all_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
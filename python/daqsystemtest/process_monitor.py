@@ -0,0 +1,124 @@
+"""Resource usage of the DAQ applications in a session.
+
+This module is a pytest plugin.  When an integtest lists it in its ``pytest_plugins``,
+a ``ProcessMonitor`` samples every process that the test starts (the drunc shell and
+all of the applications below it) while the ``run_nanorc`` fixture runs the session,
+and attaches what it saw to the fixture's result as
+``run_nanorc.process_statistics``: a dict keyed by application name (taken from the
+``--name``/``-n`` argument of the process, or its executable name) with
+
+* ``max_rss_bytes``: the largest resident set size that was seen,
+* ``minor_page_faults`` and ``major_page_faults``: the page faults during the session,
+* ``cpu_seconds``: user plus system CPU time,
+* ``cpus``: the CPUs that the process was allowed to run on, when it was last sampled.
+"""
+
+import os
+import threading
+
+import psutil
+import pytest
+
+sample_interval = 0.5  # seconds
+
+
+def page_faults(pid):
+    "(minor, major) page faults of a process, from /proc/<pid>/stat"
+    with open(f"/proc/{pid}/stat") as stat_file:
+        fields = stat_file.read().rsplit(")", 1)[1].split()
+    # fields[0] is the state (field 3 of the file); minflt and majflt are fields 10 and 12
+    return int(fields[7]), int(fields[9])
+
+
+def application_name(process):
+    cmdline = process.cmdline()
+    for index, argument in enumerate(cmdline[:-1]):
+        if argument in ["--name", "-n"]:
+            return cmdline[index + 1]
+    return f"{process.name()}-{process.pid}"
+
+
+class ProcessStatistics:
+    def __init__(self, name, minor_page_faults, major_page_faults):
+        self.name = name
+        self.max_rss_bytes = 0
+        self.first_page_faults = (minor_page_faults, major_page_faults)
+        self.last_page_faults = (minor_page_faults, major_page_faults)
+        self.cpu_seconds = 0.0
+        self.cpus = []
+
+    def as_dict(self):
+        return {
+            "max_rss_bytes": self.max_rss_bytes,
+            "minor_page_faults": self.last_page_faults[0] - self.first_page_faults[0],
+            "major_page_faults": self.last_page_faults[1] - self.first_page_faults[1],
+            "cpu_seconds": self.cpu_seconds,
+            "cpus": self.cpus,
+        }
+
+
+class ProcessMonitor:
+    def __init__(self, root_pid=None, interval=sample_interval):
+        self.root = psutil.Process(root_pid if root_pid is not None else os.getpid())
+        self.interval = interval
+        self.statistics = {}  # pid: ProcessStatistics
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.sample()
+            self._stop_event.wait(self.interval)
+
+    def sample(self):
+        for process in self.root.children(recursive=True):
+            try:
+                with process.oneshot():
+                    minor, major = page_faults(process.pid)
+                    statistics = self.statistics.get(process.pid)
+                    if statistics is None:
+                        statistics = ProcessStatistics(application_name(process), minor, major)
+                        self.statistics[process.pid] = statistics
+                    statistics.last_page_faults = (minor, major)
+                    statistics.max_rss_bytes = max(statistics.max_rss_bytes, process.memory_info().rss)
+                    cpu_times = process.cpu_times()
+                    statistics.cpu_seconds = cpu_times.user + cpu_times.system
+                    statistics.cpus = process.cpu_affinity()
+            except (psutil.NoSuchProcess, psutil.AccessDenied, FileNotFoundError, ProcessLookupError):
+                continue
+
+    def results(self):
+        "{application name: statistics dict}; processes with the same name are numbered"
+        results = {}
+        for statistics in self.statistics.values():
+            name = statistics.name
+            suffix = 1
+            while name in results:
+                suffix += 1
+                name = f"{statistics.name}#{suffix}"
+            results[name] = statistics.as_dict()
+        return results
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_fixture_setup(fixturedef, request):
+    if fixturedef.argname != "run_nanorc":
+        yield
+        return
+
+    monitor = ProcessMonitor()
+    monitor.start()
+    outcome = yield
+    monitor.stop()
+    if outcome.excinfo is None:
+        outcome.get_result().process_statistics = monitor.results()
@@ -0,0 +1,182 @@
+"""Occupancy and back-pressure of the queues of a DAQ session.
+
+The DAQ applications publish the state of each of their queues (the QueueDescriptor
+connections of ``connections.data.xml``) through OpMon, which the integtest sessions
+write to ``info*.json`` files in their run directory, sampled every ``interval_s`` of
+the applications' OpMonConf (``queue_monitoring_substitutions`` shortens that interval,
+for the tests that study the queues; it changes how the applications run, so the core
+tests leave it alone).
+
+This module is a pytest plugin.  When an integtest lists it in its ``pytest_plugins``,
+the OpMon entries of every queue that were written while ``run_nanorc`` ran are turned
+into a time series, which is written next to the session's logs as
+``queue_occupancy_run<run number>.jsonl`` (one file per run, or
+``queue_occupancy.jsonl`` when the entries don't carry a run number), one JSON object
+per sample with the fill fraction, the push and pop rates (from the
+``num_pushes``/``num_pops`` counters of ``QueueInfo``, which count since the previous
+publication, when the application publishes them), and whether the queue was full.  Push timeouts in the logs
+(``QueueTimeoutExpired``) are counted as full-queue events as well.  A summary per
+queue is attached to the fixture's result as ``run_nanorc.queue_statistics`` and the
+fullest queues are printed, which is where to look first when a run misses its
+expected event count.  The OpMon files of the session are attached as
+``run_nanorc.opmon_files``, for tests that look at other measurements.
+"""
+
+import json
+import re
+from pathlib import Path
+
+import pytest
+
+import daqsystemtest.log_scanner as log_scanner
+import daqsystemtest.opmon_files as opmon_files
+
+queue_measurement_pattern = re.compile(r"(^|\.)QueueInfo$")
+capacity_field = "capacity"
+elements_field = "number_of_elements"
+push_count_field = "num_pushes"  # since the previous publication
+pop_count_field = "num_pops"  # since the previous publication
+push_timeout_pattern = re.compile(r"QueueTimeoutExpired|[Tt]imeout.*\bpush|\bpush.*[Tt]imeout")
+full_fraction = 0.95  # a queue this full counts as full
+reported_queue_count = 5
+
+
+def queue_monitoring_substitutions(interval_s=1):
+    "Config substitutions that make the applications publish their queue state every interval_s seconds"
+    import integrationtest.data_classes as data_classes
+
+    return [
+        data_classes.config_substitution(
+            obj_id=opmon_conf_id,
+            obj_class="OpMonConf",
+            updates={"interval_s": interval_s},
+        )
+        for opmon_conf_id in ["slow-all-monitoring", "fast-all-monitoring"]
+    ]
+
+
+def read_queue_entries(file_names):
+    "Queue samples from OpMon files, each with its queue name (the source of the entry)"
+    samples = opmon_files.read_samples(file_names, queue_measurement_pattern)
+    for sample in samples:
+        sample["queue"] = sample.pop("source")
+    return samples
+
+
+def queue_time_series(samples):
+    """Adds fill_fraction, full, push_rate_hz and pop_rate_hz to each sample; returns {queue: [samples]}
+
+    The rates need the time since the previous sample of the same queue in the same
+    run, so the first sample of each queue in each run has none."""
+    series = {}
+    for sample in samples:
+        series.setdefault(sample["queue"], []).append(sample)
+    for queue_samples in series.values():
+        previous_sample = None
+        for sample in queue_samples:
+            capacity = sample.get(capacity_field)
+            elements = sample.get(elements_field)
+            if capacity and elements is not None:
+                sample["fill_fraction"] = elements / capacity
+                sample["full"] = sample["fill_fraction"] >= full_fraction
+            if previous_sample is not None and previous_sample["run"] == sample["run"]:
+                interval = sample["time"] - previous_sample["time"]
+                if interval > 0:
+                    if push_count_field in sample:
+                        sample["push_rate_hz"] = sample[push_count_field] / interval
+                    if pop_count_field in sample:
+                        sample["pop_rate_hz"] = sample[pop_count_field] / interval
+            previous_sample = sample
+    return series
+
+
+def push_timeouts(log_files):
+    "{log file name: number of queue push timeouts}"
+    counts = {}
+    scanner = log_scanner.LogScanner()
+    for log_file in log_files:
+        count = sum(1 for line in scanner.scan_file(log_file).all_problems() if push_timeout_pattern.search(line))
+        if count:
+            counts[Path(log_file).name] = count
+    return counts
+
+
+def queue_statistics(series):
+    "{queue: summary of its time series}"
+    statistics = {}
+    for queue, queue_samples in series.items():
+        fill_fractions = [sample["fill_fraction"] for sample in queue_samples if "fill_fraction" in sample]
+        push_rates = [sample["push_rate_hz"] for sample in queue_samples if "push_rate_hz" in sample]
+        pop_rates = [sample["pop_rate_hz"] for sample in queue_samples if "pop_rate_hz" in sample]
+        statistics[queue] = {
+            "samples": len(queue_samples),
+            "capacity": queue_samples[-1].get("capacity"),
+            "max_fill_fraction": max(fill_fractions) if fill_fractions else None,
+            "mean_fill_fraction": sum(fill_fractions) / len(fill_fractions) if fill_fractions else None,
+            "full_samples": sum(1 for sample in queue_samples if sample.get("full")),
+            "mean_push_rate_hz": sum(push_rates) / len(push_rates) if push_rates else None,
+            "mean_pop_rate_hz": sum(pop_rates) / len(pop_rates) if pop_rates else None,
+        }
+    return statistics
+
+
+def fullest_queues(statistics, count=reported_queue_count):
+    ranked = [
+        (queue, queue_statistics_entry)
+        for queue, queue_statistics_entry in statistics.items()
+        if queue_statistics_entry["max_fill_fraction"] is not None
+    ]
+    ranked.sort(key=lambda item: (-item[1]["full_samples"], -item[1]["max_fill_fraction"]))
+    return ranked[:count]
+
+
+def write_time_series(series, output_dir):
+    "One JSON-lines file per run; returns the files that were written"
+    runs = {}
+    for queue_samples in series.values():
+        for sample in queue_samples:
+            runs.setdefault(sample["run"], []).append(sample)
+    written = []
+    for run, run_samples in runs.items():
+        file_name = f"queue_occupancy_run{run}.jsonl" if run is not None else "queue_occupancy.jsonl"
+        output_path = Path(output_dir) / file_name
+        with open(output_path, "w") as output_file:
+            for sample in sorted(run_samples, key=lambda sample: sample["time"]):
+                output_file.write(json.dumps(sample) + "\n")
+        written.append(output_path)
+    return written
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_fixture_setup(fixturedef, request):
+    if fixturedef.argname != "run_nanorc":
+        yield
+        return
+
+    base_dir = request.getfixturevalue("tmp_path_factory").getbasetemp()
+    earlier_versions = opmon_files.file_versions(base_dir)
+    outcome = yield
+    if outcome.excinfo is not None:
+        return
+
+    run_nanorc = outcome.get_result()
+    run_nanorc.opmon_files = opmon_files.files_written_since(base_dir, earlier_versions)
+    series = queue_time_series(read_queue_entries(run_nanorc.opmon_files))
+    statistics = queue_statistics(series)
+    run_nanorc.queue_statistics = statistics
+    run_nanorc.queue_push_timeouts = push_timeouts(run_nanorc.log_files)
+    if not series and not run_nanorc.queue_push_timeouts:
+        return
+
+    output_dir = Path(run_nanorc.log_files[0]).parent if run_nanorc.log_files else base_dir
+    written = write_time_series(series, output_dir)
+    print("")
+    print(f"Queue occupancy of {len(series)} queues written to {', '.join(str(path) for path in written)}")
+    for queue, queue_statistics_entry in fullest_queues(statistics):
+        print(
+            f"    {queue}: max {queue_statistics_entry['max_fill_fraction']:.0%} full "
+            f"(mean {queue_statistics_entry['mean_fill_fraction']:.0%}, capacity {queue_statistics_entry['capacity']:.0f}), "
+            f"full in {queue_statistics_entry['full_samples']} of {queue_statistics_entry['samples']} samples"
+        )
+    for log_name, count in sorted(run_nanorc.queue_push_timeouts.items()):
+        print(f"\N{POLICE CARS REVOLVING LIGHT} {count} queue push timeouts in {log_name}")
@@ -0,0 +1,164 @@
+"""Capacity and type tuning of the QueueDescriptor connections.
+
+``tuning_parameters`` lists scan points that each change the ``capacity`` or
+``queue_type`` of one QueueDescriptor (the descriptors that the QueueConnectionRules of
+``connections.data.xml`` hand out), and ``substitutions`` applies one point to the
+descriptor, so that the same workload can be run with every setting.  ``point_result`` condenses what a session
+showed (throughput, the records that didn't arrive, and the queue push timeouts that
+queue_monitor found), ``recommend`` picks the best setting of each descriptor, and
+``write_overlays`` writes, for every OKS file that defines one of the descriptors, a
+copy with the recommended values filled in.
+
+A queue is only ever switched from kFollySPSCQueue to kFollyMPMCQueue: the other way
+round is not safe for queues with more than one producer or consumer.
+"""
+
+import re
+from pathlib import Path
+
+spsc_queue_type = "kFollySPSCQueue"
+mpmc_queue_type = "kFollyMPMCQueue"
+default_throughput_tolerance = 0.02  # settings within 2% of the best throughput are equally good
+
+
+def queue_descriptors(snapshot):
+    "{descriptor id: {'queue_type', 'capacity', 'rules', 'file_name'}} from an OksSnapshot"
+    descriptors = {}
+    for obj in snapshot.objects_of_class("QueueDescriptor"):
+        descriptors[obj.uid] = {
+            "queue_type": obj.attributes.get("queue_type"),
+            "capacity": obj.attributes.get("capacity"),
+            "rules": [
+                referrer.uid
+                for referrer, relation_name in snapshot.referrers(obj)
+                if referrer.class_name == "QueueConnectionRule"
+            ],
+            "file_name": obj.file_name,
+        }
+    return descriptors
+
+
+def allowed_queue_types(current_queue_type):
+    if current_queue_type == spsc_queue_type:
+        return [spsc_queue_type, mpmc_queue_type]
+    return [current_queue_type]
+
+
+def tuning_parameters(descriptor_id, capacities, queue_types):
+    "{'<descriptor>_<queue type>_<capacity>': parameters} for every capacity and queue type"
+    return {
+        f"{descriptor_id}_{queue_type}_{capacity}": {
+            "descriptor": descriptor_id,
+            "queue_type": queue_type,
+            "capacity": capacity,
+        }
+        for queue_type in queue_types
+        for capacity in capacities
+    }
+
+
+def substitutions(parameters):
+    return [
+        {
+            "obj_id": parameters["descriptor"],
+            "obj_class": "QueueDescriptor",
+            "updates": {"capacity": parameters["capacity"], "queue_type": parameters["queue_type"]},
+        }
+    ]
+
+
+def point_result(parameters, run_metrics, expected_record_count, push_timeout_count):
+    "Summary of one tuning point; run_metrics is what benchmark.measure_run returned"
+    missing_records = max(0, expected_record_count - run_metrics["record_count"])
+    return {
+        **parameters,
+        "records_per_second": run_metrics["sustained_trigger_rate_hz"],
+        "mb_per_second": run_metrics["bytes_per_second"] / (1024 * 1024),
+        "drop_fraction": missing_records / expected_record_count if expected_record_count else 0.0,
+        "push_timeouts": push_timeout_count,
+    }
+
+
+def recommend(results, tolerance=default_throughput_tolerance):
+    """{descriptor: best result} over the tuning points of each descriptor.
+
+    Points that dropped records or had push timeouts are only chosen when every point
+    did.  Of the rest, those within tolerance of the best throughput are equally good,
+    and the smallest capacity (then an SPSC queue) is preferred, since it costs the
+    least memory."""
+    by_descriptor = {}
+    for result in results:
+        by_descriptor.setdefault(result["descriptor"], []).append(result)
+    recommendations = {}
+    for descriptor, descriptor_results in by_descriptor.items():
+        clean = [result for result in descriptor_results if not result["push_timeouts"] and not result["drop_fraction"]]
+        candidates = clean or descriptor_results
+        best_throughput = max(result["records_per_second"] for result in candidates)
+        good_enough = [
+            result for result in candidates if result["records_per_second"] >= (1 - tolerance) * best_throughput
+        ]
+        good_enough.sort(key=lambda result: (result["capacity"], result["queue_type"] != spsc_queue_type))
+        recommendations[descriptor] = good_enough[0]
+    return recommendations
+
+
+def set_attribute(obj_text, name, oks_type, value):
+    attribute = f'<attr name="{name}" type="{oks_type}" val="{value}"/>'
+    pattern = re.compile(rf'<attr name="{re.escape(name)}"[^>]*/>')
+    if pattern.search(obj_text):
+        return pattern.sub(attribute, obj_text, count=1)
+    # insert the missing attribute before the first relation or the end of the object
+    insert_at = obj_text.find(" <rel ")
+    if insert_at < 0:
+        insert_at = obj_text.rfind("</obj>")
+    return obj_text[:insert_at] + f" {attribute}\n" + obj_text[insert_at:]
+
+
+def write_overlay(recommendations, source_path, output_path):
+    """Copy the OKS file that defines the queue descriptors, with the recommended settings.
+
+    Returns {descriptor: (old (queue type, capacity), new (queue type, capacity))} for the descriptors that changed."""
+    text = Path(source_path).read_text()
+    changes = {}
+    for descriptor, recommendation in recommendations.items():
+        obj_pattern = re.compile(
+            rf'<obj class="QueueDescriptor" id="{re.escape(descriptor)}">.*?</obj>', re.DOTALL
+        )
+        match_obj = obj_pattern.search(text)
+        if match_obj is None:
+            continue
+        obj_text = match_obj.group(0)
+        old_type = re.search(r'<attr name="queue_type"[^>]*val="([^"]*)"', obj_text)
+        old_capacity = re.search(r'<attr name="capacity"[^>]*val="([^"]*)"', obj_text)
+        old = (
+            old_type.group(1) if old_type else None,
+            int(old_capacity.group(1)) if old_capacity else None,
+        )
+        new = (recommendation["queue_type"], recommendation["capacity"])
+        if old == new:
+            continue
+        obj_text = set_attribute(obj_text, "queue_type", "enum", new[0])
+        obj_text = set_attribute(obj_text, "capacity", "u32", new[1])
+        text = text[: match_obj.start()] + obj_text + text[match_obj.end() :]
+        changes[descriptor] = (old, new)
+    Path(output_path).write_text(text)
+    return changes
+
+
+def recommendations_by_file(recommendations, descriptors):
+    "{file name: {descriptor: recommendation}}, with descriptors as returned by queue_descriptors"
+    by_file = {}
+    for descriptor, recommendation in recommendations.items():
+        by_file.setdefault(descriptors[descriptor]["file_name"], {})[descriptor] = recommendation
+    return by_file
+
+
+def write_overlays(recommendations, descriptors, snapshot, output_dir):
+    """write_overlay for every OKS file that defines a recommended descriptor, into output_dir.
+
+    Returns {overlay path: changes} with the changes that write_overlay returned for each file."""
+    overlays = {}
+    for file_name, file_recommendations in sorted(recommendations_by_file(recommendations, descriptors).items()):
+        overlay_path = Path(output_dir) / f"recommended-{Path(file_name).name}"
+        overlays[overlay_path] = write_overlay(file_recommendations, snapshot.files[file_name].path, overlay_path)
+    return overlays
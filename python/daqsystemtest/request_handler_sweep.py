@@ -0,0 +1,193 @@
+"""Sweeps of the RequestHandler settings of the readout and trigger data handlers.
+
+``sweep_parameters`` lists every combination of ``handler_threads``, pop policy
+(``pop_limit_pct``, ``pop_size_pct``) and ``request_timeout`` for the given
+RequestHandler objects (the detector data handlers' and those of the TP, TA and TC
+handlers), and ``substitutions`` applies one of them to every handler.  A
+``request_timeout`` of None leaves the timeout of each handler as configured.
+
+Each data handler publishes a ``RequestHandlerInfo`` OpMon entry per interval with the
+number of requests it handled in that interval (``num_requests_handled``) and their
+average and largest response time (``avg_request_response_time`` and
+``max_request_response_time``, in microseconds).  The individual response times are
+not published, so ``service_time_histograms`` can only give percentiles of the
+interval averages, weighted by the number of requests of each interval: the
+"interval-average p99" is not the p99 of the requests, and it hides the spread within
+an interval (which ``max_ms`` bounds).  ``cheapest_within_budget`` then picks the
+setting with the fewest handler threads whose slowest link stays within a budget on
+that metric, and ``format_results`` lays the sweep out for the test's summary.
+"""
+
+import re
+
+import daqsystemtest.opmon_files as opmon_files
+
+default_request_handlers = [
+    "def-data-request-handler",
+    "def-tp-request-handler",
+    "def-ta-request-handler",
+    "def-tc-request-handler",
+]
+default_pop_policies = [
+    {"pop_limit_pct": 0.5, "pop_size_pct": 0.8},  # the default
+    {"pop_limit_pct": 0.8, "pop_size_pct": 0.2},  # fewer, smaller clean-ups
+]
+request_handler_measurement_pattern = re.compile(r"RequestHandlerInfo$")
+request_count_field = "num_requests_handled"
+average_response_time_field = "avg_request_response_time"
+max_response_time_field = "max_request_response_time"
+response_time_unit_s = 1e-6  # the applications publish microseconds
+percentiles = [50, 99]
+
+
+def sweep_parameters(
+    thread_counts,
+    pop_policies=default_pop_policies,
+    request_timeouts=[None],
+    request_handlers=default_request_handlers,
+):
+    "{'<threads>threads_limit<pop_limit_pct>_size<pop_size_pct>[_timeout<ms>]': parameters}"
+    parameters = {}
+    for request_timeout in request_timeouts:
+        for pop_policy in pop_policies:
+            for thread_count in thread_counts:
+                name = f"{thread_count}threads_limit{pop_policy['pop_limit_pct']}_size{pop_policy['pop_size_pct']}"
+                if request_timeout is not None:
+                    name += f"_timeout{request_timeout}"
+                parameters[name] = {
+                    "handler_threads": thread_count,
+                    **pop_policy,
+                    "request_timeout": request_timeout,
+                    "request_handlers": list(request_handlers),
+                }
+    return parameters
+
+
+def substitutions(parameters):
+    updates = {
+        "handler_threads": parameters["handler_threads"],
+        "pop_limit_pct": parameters["pop_limit_pct"],
+        "pop_size_pct": parameters["pop_size_pct"],
+    }
+    if parameters["request_timeout"] is not None:
+        updates["request_timeout"] = parameters["request_timeout"]
+    return [
+        {"obj_id": request_handler, "obj_class": "RequestHandler", "updates": dict(updates)}
+        for request_handler in parameters["request_handlers"]
+    ]
+
+
+def weighted_percentile(values_and_weights, percentile):
+    "values_and_weights is a list of (value, weight) pairs sorted by value"
+    total = sum(weight for value, weight in values_and_weights)
+    threshold = total * percentile / 100
+    cumulative = 0
+    for value, weight in values_and_weights:
+        cumulative += weight
+        if cumulative >= threshold:
+            return value
+    return values_and_weights[-1][0]
+
+
+def service_time_histograms(file_names):
+    """{link: {'requests', 'p50_interval_avg_ms', 'p99_interval_avg_ms', 'max_ms'}} from the OpMon files of a session
+
+    The percentiles are over the per-interval average response times, weighted by the
+    requests of each interval.  Links that handled no requests are left out."""
+    per_link = {}
+    for sample in opmon_files.read_samples(file_names, request_handler_measurement_pattern):
+        request_count = sample.get(request_count_field, 0)
+        if request_count <= 0 or average_response_time_field not in sample:
+            continue
+        per_link.setdefault(sample["source"], []).append(
+            (
+                sample[average_response_time_field],
+                sample.get(max_response_time_field, sample[average_response_time_field]),
+                request_count,
+            )
+        )
+
+    histograms = {}
+    for link, intervals in per_link.items():
+        values_and_weights = sorted((average, count) for average, maximum, count in intervals)
+        histograms[link] = {
+            "requests": int(sum(count for average, maximum, count in intervals)),
+            **{
+                f"p{percentile}_interval_avg_ms": weighted_percentile(values_and_weights, percentile)
+                * response_time_unit_s
+                * 1000
+                for percentile in percentiles
+            },
+            "max_ms": max(maximum for average, maximum, count in intervals) * response_time_unit_s * 1000,
+        }
+    return histograms
+
+
+def point_result(parameters, histograms, warning_counts, data_files_passed):
+    "Summary of one sweep point"
+    return {
+        **parameters,
+        "links": histograms,
+        "worst_p99_interval_avg_ms": max(
+            (histogram["p99_interval_avg_ms"] for histogram in histograms.values()), default=None
+        ),
+        "request_handler_warnings": warning_counts,
+        "data_files_passed": data_files_passed,
+    }
+
+
+def cheapest_within_budget(results, p99_budget_ms):
+    """The result with the fewest handler threads (then the least frequent clean-ups) whose
+    worst per-link interval-average p99 is within the budget, without request-handler
+    warnings or failed data files; None if no setting qualifies"""
+    qualifying = [
+        result
+        for result in results
+        if result["worst_p99_interval_avg_ms"] is not None
+        and result["worst_p99_interval_avg_ms"] <= p99_budget_ms
+        and result["data_files_passed"]
+        and not any(result["request_handler_warnings"].values())
+    ]
+    if not qualifying:
+        return None
+    return min(
+        qualifying,
+        key=lambda result: (result["handler_threads"], -result["pop_limit_pct"], result["worst_p99_interval_avg_ms"]),
+    )
+
+
+def format_results(results, p99_budget_ms):
+    "Lines of a table of the sweep points, their links, and the cheapest setting within the budget"
+    lines = []
+    for result in sorted(
+        results,
+        key=lambda result: (result["request_timeout"] or 0, result["pop_limit_pct"], result["handler_threads"]),
+    ):
+        worst_p99 = (
+            f"{result['worst_p99_interval_avg_ms']:.2f} ms"
+            if result["worst_p99_interval_avg_ms"] is not None
+            else "not published"
+        )
+        timeout = "configured request_timeout" if result["request_timeout"] is None else f"request_timeout {result['request_timeout']} ms"
+        warnings = ", ".join(f"{count} {kind}" for kind, count in result["request_handler_warnings"].items() if count)
+        lines.append(
+            f"    {result['handler_threads']} threads, pop_limit_pct {result['pop_limit_pct']}, "
+            f"pop_size_pct {result['pop_size_pct']}, {timeout}: worst interval-average p99 {worst_p99}"
+            + (f", {warnings}" if warnings else "")
+            + ("" if result["data_files_passed"] else ", data files failed validation")
+        )
+        for link, histogram in sorted(result["links"].items()):
+            lines.append(
+                f"        {link}: {histogram['requests']} requests, interval-average p50 {histogram['p50_interval_avg_ms']:.2f} ms, "
+                f"p99 {histogram['p99_interval_avg_ms']:.2f} ms, max {histogram['max_ms']:.2f} ms"
+            )
+    cheapest = cheapest_within_budget(results, p99_budget_ms)
+    if cheapest is None:
+        lines.append(f"\N{POLICE CARS REVOLVING LIGHT} No setting kept the interval-average p99 response time within {p99_budget_ms} ms")
+    else:
+        lines.append(
+            f"Cheapest setting within budget: {cheapest['handler_threads']} threads, "
+            f"pop_limit_pct {cheapest['pop_limit_pct']}, pop_size_pct {cheapest['pop_size_pct']}, "
+            f"request_timeout {cheapest['request_timeout'] if cheapest['request_timeout'] is not None else 'as configured'}"
+        )
+    return lines
@@ -0,0 +1,213 @@
+"""Sessions with N readout applications x K streams x M dataflow applications on one host.
+
+A ``Topology`` describes one such session, estimates what it needs from the computer
+(in the same terms as the ``minimum_*`` values that the integtests declare, see
+integtest_scheduler), and works out the validation values that follow from its size:
+the number of data files, the number of records per file, and the number of detector
+fragments per record.
+
+A fixed trigger rate makes the throughput of every topology proportional to its number
+of data producers, so the scaling curve is measured at saturation instead (which needs
+readout windows long enough for the highest rate to ask for more data than a session
+can write):
+``saturation_parameters`` lists, for each topology that fits on this computer, a
+variant per trigger rate in a rising series, and ``topology_configs`` turns one
+``drunc_config`` into the ``confgen_arguments`` of those variants.  A topology is
+saturated at the first rate at which the session records fewer triggers than the rate
+asked for (``shortfall_fraction``); ``saturation_points`` takes the highest throughput
+of each topology over its rates, and ``scaling_knee`` finds the point of the resulting
+curve after which adding data producers no longer adds throughput.  ``format_results``
+lays the curve out for the test's summary.
+"""
+
+import copy
+import os
+
+import psutil
+
+import daqsystemtest.benchmark as benchmark
+import daqsystemtest.integtest_scheduler as integtest_scheduler
+
+# Rough needs of one session, from the 3ru_1df test (6 data producers need about 18 CPUs and 24 GB)
+cpus_per_data_producer = 3
+memory_gb_per_data_producer = 4
+cpus_per_dataflow_app = 1
+memory_gb_per_dataflow_app = 2
+base_cpu_count = 2  # controllers, trigger and connectivity service
+base_memory_gb = 2
+
+default_efficiency_threshold = 0.8
+shortfall_fraction = 0.9  # a session that records less than this fraction of the requested triggers is saturated
+
+
+class Topology:
+    def __init__(self, readout_apps, streams_per_app, dataflow_apps):
+        self.readout_apps = readout_apps
+        self.streams_per_app = streams_per_app
+        self.dataflow_apps = dataflow_apps
+
+    @property
+    def name(self):
+        return f"{self.readout_apps}ru{self.streams_per_app}s{self.dataflow_apps}df"
+
+    @property
+    def data_producers(self):
+        return self.readout_apps * self.streams_per_app
+
+    def requirements(self):
+        return integtest_scheduler.TestRequirements(
+            base_cpu_count
+            + cpus_per_data_producer * self.data_producers
+            + cpus_per_dataflow_app * self.dataflow_apps,
+            base_memory_gb
+            + memory_gb_per_data_producer * self.data_producers
+            + memory_gb_per_dataflow_app * self.dataflow_apps,
+            integtest_scheduler.default_free_disk_space_gb,
+        )
+
+    def fits_on_this_computer(self):
+        free_memory_gb = psutil.virtual_memory().available / (1024 * 1024 * 1024)
+        free_disk_space_gb = psutil.disk_usage(os.getcwd()).free / (1024 * 1024 * 1024)
+        return self.requirements().fits_within(os.cpu_count(), free_memory_gb, free_disk_space_gb)
+
+    def expected_number_of_data_files(self, number_of_runs=1):
+        "Every dataflow application writes one file per run"
+        return number_of_runs * self.dataflow_apps
+
+    def expected_event_count(self, run_duration, trigger_rate):
+        "Records per data file, with the triggers shared out over the dataflow applications"
+        return run_duration * trigger_rate / self.dataflow_apps
+
+    def fragment_params(self, base_params):
+        "A copy of a detector-readout fragment check with the fragment count of this topology"
+        params = dict(base_params)
+        params["expected_fragment_count"] = self.data_producers
+        return params
+
+    def parameters(self):
+        return {
+            "topology": self.name,
+            "readout_apps": self.readout_apps,
+            "streams_per_app": self.streams_per_app,
+            "dataflow_apps": self.dataflow_apps,
+        }
+
+    @classmethod
+    def from_parameters(cls, parameters):
+        return cls(parameters["readout_apps"], parameters["streams_per_app"], parameters["dataflow_apps"])
+
+    def configure(self, base_config):
+        config = copy.deepcopy(base_config)
+        config.dro_map_config.n_apps = self.readout_apps
+        config.dro_map_config.n_streams = self.streams_per_app
+        config.n_df_apps = self.dataflow_apps
+        return config
+
+    def __repr__(self):
+        return self.name
+
+
+def saturation_parameters(topologies, trigger_rates, only_what_fits=True):
+    """({'<topology>_<rate>Hz': parameters} for every topology and trigger rate,
+    [topologies that were skipped because they don't fit])"""
+    variant_parameters = {}
+    skipped = []
+    for topology in topologies:
+        if only_what_fits and not topology.fits_on_this_computer():
+            skipped.append(topology)
+            continue
+        for trigger_rate in trigger_rates:
+            variant_parameters[f"{topology.name}_{trigger_rate}Hz"] = {
+                **topology.parameters(),
+                "trigger_rate_hz": trigger_rate,
+            }
+    return variant_parameters, skipped
+
+
+def substitutions(parameters):
+    return [{"obj_class": "RandomTCMakerConf", "updates": {"trigger_rate_hz": parameters["trigger_rate_hz"]}}]
+
+
+def topology_configs(base_config, variant_parameters):
+    "confgen_arguments with the topology and trigger rate of each saturation_parameters variant"
+    return {
+        variant_name: benchmark.parameter_variants(
+            Topology.from_parameters(parameters).configure(base_config), {variant_name: parameters}, substitutions
+        )[variant_name]
+        for variant_name, parameters in variant_parameters.items()
+    }
+
+
+def is_saturated(result, run_duration, fraction=shortfall_fraction):
+    "True if a session recorded fewer triggers than fraction of what its trigger rate asked for"
+    return result["trigger_count"] < fraction * result["trigger_rate_hz"] * run_duration
+
+
+def saturation_points(results, run_duration, fraction=shortfall_fraction):
+    """[(topology, throughput, saturated)] with the highest throughput of each topology.
+
+    results is a list of dicts with the saturation_parameters of a variant, its
+    trigger_count and its mb_per_second.  saturated is False when the topology kept up
+    with every rate, in which case its throughput is only a lower bound and the summary
+    has to say that saturation was not reached."""
+    by_topology = {}
+    for result in results:
+        by_topology.setdefault(result["topology"], []).append(result)
+    points = []
+    for topology_results in by_topology.values():
+        points.append(
+            (
+                Topology.from_parameters(topology_results[0]),
+                max(result["mb_per_second"] for result in topology_results),
+                any(is_saturated(result, run_duration, fraction) for result in topology_results),
+            )
+        )
+    return points
+
+
+def scaling_knee(points, efficiency_threshold=default_efficiency_threshold):
+    """The scaling efficiency of each point, and the first point at which throughput stops scaling.
+
+    points is a list of (topology, throughput) pairs.  The efficiency of a point is its
+    throughput per data producer relative to that of the smallest topology; the knee is
+    the first point, in order of increasing size, whose efficiency is below the
+    threshold.  Returns ([(topology, throughput, efficiency)], knee topology or None)."""
+    points = sorted(points, key=lambda point: (point[0].data_producers, point[0].dataflow_apps))
+    if not points or points[0][1] <= 0:
+        return [(topology, throughput, None) for topology, throughput in points], None
+    reference = points[0][1] / points[0][0].data_producers
+    curve = []
+    knee = None
+    for topology, throughput in points:
+        efficiency = throughput / topology.data_producers / reference
+        curve.append((topology, throughput, efficiency))
+        if knee is None and efficiency < efficiency_threshold:
+            knee = topology
+    return curve, knee
+
+
+def format_results(results, run_duration, highest_trigger_rate):
+    "Lines of the scaling curve at saturation, which say where throughput stops scaling"
+    points = saturation_points(results, run_duration)
+    curve, knee = scaling_knee([(topology, throughput) for topology, throughput, saturated in points])
+    saturated = {topology.name: saturated for topology, throughput, saturated in points}
+    lines = []
+    for topology, throughput, efficiency in curve:
+        efficiency_text = f"{efficiency:.0%}" if efficiency is not None else "n/a"
+        saturation_text = "" if saturated[topology.name] else f", not saturated at {highest_trigger_rate} Hz (lower bound)"
+        lines.append(
+            f"    {topology.name:>10} ({topology.data_producers:>2} producers): {throughput:8.2f} MB/s, efficiency {efficiency_text}{saturation_text}"
+        )
+    unsaturated = [topology.name for topology, throughput, saturated in points if not saturated]
+    if len(unsaturated) == len(points):
+        lines.append(
+            f"    saturation was not reached by any topology at {highest_trigger_rate} Hz: the curve only follows the trigger rate and says nothing about scaling"
+        )
+        return lines
+    if unsaturated:
+        lines.append(f"    saturation was not reached by {', '.join(unsaturated)}: their throughput and efficiency are lower bounds")
+    if knee is None:
+        lines.append(f"    throughput kept scaling up to {curve[-1][0].name}")
+    else:
+        lines.append(f"    throughput stops scaling at {knee.name}")
+    return lines
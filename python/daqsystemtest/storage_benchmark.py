@@ -0,0 +1,136 @@
+"""Write-path benchmarks of the HDF5DataStore of the dataflow applications.
+
+``benchmark_parameters`` lists every combination of trigger rate, ``max_file_size`` of
+the ``default`` DataStoreConf (how often the writers roll over to a new file) and
+write-retry policy of the ``dw-01`` DataWriterConf, and ``substitutions`` applies one
+of them.  After a session has run, ``dataflow_app_metrics`` splits its output files and
+logs by dataflow application and reports for each one
+
+* the MB/s that it wrote,
+* the number of file rollovers and the rollover stalls: records that were created
+  noticeably later than the previous record when a new file had just been opened
+  (from the coarse creation times of benchmark.record_times),
+* the write retries that it logged.
+"""
+
+import re
+import statistics
+from pathlib import Path
+
+import daqsystemtest.benchmark as benchmark
+import daqsystemtest.data_file_index as data_file_index
+import daqsystemtest.log_scanner as log_scanner
+
+data_store_id = "default"
+data_writer_id = "dw-01"
+retry_policies = {
+    "default_retry": {"min_write_retry_time_ms": 1, "max_write_retry_time_ms": 1000, "write_retry_time_increase_factor": 2},
+    "fast_retry": {"min_write_retry_time_ms": 1, "max_write_retry_time_ms": 50, "write_retry_time_increase_factor": 2},
+    "slow_retry": {"min_write_retry_time_ms": 10, "max_write_retry_time_ms": 5000, "write_retry_time_increase_factor": 4},
+}
+retry_parameter_names = ["min_write_retry_time_ms", "max_write_retry_time_ms", "write_retry_time_increase_factor"]
+write_retry_pattern = re.compile(r"retry|DataStoreWrite|write.*fail", re.IGNORECASE)
+stall_threshold_s = 1.0  # a rollover gap this much longer than the usual gap between records is a stall
+
+
+def benchmark_parameters(trigger_rates, max_file_sizes, policies=retry_policies):
+    "{'<rate>Hz_<max file size>B_<retry policy>': parameters}"
+    return {
+        f"{trigger_rate}Hz_{max_file_size}B_{policy_name}": {
+            "trigger_rate_hz": trigger_rate,
+            "max_file_size": max_file_size,
+            "retry_policy": policy_name,
+            **retry_parameters,
+        }
+        for trigger_rate in trigger_rates
+        for max_file_size in max_file_sizes
+        for policy_name, retry_parameters in policies.items()
+    }
+
+
+def substitutions(parameters):
+    return [
+        {"obj_class": "RandomTCMakerConf", "updates": {"trigger_rate_hz": parameters["trigger_rate_hz"]}},
+        {"obj_id": data_store_id, "obj_class": "DataStoreConf", "updates": {"max_file_size": parameters["max_file_size"]}},
+        {
+            "obj_id": data_writer_id,
+            "obj_class": "DataWriterConf",
+            "updates": {name: parameters[name] for name in retry_parameter_names},
+        },
+    ]
+
+
+def rollover_stalls(data_files):
+    """(rollover count, [stall seconds]) of the files of one dataflow application.
+
+    The files are put in the order of their first record, and the gap between the last
+    record of one file and the first record of the next is compared with the median gap
+    between records."""
+    file_times = []
+    for file_name in data_files:
+        creation_times = sorted(entry[2] for entry in benchmark.record_times(file_name) if entry[2] is not None)
+        if creation_times:
+            file_times.append(creation_times)
+    file_times.sort(key=lambda creation_times: creation_times[0])
+
+    all_times = sorted(time for creation_times in file_times for time in creation_times)
+    gaps = [later - earlier for earlier, later in zip(all_times, all_times[1:])]
+    usual_gap = statistics.median(gaps) if gaps else 0
+    stalls = []
+    for previous_file, next_file in zip(file_times, file_times[1:]):
+        gap = next_file[0] - previous_file[-1]
+        if gap - usual_gap >= stall_threshold_s:
+            stalls.append(gap - usual_gap)
+    return max(0, len(file_times) - 1), stalls
+
+
+def write_retry_counts(log_files):
+    "{dataflow application: number of logged write retries}"
+    counts = {}
+    scanner = log_scanner.LogScanner()
+    for log_file in log_files:
+        app = data_file_index.dataflow_app(log_file)
+        if app == "unknown":
+            continue
+        count = sum(1 for line in scanner.scan_file(log_file).all_problems() if write_retry_pattern.search(line))
+        counts[app] = counts.get(app, 0) + count
+    return counts
+
+
+def dataflow_app_metrics(data_files, log_files, run_duration):
+    "{dataflow application: {'files', 'mb_per_second', 'rollovers', 'rollover_stalls', 'max_stall_s', 'write_retries'}}"
+    files_by_app = {}
+    for file_name in data_files:
+        files_by_app.setdefault(data_file_index.dataflow_app(file_name), []).append(file_name)
+    retries = write_retry_counts(log_files)
+
+    metrics = {}
+    for app in sorted(set(files_by_app) | set(retries)):
+        app_files = files_by_app.get(app, [])
+        rollovers, stalls = rollover_stalls(app_files)
+        metrics[app] = {
+            "files": len(app_files),
+            "mb_per_second": sum(Path(file_name).stat().st_size for file_name in app_files) / run_duration / (1024 * 1024),
+            "rollovers": rollovers,
+            "rollover_stalls": len(stalls),
+            "max_stall_s": max(stalls, default=0.0),
+            "write_retries": retries.get(app, 0),
+        }
+    return metrics
+
+
+def format_results(results):
+    "Lines of a table of the benchmark points, one per dataflow application"
+    lines = []
+    for result in sorted(results, key=lambda result: (result["trigger_rate_hz"], result["max_file_size"], result["retry_policy"])):
+        lines.append(
+            f"    {result['trigger_rate_hz']} Hz, max_file_size {result['max_file_size'] / (1024 * 1024):.0f} MiB, "
+            f"{result['retry_policy']}: {result['total_mb_per_second']:.2f} MB/s"
+        )
+        for app, app_metrics in sorted(result["dataflow_apps"].items()):
+            lines.append(
+                f"        {app}: {app_metrics['mb_per_second']:.2f} MB/s in {app_metrics['files']} files, "
+                f"{app_metrics['rollover_stalls']} of {app_metrics['rollovers']} rollovers stalled "
+                f"(max {app_metrics['max_stall_s']:.1f} s), {app_metrics['write_retries']} write retries"
+            )
+    return lines
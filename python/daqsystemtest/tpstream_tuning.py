@@ -0,0 +1,163 @@
+"""Tuning of how the TPStreamWriter accumulates trigger primitives into TimeSlices.
+
+The TPStreamWriter collects the TPs of ``tp_accumulation_interval`` ticks into one
+TimeSlice and writes it once no TPs for it have arrived for
+``tp_accumulation_inactivity_time_before_write_sec``; TPs that arrive for a TimeSlice
+that was already written are discarded as tardy (and reported when
+``warn_user_when_tardy_tps_are_discarded`` is set).  Longer waits make the TP stream
+more complete and the TPs later on disk.
+
+``tuning_parameters`` lists every combination of interval and inactivity time, and
+``substitutions`` sets one of them in the TPStreamWriterConf, with the tardy-TP warnings
+switched on.  ``point_result`` condenses what a session showed:
+
+* the coarse TP latency to disk: how long after the end of its window each TimeSlice
+  was written, from the HDF5 object creation times and the window ends in the Fragment
+  headers.  The creation times are coarse (see benchmark.record_times), so inactivity
+  times below a second can't be told apart.  This assumes that the emulated readout stamps its data with the system
+  clock, as it does with a data-rate slowdown factor of 1,
+* the TimeSlice count and mean size, and the size of the TP-stream files,
+* the TPs that the TPStreamWriter received and wrote, from the ``tps_received`` and
+  ``tps_written`` fields of its ``TPStreamWriterInfo`` OpMon entries (counts per
+  publication interval, which are summed over the run), the TPs that it discarded
+  (the difference), and the fraction of the TPs that it wrote,
+* the number of tardy-TP warnings in the logs, as a count of log lines (the writer
+  doesn't log one line per TimeSlice, so it is not turned into a TimeSlice count).
+"""
+
+import os
+import re
+
+import h5py
+import numpy as np
+
+import daqsystemtest.benchmark as benchmark
+import daqsystemtest.data_file_index as data_file_index
+import daqsystemtest.log_scanner as log_scanner
+import daqsystemtest.opmon_files as opmon_files
+
+tp_writer_conf_id = "tp-stream-writer-conf"
+tardy_tp_pattern = re.compile(r"[Tt]ardy")
+tp_writer_measurement_pattern = re.compile(r"(^|\.)TPStreamWriterInfo$")
+tps_received_field = "tps_received"  # per publication interval
+tps_written_field = "tps_written"  # per publication interval
+latency_percentiles = [50, 99]
+
+
+def tuning_parameters(accumulation_intervals, inactivity_times):
+    "{'interval<ticks>_inactivity<seconds>s': parameters}"
+    return {
+        f"interval{accumulation_interval}_inactivity{inactivity_time}s": {
+            "tp_accumulation_interval": accumulation_interval,
+            "inactivity_time_s": inactivity_time,
+        }
+        for accumulation_interval in accumulation_intervals
+        for inactivity_time in inactivity_times
+    }
+
+
+def substitutions(parameters):
+    return [
+        {
+            "obj_id": tp_writer_conf_id,
+            "obj_class": "TPStreamWriterConf",
+            "updates": {
+                "tp_accumulation_interval": parameters["tp_accumulation_interval"],
+                "tp_accumulation_inactivity_time_before_write_sec": parameters["inactivity_time_s"],
+                "warn_user_when_tardy_tps_are_discarded": True,
+            },
+        }
+    ]
+
+
+def timeslice_latencies(tpstream_files):
+    "Seconds from the end of each TimeSlice's window until it was created in its file"
+    latencies = []
+    for file_name in tpstream_files:
+        records = data_file_index.load_index(file_name)
+        with h5py.File(file_name, "r") as h5file:
+            for record in records:
+                window_ends = [fragment.window_end for fragment in record.fragments if fragment.window_end]
+                if not window_ends:
+                    continue
+                creation_time = h5py.h5o.get_info(h5file[record.name].id).ctime
+                if creation_time > 0:
+                    latencies.append(creation_time - max(window_ends) / benchmark.clock_frequency_hz)
+    return latencies
+
+
+def tardy_tp_warnings(log_files):
+    "Number of log lines about tardy TPs that were discarded"
+    scanner = log_scanner.LogScanner()
+    return sum(
+        1
+        for log_file in log_files
+        for line in scanner.scan_file(log_file).all_problems()
+        if tardy_tp_pattern.search(line)
+    )
+
+
+def tp_counts(opmon_file_names):
+    "(TPs received, TPs written) by the TPStreamWriter over the run, or (None, None) if it doesn't publish them"
+    received = None
+    written = None
+    for sample in opmon_files.read_samples(opmon_file_names, tp_writer_measurement_pattern):
+        if tps_received_field in sample and tps_written_field in sample:
+            received = (received or 0) + int(sample[tps_received_field])
+            written = (written or 0) + int(sample[tps_written_field])
+    return received, written
+
+
+def point_result(parameters, tpstream_files, log_files, opmon_file_names):
+    "Summary of one tuning point"
+    timeslice_count = sum(len(data_file_index.load_index(file_name)) for file_name in tpstream_files)
+    file_bytes = sum(os.stat(file_name).st_size for file_name in tpstream_files)
+    latencies = timeslice_latencies(tpstream_files)
+    received, written = tp_counts(opmon_file_names)
+    return {
+        **parameters,
+        "timeslices": timeslice_count,
+        "mean_timeslice_bytes": file_bytes / timeslice_count if timeslice_count else None,
+        "tpstream_file_bytes": file_bytes,
+        "coarse_latency_to_disk_s": (
+            {
+                **{f"p{p}": float(value) for p, value in zip(latency_percentiles, np.percentile(latencies, latency_percentiles))},
+                "max": float(max(latencies)),
+            }
+            if latencies
+            else None
+        ),
+        "tardy_tp_warning_lines": tardy_tp_warnings(log_files),
+        "tps_received": received,
+        "tps_written": written,
+        "discarded_tps": received - written if received is not None else None,
+        "written_tp_fraction": written / received if received else None,
+    }
+
+
+def format_results(results):
+    "Lines of the latency vs completeness table, fastest first"
+    lines = []
+
+    def p50_latency(result):
+        return result["coarse_latency_to_disk_s"]["p50"] if result["coarse_latency_to_disk_s"] else float("inf")
+
+    for result in sorted(results, key=p50_latency):
+        latency = result["coarse_latency_to_disk_s"]
+        latency_text = f"p50 {latency['p50']:.0f} s, p99 {latency['p99']:.0f} s (1 s resolution)" if latency else "not recorded"
+        written_text = (
+            f"{result['written_tp_fraction']:.1%} of {result['tps_received']} TPs written, {result['discarded_tps']} discarded"
+            if result["written_tp_fraction"] is not None
+            else "TP counts not published"
+        )
+        size_text = (
+            f"{result['mean_timeslice_bytes'] / 1024:.0f} kB per TimeSlice"
+            if result["mean_timeslice_bytes"] is not None
+            else "no TimeSlices"
+        )
+        lines.append(
+            f"    interval {result['tp_accumulation_interval']:>10} ticks, inactivity {result['inactivity_time_s']:>4} s: "
+            f"latency to disk {latency_text}, {written_text}, {result['timeslices']} TimeSlices, "
+            f"{size_text}, {result['tardy_tp_warning_lines']} tardy-TP warning lines"
+        )
+    return lines
@@ -0,0 +1,101 @@
+"""Helpers for scanning how TriggerRecords are split into sequences.
+
+``scan_parameters`` lists scan points that each set a different ``max_time_window`` of
+the TRBConf (0 leaves long readout windows in one TriggerRecord; otherwise each record
+covers at most that many ticks, and a window is written as a sequence of records), and
+``substitutions`` sets it in the TRBConf.  ``point_result`` condenses what one session showed:
+the number of records per trigger and the write throughput from benchmark.measure_run,
+the TriggerRecord build latency from benchmark.build_latency, and the peak memory of
+the dataflow applications from process_monitor.  ``best_split`` picks the split that
+needs the least dataflow memory without costing throughput or build latency.
+"""
+
+import re
+
+dataflow_app_pattern = re.compile(r"^df-")  # application names
+default_throughput_tolerance = 0.02  # splits within 2% of the best throughput are equally good
+default_latency_tolerance = 0.25  # and within 25% of the lowest build latency
+
+
+def scan_parameters(max_time_windows):
+    "{'unsplit' (for 0) or 'split<max_time_window>': parameters}"
+    return {
+        "unsplit" if max_time_window == 0 else f"split{max_time_window}": {"max_time_window": max_time_window}
+        for max_time_window in max_time_windows
+    }
+
+
+def substitutions(parameters):
+    return [{"obj_class": "TRBConf", "updates": {"max_time_window": parameters["max_time_window"]}}]
+
+
+def point_result(parameters, run_metrics, build_latency, process_statistics, data_files_passed):
+    "Summary of one scan point; run_metrics and build_latency are what benchmark.measure_run and benchmark.build_latency returned"
+    dataflow_statistics = [
+        statistics
+        for name, statistics in process_statistics.items()
+        if dataflow_app_pattern.search(name)
+    ]
+    return {
+        **parameters,
+        "sequences_per_trigger": run_metrics["record_count"] / run_metrics["trigger_count"] if run_metrics["trigger_count"] else 0.0,
+        "mb_per_second": run_metrics["bytes_per_second"] / (1024 * 1024),
+        "build_latency_p50_interval_max_ms": build_latency["p50_interval_max_ms"],
+        "build_latency_max_ms": build_latency["max_ms"],
+        "dataflow_max_rss_bytes": max((statistics["max_rss_bytes"] for statistics in dataflow_statistics), default=None),
+        "data_files_passed": data_files_passed,
+    }
+
+
+def best_split(results, tolerance=default_throughput_tolerance, latency_tolerance=default_latency_tolerance):
+    """The result with the smallest dataflow peak memory among the splits whose files
+    passed validation, whose throughput is within tolerance of the best and whose build
+    latency (where it was published) is within latency_tolerance of the lowest; None if
+    no split qualifies"""
+    candidates = [
+        result for result in results if result["data_files_passed"] and result["dataflow_max_rss_bytes"] is not None
+    ]
+    if not candidates:
+        return None
+    best_throughput = max(result["mb_per_second"] for result in candidates)
+    good_enough = [result for result in candidates if result["mb_per_second"] >= (1 - tolerance) * best_throughput]
+    latencies = [
+        result["build_latency_p50_interval_max_ms"]
+        for result in good_enough
+        if result["build_latency_p50_interval_max_ms"] is not None
+    ]
+    if latencies:
+        good_enough = [
+            result
+            for result in good_enough
+            if result["build_latency_p50_interval_max_ms"] is None
+            or result["build_latency_p50_interval_max_ms"] <= (1 + latency_tolerance) * min(latencies)
+        ]
+    return min(good_enough, key=lambda result: (result["dataflow_max_rss_bytes"], -result["max_time_window"]))
+
+
+def format_results(results):
+    lines = []
+    for result in sorted(results, key=lambda result: result["max_time_window"]):
+        split = "unsplit" if result["max_time_window"] == 0 else f"max_time_window {result['max_time_window']:>9}"
+        rss = (
+            f"{result['dataflow_max_rss_bytes'] / (1024 * 1024):.0f} MB"
+            if result["dataflow_max_rss_bytes"] is not None
+            else "not sampled"
+        )
+        latency = (
+            f"build latency p50 {result['build_latency_p50_interval_max_ms']:.1f} ms, max {result['build_latency_max_ms']:.1f} ms"
+            if result["build_latency_max_ms"] is not None
+            else "build latency not published"
+        )
+        lines.append(
+            f"    {split:>25}: {result['sequences_per_trigger']:.1f} records per trigger, "
+            f"{result['mb_per_second']:.2f} MB/s, {latency}, dataflow RSS {rss}"
+            + ("" if result["data_files_passed"] else ", data files failed validation")
+        )
+    best = best_split(results)
+    if best is None:
+        lines.append("    no split passed validation with a sampled dataflow application")
+    else:
+        lines.append(f"    least dataflow memory without losing throughput or latency: max_time_window {best['max_time_window']}")
+    return lines
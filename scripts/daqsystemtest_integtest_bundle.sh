@@ -16,6 +16,16 @@ Options:
     -n <number of times to run each individual test, default=1>
     -N <number of times to run the full set of selected tests, default=1>
     --stop-on-failure : causes the script to stop when one of the integtests reports a failure
+    --parallel : runs the selected tests concurrently, packed onto this computer according to
+                 their declared CPU, memory, and disk needs (see daqsystemtest.integtest_scheduler)
+    --split-variants : with --parallel, runs each configuration variant of a test as a separate job,
+                 so that the variants of long tests can be fitted in between other tests (the variants
+                 of one test still run one after another, since they share its session name)
+    --baseline-file <file> : compares the performance of the tests with the baselines in this file,
+                 and reports a failure if a metric has regressed (see daqsystemtest.performance_gate)
+    --update-baseline : stores the measured performance as the new baselines in the --baseline-file
+    --config-cache <dir> : reuses the configurations generated by earlier sessions with the same inputs,
+                 keeping them in this directory (see daqsystemtest.config_cache)
 """
     let counter=0
     echo "List of available tests:"
@@ -26,7 +36,7 @@ Options:
     echo ""
 }
 
-TEMP=`getopt -o hs:f:l:n:N: --long help,stop-on-failure -- "$@"`
+TEMP=`getopt -o hs:f:l:n:N: --long help,stop-on-failure,parallel,split-variants,baseline-file:,update-baseline,config-cache: -- "$@"`
 eval set -- "$TEMP"
 
 let first_test_index=0
@@ -34,6 +44,13 @@ let last_test_index=999
 let individual_run_count=1
 let overall_run_count=1
 let stop_on_failure=0
+let run_in_parallel=0
+let split_variants=0
+baseline_file=""
+let update_baseline=0
+let tests_return_code=0
+let performance_gate_return_code=0
+config_cache_dir=""
 
 while true; do
     case "$1" in
@@ -61,6 +78,26 @@ while true; do
             let stop_on_failure=1
             shift
             ;;
+        --parallel)
+            let run_in_parallel=1
+            shift
+            ;;
+        --split-variants)
+            let split_variants=1
+            shift
+            ;;
+        --baseline-file)
+            baseline_file=$2
+            shift 2
+            ;;
+        --update-baseline)
+            let update_baseline=1
+            shift
+            ;;
+        --config-cache)
+            config_cache_dir=$2
+            shift 2
+            ;;
         --)
             shift
             break
@@ -84,7 +121,53 @@ TIMESTAMP=`date '+%Y%m%d%H%M%S'`
 mkdir -p /tmp/pytest-of-${USER}
 ITGRUNNER_LOG_FILE="/tmp/pytest-of-${USER}/daqsystemtest_integtest_bundle_${TIMESTAMP}.log"
 
+# the generated configurations are only cached when asked for
+if [[ "${config_cache_dir}" != "" ]]; then
+  export DAQSYSTEMTEST_CONFIG_CACHE_DIR="${config_cache_dir}"
+fi
+
+# each test variant appends its performance measurements here
+export DAQSYSTEMTEST_PERFORMANCE_MEASUREMENTS="/tmp/pytest-of-${USER}/daqsystemtest_performance_${TIMESTAMP}.jsonl"
+
+# locate a test in the current directory, the development area, or the installed package
+find_test_path() {
+  if [[ -e "./$1" ]]; then
+    echo "./$1"
+  elif [[ -e "${DBT_AREA_ROOT}/sourcecode/daqsystemtest/integtest/$1" ]]; then
+    echo "${DBT_AREA_ROOT}/sourcecode/daqsystemtest/integtest/$1"
+  else
+    echo "${DAQSYSTEMTEST_SHARE}/integtest/$1"
+  fi
+}
+
 # run the tests
+if [[ ${run_in_parallel} -gt 0 ]]; then
+  selected_tests=()
+  let test_index=0
+  for TEST_NAME in ${integtest_list[@]}; do
+    if [[ ${test_index} -ge ${first_test_index} && ${test_index} -le ${last_test_index} ]]; then
+      selected_tests+=( `find_test_path ${TEST_NAME}` )
+    fi
+    let test_index=${test_index}+1
+  done
+
+  scheduler_options="-n ${individual_run_count} -N ${overall_run_count} --log-file ${ITGRUNNER_LOG_FILE}"
+  if [[ ${stop_on_failure} -gt 0 ]]; then
+    scheduler_options="${scheduler_options} --stop-on-failure"
+  fi
+  if [[ ${split_variants} -gt 0 ]]; then
+    scheduler_options="${scheduler_options} --split-variants"
+  fi
+  python3 -m daqsystemtest.integtest_scheduler ${scheduler_options} ${selected_tests[@]}
+  let scheduler_return_code=$?
+  if [[ ${scheduler_return_code} -ne 0 ]]; then
+    let tests_return_code=${scheduler_return_code}
+  fi
+
+  # the tests have all been run by the scheduler, so skip the serial loop below
+  let overall_run_count=0
+fi
+
 let overall_loop_count=0
 while [[ ${overall_loop_count} -lt ${overall_run_count} ]]; do
 
@@ -95,14 +178,11 @@ while [[ ${overall_loop_count} -lt ${overall_run_count} ]]; do
       let individual_loop_count=0
       while [[ ${individual_loop_count} -lt ${individual_run_count} ]]; do
         echo "===== Running ${TEST_NAME}" >> ${ITGRUNNER_LOG_FILE}
-        if [[ -e "./${TEST_NAME}" ]]; then
-          pytest -s ./${TEST_NAME} | tee -a ${ITGRUNNER_LOG_FILE}
-        elif [[ -e "${DBT_AREA_ROOT}/sourcecode/daqsystemtest/integtest/${TEST_NAME}" ]]; then
-          pytest -s ${DBT_AREA_ROOT}/sourcecode/daqsystemtest/integtest/${TEST_NAME} | tee -a ${ITGRUNNER_LOG_FILE}
-        else
-          pytest -s ${DAQSYSTEMTEST_SHARE}/integtest/${TEST_NAME} | tee -a ${ITGRUNNER_LOG_FILE}
-        fi
+        pytest -s `find_test_path ${TEST_NAME}` | tee -a ${ITGRUNNER_LOG_FILE}
         let pytest_return_code=${PIPESTATUS[0]}
+        if [[ ${pytest_return_code} -ne 0 ]]; then
+          let tests_return_code=${pytest_return_code}
+        fi
 
         let individual_loop_count=${individual_loop_count}+1
 
@@ -132,6 +212,24 @@ echo "Log file is: ${ITGRUNNER_LOG_FILE}"                 | tee -a ${ITGRUNNER_L
 echo ""                                                   | tee -a ${ITGRUNNER_LOG_FILE}
 grep '=====' ${ITGRUNNER_LOG_FILE} | egrep ' in |Running' | tee -a ${ITGRUNNER_LOG_FILE}
 
+# compare the performance with the baselines
+if [[ "${baseline_file}" != "" && -e "${DAQSYSTEMTEST_PERFORMANCE_MEASUREMENTS}" ]]; then
+  gate_options="--baseline-file ${baseline_file}"
+  if [[ ${update_baseline} -gt 0 ]]; then
+    gate_options="${gate_options} --update-baseline"
+  fi
+  if [[ ${run_in_parallel} -gt 0 ]]; then
+    echo "Note: the tests were run concurrently, which affects their performance" | tee -a ${ITGRUNNER_LOG_FILE}
+  fi
+  echo ""                                                 | tee -a ${ITGRUNNER_LOG_FILE}
+  echo "+++++++++++ PERFORMANCE vs BASELINE +++++++++++++" | tee -a ${ITGRUNNER_LOG_FILE}
+  python3 -m daqsystemtest.performance_gate ${DAQSYSTEMTEST_PERFORMANCE_MEASUREMENTS} ${gate_options} | tee -a ${ITGRUNNER_LOG_FILE}
+  let performance_gate_return_code=${PIPESTATUS[0]}
+  if [[ ${performance_gate_return_code} -ne 0 ]]; then
+    echo "===== Performance regression(s) found, see above" | tee -a ${ITGRUNNER_LOG_FILE}
+  fi
+fi
+
 # check again if the numad daemon is running
 numad_grep_output=`ps -ef | grep numad | grep -v grep`
 if [[ "${numad_grep_output}" != "" ]]; then
@@ -145,3 +243,9 @@ if [[ "${numad_grep_output}" != "" ]]; then
    echo "*** context switch can disrupt the stable running of the DAQ processes."          | tee -a ${ITGRUNNER_LOG_FILE}
    echo "********************************************************************************" | tee -a ${ITGRUNNER_LOG_FILE}
 fi
+
+# a failed test or a performance regression fails the bundle
+if [[ ${tests_return_code} -ne 0 ]]; then
+  exit ${tests_return_code}
+fi
+exit ${performance_gate_return_code}
@@ -0,0 +1,8 @@
+# Unit tests of the pure functions in python/daqsystemtest; they run without a DAQ
+# release, so make the package importable from the source tree
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "python"))
+
+pytest_plugins = ["pytester"]
@@ -0,0 +1,38 @@
+"""Inputs for the unit tests of the scan modules: OpMon JSON files and scan results."""
+
+import json
+
+
+def opmon_entry(measurement, application, substructure, second, data):
+    "One OpMon JSON entry, published at 10:00:<second>, whose data are integer fields"
+    return {
+        "time": f"2026-10-18T10:00:{second:02d}Z",
+        "measurement": f"dunedaq.{measurement}",
+        "origin": {"application": application, "substructure": list(substructure)},
+        "data": {name: {"uint64Value": str(value)} for name, value in data.items()},
+    }
+
+
+def request_handler_entry(application, link, second, requests, average_us, maximum_us):
+    "A RequestHandlerInfo entry of one data handler"
+    return opmon_entry(
+        "datahandlinglibs.opmon.RequestHandlerInfo",
+        application,
+        [link, "request_handler"],
+        second,
+        {
+            "num_requests_handled": requests,
+            "avg_request_response_time": average_us,
+            "max_request_response_time": maximum_us,
+        },
+    )
+
+
+def write_opmon_file(file_name, entries):
+    file_name.write_text("".join(json.dumps(entry) + "\n" for entry in entries))
+    return file_name
+
+
+def scan_results(field_names, rows, **common):
+    "One result per row: the common fields, overridden by the row's values of field_names"
+    return [{**common, **dict(zip(field_names, row))} for row in rows]
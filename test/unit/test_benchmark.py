@@ -0,0 +1,126 @@
+import json
+
+import h5py
+import numpy as np
+import pytest
+
+import daqsystemtest.benchmark as benchmark
+import scan_helpers
+
+
+def test_current_variant(monkeypatch):
+    monkeypatch.setenv("PYTEST_CURRENT_TEST", "scan.py::test_point[mode_250] (call)")
+    assert benchmark.current_variant() == "mode_250"
+    monkeypatch.setenv("PYTEST_CURRENT_TEST", "scan.py::test_point (call)")
+    assert benchmark.current_variant() == "default"
+
+
+def test_triggering_duration():
+    command_list = (
+        "boot conf start 101 wait 1 enable-triggers wait 30 disable-triggers wait 2 stop".split()
+        + "start 102 enable-triggers wait 12.5 disable-triggers wait 5".split()
+    )
+    assert benchmark.triggering_duration(command_list) == 42.5
+
+
+def test_sweep_parameters_and_substitutions():
+    parameters = benchmark.sweep_parameters("MinimalSystem", [1, 10], [1, 10])
+    assert len(parameters) == 4
+    assert parameters["MinimalSystem_10Hz_slowdown1"] == {
+        "base_config": "MinimalSystem",
+        "trigger_rate_hz": 10,
+        "data_rate_slowdown_factor": 1,
+    }
+    substitutions = benchmark.sweep_substitutions("minimal", parameters["MinimalSystem_10Hz_slowdown1"])
+    assert {"obj_class": "RandomTCMakerConf", "updates": {"trigger_rate_hz": 10}} in substitutions
+    assert {"obj_id": "minimal", "obj_class": "Session", "updates": {"data_rate_slowdown_factor": 1}} in substitutions
+
+
+def test_parameter_variants():
+    data_classes = pytest.importorskip("integrationtest.data_classes")
+    base_config = data_classes.drunc_config()
+    variants = benchmark.parameter_variants(
+        base_config,
+        {"small": {"size": 1}, "large": {"size": 2}},
+        lambda parameters: [{"obj_class": "LatencyBuffer", "updates": {"size": parameters["size"]}}],
+    )
+    assert list(variants) == ["small", "large"]
+    assert len(variants["large"].config_substitutions) == len(base_config.config_substitutions) + 1
+
+
+def test_record_point(tmp_path, monkeypatch):
+    results_file = tmp_path / "results.jsonl"
+    monkeypatch.setenv(benchmark.results_env_var, str(results_file))
+    results = []
+    benchmark.record_point("/some/dir/scan.py", "mode_250", {"size": 250}, {"size": 250, "warnings": 3}, results)
+    assert results == [{"size": 250, "warnings": 3}]
+    entry = json.loads(results_file.read_text())
+    assert entry["test"] == "scan.py"
+    assert entry["parameters"] == {"size": 250}
+    assert entry["metrics"] == {"warnings": 3}
+
+
+def test_scan(pytester, monkeypatch):
+    monkeypatch.setenv("PYTHONPATH", str(benchmark.Path(benchmark.__file__).parents[1]))
+    monkeypatch.setenv(benchmark.results_env_var, str(pytester.path / "results.jsonl"))
+    pytester.makepyfile(
+        test_scan="""
+import pytest
+
+import daqsystemtest.benchmark as benchmark
+
+scan = benchmark.Scan(
+    __file__,
+    {"small": {"size": 1}, "large": {"size": 2}},
+    "SUMMARY",
+    lambda results: [f"    size {result['size']}: {result['warnings']} warnings" for result in sorted(results, key=lambda result: result["size"])],
+)
+scan_summary = scan.summary
+
+
+@pytest.mark.parametrize("variant", ["large", "small"])
+def test_point(variant, monkeypatch):
+    monkeypatch.setenv("PYTEST_CURRENT_TEST", f"test_scan.py::test_point[{variant}] (call)")
+    parameters = scan.parameters()
+    scan.record({**parameters, "warnings": 3 * parameters["size"]})
+"""
+    )
+    outcome = pytester.runpytest_subprocess("-s", "-p", "no:cacheprovider")
+    outcome.assert_outcomes(passed=2)
+    assert "SUMMARY\n    size 1: 3 warnings\n    size 2: 6 warnings" in outcome.stdout.str()
+    entries = [json.loads(line) for line in (pytester.path / "results.jsonl").read_text().splitlines()]
+    assert [(entry["variant"], entry["parameters"], entry["metrics"]) for entry in entries] == [
+        ("large", {"size": 2}, {"warnings": 6}),
+        ("small", {"size": 1}, {"warnings": 3}),
+    ]
+
+
+def test_measure_run(tmp_path):
+    file_name = tmp_path / "run101.hdf5"
+    with h5py.File(file_name, "w") as h5file:
+        for record_name in ["TriggerRecord00001.0000", "TriggerRecord00001.0001", "TriggerRecord00002.0000"]:
+            h5file.create_dataset(f"{record_name}/RawData/TriggerRecordHeader", data=np.zeros(8, dtype=np.int8))
+    metrics = benchmark.measure_run([str(file_name)], 10)
+    assert metrics["record_count"] == 3
+    assert metrics["trigger_count"] == 2
+    assert metrics["sustained_trigger_rate_hz"] == 0.2
+    assert metrics["bytes_per_second"] == file_name.stat().st_size / 10
+
+
+def test_build_latency(tmp_path):
+    opmon_file = scan_helpers.write_opmon_file(
+        tmp_path / "info_minimal.json",
+        [
+            scan_helpers.opmon_entry(
+                "dfmodules.opmon.DFApplicationInfo",
+                "dfo-01",
+                ["dfo", application],
+                second,
+                {"outstanding_decisions": 1, "max_completion_time": microseconds},
+            )
+            for second, application, microseconds in [(1, "df-01", 20000), (1, "df-02", 0), (2, "df-01", 30000), (3, "df-02", 90000)]
+        ],
+    )
+    # the interval without a completed record is left out
+    assert benchmark.build_latency([opmon_file]) == {"p50_interval_max_ms": 30.0, "max_ms": 90.0}
+    assert benchmark.build_latency([]) == {"p50_interval_max_ms": None, "max_ms": None}
@@ -0,0 +1,65 @@
+import daqsystemtest.config_cache as config_cache
+
+generating_test = """
+import types
+import pytest
+
+pytest_plugins = ["daqsystemtest.config_cache"]
+
+object_databases = []
+confgen_arguments = {"variant": {"rate": 1.0}}
+
+
+@pytest.fixture(params=list(confgen_arguments))
+def create_config_files(request, tmp_path_factory):
+    config_dir = tmp_path_factory.mktemp("config")
+    (config_dir / "session.data.xml").write_text(str(config_dir / "session.data.xml"))
+    with open("generations.txt", "a") as generations:
+        generations.write("x")
+    return types.SimpleNamespace(config_dir=str(config_dir))
+
+
+def test_config(create_config_files):
+    session_file = create_config_files.config_dir + "/session.data.xml"
+    assert open(session_file).read() == session_file
+"""
+
+
+def run_twice(pytester, monkeypatch, cache_dir=None):
+    monkeypatch.setenv("PYTHONPATH", str(config_cache.Path(config_cache.__file__).parents[1]))
+    if cache_dir is not None:
+        monkeypatch.setenv(config_cache.cache_dir_env_var, str(cache_dir))
+    else:
+        monkeypatch.delenv(config_cache.cache_dir_env_var, raising=False)
+    pytester.makepyfile(test_generation=generating_test)
+    for run in range(2):
+        pytester.runpytest_subprocess("-p", "no:cacheprovider").assert_outcomes(passed=1)
+    return (pytester.path / "generations.txt").read_text()
+
+
+def test_cache_is_off_by_default(pytester, monkeypatch):
+    assert run_twice(pytester, monkeypatch) == "xx"
+
+
+def test_cache_hit_skips_generation(pytester, monkeypatch, tmp_path):
+    assert run_twice(pytester, monkeypatch, tmp_path / "cache") == "x"
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+
+
+def test_key_depends_on_generator_packages(monkeypatch):
+    key = config_cache.cache_key({"param": "variant"}, [], [])
+    monkeypatch.setattr(config_cache, "generator_fingerprint", lambda package_name: "changed")
+    assert config_cache.cache_key({"param": "variant"}, [], []) != key
+
+
+def test_generator_fingerprint():
+    assert config_cache.generator_fingerprint("no_such_package_here") == "<missing>"
+    assert config_cache.generator_fingerprint("daqsystemtest") != "<missing>"
+
+
+def test_relocate():
+    result = config_cache.relocate(
+        {"files": ["/old/config/a.xml", "/other/b.xml"], "dir": config_cache.Path("/old/config")},
+        {"/old/config": "/new/config"},
+    )
+    assert result == {"files": ["/new/config/a.xml", "/other/b.xml"], "dir": config_cache.Path("/new/config")}
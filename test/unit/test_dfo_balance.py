@@ -0,0 +1,73 @@
+import daqsystemtest.data_file_index as data_file_index
+import daqsystemtest.dfo_balance as dfo_balance
+import scan_helpers
+
+
+def test_dataflow_app():
+    assert data_file_index.dataflow_app("swtest_run000101_0000_df-02_datawriter_0_20261018T100000.hdf5") == "df-02"
+    assert data_file_index.dataflow_app("log_dfosweep_df-01_3335.txt") == "df-01"
+    assert data_file_index.dataflow_app("tpstream_run000101_0000_tpwriter_tpswriter_20261018T100000.hdf5") == "unknown"
+
+
+def test_td_send_retries_are_only_set_when_given():
+    assert dfo_balance.substitutions(dfo_balance.threshold_parameters([(2, 1)])["busy2_free1"])[0]["updates"] == {
+        "busy_threshold": 2,
+        "free_threshold": 1,
+    }
+    retried = dfo_balance.threshold_parameters([(2, 1)], td_send_retries=5)["busy2_free1"]
+    assert dfo_balance.substitutions(retried)[0]["updates"]["td_send_retries"] == 5
+
+
+def test_fairness():
+    assert dfo_balance.fairness([10, 10, 10]) == 1.0
+    assert dfo_balance.fairness([30, 0, 0]) == 1 / 3
+    assert dfo_balance.fairness([]) is None
+    assert dfo_balance.fairness([0, 0]) is None
+
+
+def test_busy_time():
+    samples = [(0.0, 0), (1.0, 2), (2.0, 2), (3.0, 1), (4.0, 0), (5.0, 3), (6.0, 0)]
+    # busy from 1 s to 3 s and from 5 s to 6 s
+    assert dfo_balance.busy_time(samples, 2, 1) == (3.0, 2)
+    assert dfo_balance.busy_time(samples, 4, 2) == (0.0, 0)
+
+
+def dfo_entry(df_app, second, data):
+    return scan_helpers.opmon_entry("dfmodules.opmon.DFApplicationInfo", "dfo-01", ["dfo", df_app], second, data)
+
+
+def mlt_entry(second, dead_ms):
+    return scan_helpers.opmon_entry("trigger.opmon.ModuleLevelTriggerInfo", "mlt", ["mlt"], second, {"lc_kDead": dead_ms})
+
+
+def test_balance_from_opmon_files(tmp_path):
+    opmon_file = scan_helpers.write_opmon_file(
+        tmp_path / "info_dfosweep.json",
+        [
+            dfo_entry("df-01", 1, {"outstanding_decisions": 2, "max_completion_time": 4000}),
+            dfo_entry("df-01", 3, {"outstanding_decisions": 0, "max_completion_time": 9000}),
+            mlt_entry(1, 1500),
+            mlt_entry(2, 500),
+        ],
+    )
+
+    assert dfo_balance.missing_opmon_fields([opmon_file]) == []
+    balance = dfo_balance.dataflow_app_balance([], [opmon_file], 2, 1)
+    assert balance == {
+        "df-01": {
+            "decisions": 0,
+            "token_round_trip_max_ms": 9.0,
+            "max_outstanding": 2.0,
+            "busy_seconds": 2.0,
+            "busy_intervals": 1,
+        }
+    }
+    assert dfo_balance.inhibited_seconds([opmon_file]) == 2.0
+
+
+def test_missing_opmon_fields(tmp_path):
+    opmon_file = scan_helpers.write_opmon_file(tmp_path / "info_dfosweep.json", [dfo_entry("df-01", 1, {"outstanding_decisions": 1})])
+    assert dfo_balance.missing_opmon_fields([opmon_file]) == [
+        "DFApplicationInfo.max_completion_time",
+        "ModuleLevelTriggerInfo.lc_kDead",
+    ]
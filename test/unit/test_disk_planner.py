@@ -0,0 +1,58 @@
+import pytest
+
+import daqsystemtest.disk_planner as disk_planner
+
+
+def test_record_and_expected_data_bytes():
+    # a window of 4096 ticks covers 3 frames of 2048 ticks
+    assert disk_planner.frames_per_window(4096) == 3
+    record_bytes = disk_planner.record_data_bytes(4096, 2)
+    assert record_bytes == pytest.approx(2 * (72 + 3 * 7200) * 1.02)
+    assert disk_planner.expected_data_bytes(0.5, 9, 4096, 2, number_of_runs=2) == pytest.approx(2 * 5 * record_bytes)
+
+
+def test_rolling_data_bytes():
+    assert disk_planner.rolling_data_bytes(1000, 2, 100) == 2 * 2 * 1100
+    assert disk_planner.rolling_data_bytes(1000, 2, 100, total_data_bytes=3000) == 3000
+
+
+class Validation:
+    def __init__(self, file_name, passed):
+        self.file_name = file_name
+        self.passed = passed
+
+    def print_report(self):
+        pass
+
+
+def test_rolling_pruner(tmp_path):
+    earlier_file = tmp_path / "earlier.hdf5"
+    earlier_file.write_text("")
+    pruner_validations = {"good.hdf5": True, "bad.hdf5": False}
+
+    def validate(file_name):
+        name = file_name.split("/")[-1]
+        if name not in pruner_validations:
+            raise OSError(f"can't open {name}")
+        return Validation(file_name, pruner_validations[name])
+
+    pruner = disk_planner.RollingPruner(tmp_path, validate)
+    for name in ["good.hdf5", "bad.hdf5", "broken.hdf5", "open.hdf5.writing"]:
+        (tmp_path / name).write_text("")
+
+    pruner.prune()
+    pruner.prune()  # files are only validated once
+
+    assert not (tmp_path / "good.hdf5").exists()
+    assert (tmp_path / "bad.hdf5").exists()
+    assert (tmp_path / "broken.hdf5").exists()
+    assert earlier_file.exists()
+    assert sorted(file_name.split("/")[-1] for file_name in pruner.validations) == ["bad.hdf5", "good.hdf5"]
+    assert list(pruner.errors) == [str(tmp_path / "broken.hdf5")]
+    assert "can't open broken.hdf5" in pruner.errors[str(tmp_path / "broken.hdf5")]
+
+    remaining = sorted(tmp_path.glob("*.hdf5*"))
+    assert disk_planner.unvalidated_data_files(remaining, pruner.validations.values()) == [
+        tmp_path / "broken.hdf5",
+        earlier_file,
+    ]
@@ -0,0 +1,91 @@
+import h5py
+import numpy as np
+
+import daqsystemtest.fragment_statistics as fragment_statistics
+import daqsystemtest.lazy_data_file as lazy_data_file
+
+
+def test_fragment_header_size():
+    assert fragment_statistics.fragment_header_size == 72
+
+
+def test_parse_fragment_dataset_name():
+    assert fragment_statistics.parse_fragment_dataset_name(
+        "TriggerRecord00001.0000/RawData/Detector_Readout_0x00000064_WIBEth"
+    ) == ("Detector_Readout", 0x64, "WIBEth")
+    assert fragment_statistics.parse_fragment_dataset_name(
+        "Trigger_0x00002710_Trigger_Candidate"
+    ) == ("Trigger", 0x2710, "Trigger_Candidate")
+    assert fragment_statistics.parse_fragment_dataset_name("TriggerRecordHeader") is None
+
+
+def test_size_statistics():
+    record_indices = [0, 1, 2, 3, 0, 1, 2]
+    source_ids = [100, 100, 100, 100, 101, 101, 101]
+    sizes = [1000, 1000, 1000, 9000, 500, 600, 700]
+    statistics = fragment_statistics.size_statistics(record_indices, source_ids, sizes, record_count=4)
+
+    assert sorted(statistics) == [100, 101]
+    assert statistics[100]["fragment_count"] == 4
+    assert statistics[100]["records_without_fragment"] == 0
+    assert statistics[100]["min_size"] == 1000
+    assert statistics[100]["max_size"] == 9000
+    assert statistics[100]["mean_size"] == 3000.0
+    assert statistics[100]["outlier_records"] == [3]
+    assert statistics[101]["records_without_fragment"] == 1
+    assert statistics[101]["percentile_sizes"][50] == 600.0
+    assert statistics[101]["outlier_records"] == []
+
+
+def test_size_statistics_without_fragments():
+    assert fragment_statistics.size_statistics([], [], [], record_count=3) == {}
+
+
+def test_fragment_headers_with_high_bytes(tmp_path):
+    header = np.zeros(1, dtype=fragment_statistics.fragment_header_dtype)
+    header["trigger_timestamp"] = 0xFFEEDDCCBBAA9988
+    header["window_end"] = 0x80808080
+    file_name = tmp_path / "test.hdf5"
+    with h5py.File(file_name, "w") as h5file:
+        # fragments are stored as signed chars
+        h5file.create_dataset(
+            "TriggerRecord00001.0000/RawData/Detector_Readout_0x00000064_WIBEth",
+            data=np.frombuffer(header.tobytes() + bytes(8), dtype=np.int8),
+        )
+    with h5py.File(file_name, "r") as h5file:
+        records = lazy_data_file.build_record_index(h5file, read_headers=True)
+    fragment = records[0].fragments[0]
+    assert fragment.trigger_timestamp == 0xFFEEDDCCBBAA9988
+    assert fragment.window_end == 0x80808080
+    with lazy_data_file.LazyDataFile(file_name) as data_file:
+        assert data_file.fragment_header(data_file.records[0].fragments[0])["window_end"] == 0x80808080
+
+
+def test_format_statistics():
+    statistics = fragment_statistics.size_statistics([0, 1], [0x64, 0x64], [72, 80], record_count=2)
+    lines = fragment_statistics.format_statistics("WIBEth", statistics)
+    assert len(lines) == 1
+    assert "WIBEth 0x00000064: 2 fragments" in lines[0]
+
+
+def test_read_fragment_headers_in_one_batch(tmp_path):
+    headers = np.zeros(3, dtype=fragment_statistics.fragment_header_dtype)
+    headers["trigger_number"] = [1, 2, 3]
+    headers["window_begin"] = [10, 20, 0xFF00000000000000]
+    file_name = tmp_path / "test.hdf5"
+    with h5py.File(file_name, "w") as h5file:
+        for index, header in enumerate(headers):
+            h5file.create_dataset(
+                f"TriggerRecord0000{index + 1}.0000/RawData/Detector_Readout_0x00000064_WIBEth",
+                data=np.frombuffer(header.tobytes() + bytes(100), dtype=np.int8),
+            )
+    with h5py.File(file_name, "r") as h5file:
+        records = lazy_data_file.build_record_index(h5file, read_headers=True)
+    offsets = [record.fragments[0].offset for record in records]
+    assert None not in offsets
+
+    read_headers = fragment_statistics.read_fragment_headers(file_name, offsets)
+    assert read_headers.dtype == fragment_statistics.fragment_header_dtype
+    assert list(read_headers["trigger_number"]) == [1, 2, 3]
+    assert [record.fragments[0].window_begin for record in records] == [10, 20, 0xFF00000000000000]
+    assert len(fragment_statistics.read_fragment_headers(file_name, [])) == 0
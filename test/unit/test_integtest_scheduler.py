@@ -0,0 +1,65 @@
+import daqsystemtest.integtest_scheduler as integtest_scheduler
+
+
+def test_read_test_requirements(tmp_path):
+    test_path = tmp_path / "big_test.py"
+    test_path.write_text("minimum_cpu_count = 24\nminimum_free_memory_gb = 52\nrun_duration = some_function()\n")
+    requirements = integtest_scheduler.read_test_requirements(test_path)
+    assert (requirements.cpu_count, requirements.free_memory_gb, requirements.free_disk_space_gb) == (
+        24,
+        52,
+        integtest_scheduler.default_free_disk_space_gb,
+    )
+
+
+def test_conflicts_with(tmp_path):
+    requirements = integtest_scheduler.TestRequirements(1, 1, 1)
+    first = integtest_scheduler.ScheduledTest(tmp_path / "a_test.py", 0, requirements, "variant1", [])
+    second = integtest_scheduler.ScheduledTest(tmp_path / "a_test.py", 0, requirements, "variant2", [])
+    whole_file = integtest_scheduler.ScheduledTest(tmp_path / "a_test.py", 1, requirements)
+    other_file = integtest_scheduler.ScheduledTest(tmp_path / "b_test.py", 0, requirements)
+    # the variants of one file share its session name
+    assert first.conflicts_with(second)
+    assert first.conflicts_with(whole_file)
+    assert not first.conflicts_with(other_file)
+
+
+class FakeTest(integtest_scheduler.ScheduledTest):
+    def launch(self, top_dir, port):
+        self.port = port
+
+
+def scheduler(tmp_path, tests, cpu_count, free_memory_gb):
+    test_scheduler = integtest_scheduler.IntegtestScheduler(tests, tmp_path)
+    test_scheduler.cpu_count = cpu_count
+    test_scheduler.free_memory_gb = free_memory_gb
+    test_scheduler.free_disk_space_gb = 100
+    return test_scheduler
+
+
+def test_launch_what_fits(tmp_path, monkeypatch):
+    monkeypatch.setattr(integtest_scheduler, "port_is_free", lambda port: True)
+    tests = [
+        FakeTest(tmp_path / "small_test.py", 0, integtest_scheduler.TestRequirements(2, 2, 1)),
+        FakeTest(tmp_path / "big_test.py", 0, integtest_scheduler.TestRequirements(6, 8, 1)),
+        FakeTest(tmp_path / "medium_test.py", 0, integtest_scheduler.TestRequirements(4, 4, 1)),
+        FakeTest(tmp_path / "medium_test.py", 1, integtest_scheduler.TestRequirements(4, 4, 1)),
+    ]
+    test_scheduler = scheduler(tmp_path, tests, 12, 16)
+    test_scheduler.launch_what_fits(tmp_path)
+    # the biggest tests are placed first, and the second run of medium_test.py waits for the first
+    assert [test.label for test in test_scheduler.running] == ["big_test.py", "medium_test.py", "small_test.py"]
+    assert [test.iteration for test in test_scheduler.pending] == [1]
+    assert len({test.port for test in test_scheduler.running}) == 3
+
+
+def test_oversized_test_runs_alone(tmp_path, monkeypatch):
+    monkeypatch.setattr(integtest_scheduler, "port_is_free", lambda port: True)
+    tests = [
+        FakeTest(tmp_path / "huge_test.py", 0, integtest_scheduler.TestRequirements(64, 256, 1)),
+        FakeTest(tmp_path / "small_test.py", 0, integtest_scheduler.TestRequirements(2, 2, 1)),
+    ]
+    test_scheduler = scheduler(tmp_path, tests, 8, 16)
+    test_scheduler.launch_what_fits(tmp_path)
+    assert [test.label for test in test_scheduler.running] == ["huge_test.py"]
+    assert [test.label for test in test_scheduler.pending] == ["small_test.py"]
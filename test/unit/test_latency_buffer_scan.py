@@ -0,0 +1,60 @@
+import daqsystemtest.latency_buffer_scan as latency_buffer_scan
+import scan_helpers
+
+
+def test_allocation_mode_substitutions():
+    parameters = latency_buffer_scan.scan_parameters([250])
+    updates = {
+        parameters[f"{mode}_250"]["mode"]: latency_buffer_scan.substitutions(parameters[f"{mode}_250"])[0]["updates"]
+        for mode in latency_buffer_scan.allocation_modes
+    }
+    # the default mode only resizes the buffer, the others also switch their allocation on
+    assert updates["default"] == {"size": 250}
+    assert updates["preallocation"] == {"size": 250, "preallocation": True}
+    assert updates["numa_aware"] == {"size": 250, "numa_aware": True, "numa_node": 0}
+
+
+def test_request_handler_warning_counts(tmp_path):
+    readout_log = tmp_path / "log_user_lbscan_ru-01_3334.txt"
+    readout_log.write_text(
+        "2024-Oct-18 WARNING [datahandlinglibs::RequestOnEmptyBuffer] Request on empty buffer: link 0\n"
+        "2024-Oct-18 WARNING Request timed out for link 1\n"
+        "2024-Oct-18 WARNING Trigger Matching result with empty fragment: link 1\n"
+        # unrelated problems that merely mention a timeout or an empty buffer
+        "2024-Oct-18 WARNING Connection timeout while sending to df-01\n"
+        "2024-Oct-18 ERROR Sender queue empty buffer pool exhausted\n"
+        "2024-Oct-18 INFO all good\n"
+    )
+    dataflow_log = tmp_path / "log_user_lbscan_df-01_3335.txt"
+    dataflow_log.write_text("2024-Oct-18 WARNING Request timed out\n")
+    counts = latency_buffer_scan.request_handler_warning_counts([readout_log, dataflow_log])
+    assert counts == {"empty_buffer": 1, "timeout": 1, "data_not_found": 1}
+
+
+class RunResult:
+    def __init__(self, log_files, process_statistics):
+        self.log_files = log_files
+        self.process_statistics = process_statistics
+
+
+def test_point_result_is_not_sustained_with_warnings(tmp_path):
+    readout_log = tmp_path / "log_user_lbscan_ru-01_3334.txt"
+    readout_log.write_text("2024-Oct-18 WARNING Request timed out for link 1\n")
+    gigabyte = 1024 * 1024 * 1024
+    process_statistics = {
+        name: {"max_rss_bytes": gigabyte, "minor_page_faults": 10, "major_page_faults": 1}
+        for name in ["ru-01", "ru-02", "df-01"]
+    }
+    point = latency_buffer_scan.point_result({"mode": "default", "size": 250}, RunResult([readout_log], process_statistics), True)
+    # only the readout applications count
+    assert (point["readout_max_rss_bytes"], point["readout_minor_page_faults"]) == (2 * gigabyte, 20)
+    assert point["request_handler_warnings"]["timeout"] == 1
+    assert not point["sustained"]
+
+
+def test_smallest_sustaining_sizes():
+    results = scan_helpers.scan_results(
+        ("mode", "size", "sustained"),
+        [("default", 250, False), ("default", 1000, True), ("default", 4000, True), ("preallocation", 250, False)],
+    )
+    assert latency_buffer_scan.smallest_sustaining_sizes(results) == {"default": 1000, "preallocation": None}
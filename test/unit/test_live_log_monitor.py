@@ -0,0 +1,24 @@
+import subprocess
+import sys
+
+import psutil
+
+import daqsystemtest.live_log_monitor as live_log_monitor
+
+sleeper = [sys.executable, "-c", "import time; time.sleep(60)"]
+
+
+def test_abort_terminates_only_the_drunc_processes():
+    drunc_process = subprocess.Popen(sleeper + ["drunc-unified-shell"])
+    other_process = subprocess.Popen(sleeper)
+    try:
+        assert [process.pid for process in live_log_monitor.drunc_processes()] == [drunc_process.pid]
+        processes = live_log_monitor.terminate_session_processes()
+        gone, alive = psutil.wait_procs(processes, timeout=10)
+        assert not alive
+        assert drunc_process.wait(timeout=10) is not None
+        assert other_process.poll() is None
+    finally:
+        for process in (drunc_process, other_process):
+            process.kill()
+            process.wait()
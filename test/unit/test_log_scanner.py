@@ -0,0 +1,35 @@
+import daqsystemtest.log_scanner as log_scanner
+
+
+def test_line_written_in_two_parts_is_scanned_once(tmp_path):
+    log_file = tmp_path / "log_test_ru.txt"
+    log_file.write_bytes(b"2026-Oct-18 INFO starting\n2026-Oct-18 ERR")
+    scanner = log_scanner.LogScanner()
+
+    state = scanner.scan_file(log_file, final=False)
+    assert state.all_problems() == []
+    assert state.offset == len(b"2026-Oct-18 INFO starting\n")
+
+    with open(log_file, "ab") as log:
+        log.write(b"OR expected failure\n")
+    state = scanner.scan_file(log_file, ("^2026-Oct-18 ERROR expected",), final=False)
+    assert state.problems == []
+    assert state.ignored_problem_count == 1
+    assert state.line_count == 2
+
+
+def test_unterminated_last_line_is_checked_by_a_final_scan(tmp_path):
+    log_file = tmp_path / "log_test_ru.txt"
+    log_file.write_bytes(b"INFO starting\nFATAL stopped")
+    scanner = log_scanner.LogScanner()
+
+    state = scanner.scan_file(log_file)
+    assert state.all_problems() == ["FATAL stopped"]
+    assert state.problems == []
+    assert state.offset == len(b"INFO starting\n")
+    assert not scanner.logs_are_error_free([log_file], print_logfilename_for_problems=False)
+
+    # once the line is complete it is found exactly once
+    with open(log_file, "ab") as log:
+        log.write(b" for good\n")
+    assert scanner.scan_file(log_file).all_problems() == ["FATAL stopped for good"]
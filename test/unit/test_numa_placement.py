@@ -0,0 +1,51 @@
+import daqsystemtest.numa_placement as numa_placement
+import scan_helpers
+
+
+def test_parse_cpu_list():
+    assert numa_placement.parse_cpu_list("0-3,8,10-11\n") == [0, 1, 2, 3, 8, 10, 11]
+    assert numa_placement.parse_cpu_list("") == []
+
+
+def test_placement_parameters_of_one_node():
+    parameters = numa_placement.placement_parameters({0: [0, 1, 2, 3]})
+    assert sorted(parameters) == ["pinned_node0", "unpinned"]
+    assert parameters["unpinned"]["cpus"] is None
+    assert numa_placement.substitutions(parameters["unpinned"]) == []
+
+
+def test_placement_parameters_of_two_nodes():
+    parameters = numa_placement.placement_parameters({0: [0, 1], 1: [2, 3]})
+    assert sorted(parameters) == ["cross_node0_cpus1", "pinned_node0", "pinned_node1", "unpinned"]
+    cross = parameters["cross_node0_cpus1"]
+    assert (cross["cpu_node"], cross["memory_node"], cross["cpus"]) == (1, 0, [2, 3])
+    assert numa_placement.substitutions(cross) == [
+        {"obj_id": "def-latency-buf", "obj_class": "LatencyBuffer", "updates": {"numa_aware": True, "numa_node": 0}},
+    ]
+
+
+def test_compare_placements():
+    changes = numa_placement.compare_placements(
+        {
+            "unpinned": {"records_per_second": 10.0, "readout_cpu_seconds": 0},
+            "pinned_node0": {"records_per_second": 12.0, "readout_cpu_seconds": 5},
+        }
+    )
+    assert changes == {"pinned_node0": {"records_per_second": 0.2}}
+    assert numa_placement.compare_placements({"pinned_node0": {"records_per_second": 1.0}}) == {}
+
+
+def test_readout_request_latency(tmp_path):
+    opmon_file = scan_helpers.write_opmon_file(
+        tmp_path / "info_numa.json",
+        [
+            scan_helpers.request_handler_entry(application, "datahandler_100", 1, 10, average, maximum)
+            for application, average, maximum in [("ru-01", 2000, 5000), ("ru-02", 3000, 4000), ("tc-maker-1", 9000, 90000)]
+        ],
+    )
+    # the trigger's data handlers aren't part of the readout
+    assert numa_placement.readout_request_latency([opmon_file]) == {
+        "readout_p99_interval_avg_ms": 3.0,
+        "readout_max_response_ms": 5.0,
+    }
+    assert numa_placement.readout_request_latency([]) == {"readout_p99_interval_avg_ms": None, "readout_max_response_ms": None}
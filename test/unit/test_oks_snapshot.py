@@ -0,0 +1,33 @@
+from pathlib import Path
+
+import daqsystemtest.oks_snapshot as oks_snapshot
+
+repo_dir = Path(__file__).resolve().parents[2]
+
+
+def test_default_snapshot_is_parsed_once(monkeypatch):
+    monkeypatch.chdir(repo_dir)
+    oks_snapshot.default_snapshot.cache_clear()
+    try:
+        snapshot = oks_snapshot.default_snapshot()
+        assert oks_snapshot.default_snapshot() is snapshot
+        assert snapshot.objects_of_class("LatencyBuffer")
+    finally:
+        oks_snapshot.default_snapshot.cache_clear()
+
+
+def test_include_graph_hashes_follow_the_files(tmp_path):
+    included_file = tmp_path / "included.data.xml"
+    included_file.write_text('<oks-data>\n<obj class="LatencyBuffer" id="lb">\n <attr name="size" type="u32" val="100"/>\n</obj>\n</oks-data>\n')
+    root_file = tmp_path / "root.data.xml"
+    root_file.write_text('<oks-data>\n<include>\n <file path="included.data.xml"/>\n <file path="missing.data.xml"/>\n</include>\n</oks-data>\n')
+
+    files = oks_snapshot.include_graph([str(root_file)], [tmp_path])
+    assert sorted(files) == sorted(["included.data.xml", "missing.data.xml", str(root_file)])
+    assert files["missing.data.xml"].sha256 is None
+    first_hash = files["included.data.xml"].sha256
+
+    included_file.write_text(included_file.read_text().replace('val="100"', 'val="2000"'))
+    assert oks_snapshot.include_graph([str(root_file)], [tmp_path])["included.data.xml"].sha256 != first_hash
+    snapshot = oks_snapshot.build_snapshot([str(root_file)], [tmp_path])
+    assert snapshot.get("LatencyBuffer", "lb").attributes["size"] == 2000
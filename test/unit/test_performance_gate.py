@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+pytest.importorskip("integrationtest")  # for data_file_validation
+
+import daqsystemtest.performance_gate as performance_gate
+
+
+def test_compare_metric():
+    # bigger is better, 10% allowed
+    assert performance_gate.compare_metric("records_per_second", 95.0, 100.0) == (False, -0.05)
+    regressed, change = performance_gate.compare_metric("records_per_second", 80.0, 100.0)
+    assert regressed and change == -0.2
+    # smaller is better: worse by 50% and by more than 1 s
+    assert not performance_gate.compare_metric("validation_time_s", 1.8, 1.0)[0]
+    assert performance_gate.compare_metric("validation_time_s", 4.0, 2.0)[0]
+    assert not performance_gate.compare_metric("validation_time_s", 0.1, 2.0)[0]
+
+
+def write_measurements(file_name, records_per_second):
+    entry = {
+        "host": {"host_class": "16cpu_64gb"},
+        "test": "minimal_system_quick_test.py",
+        "variant": "MinimalSystem",
+        "metrics": {"records_per_second": records_per_second},
+    }
+    file_name.write_text(json.dumps(entry) + "\n")
+
+
+def test_gate_exit_status(tmp_path):
+    measurements = tmp_path / "measurements.jsonl"
+    baseline_file = tmp_path / "baselines.json"
+    write_measurements(measurements, 10.0)
+    assert performance_gate.main([str(measurements), "--baseline-file", str(baseline_file), "--update-baseline"]) == 0
+    assert json.loads(baseline_file.read_text())["16cpu_64gb"]["minimal_system_quick_test.py"]["MinimalSystem"] == {
+        "records_per_second": 10.0
+    }
+
+    write_measurements(measurements, 9.5)
+    assert performance_gate.main([str(measurements), "--baseline-file", str(baseline_file)]) == 0
+    write_measurements(measurements, 5.0)
+    assert performance_gate.main([str(measurements), "--baseline-file", str(baseline_file)]) == 1
+
+
+def test_build_latency_budget():
+    # smaller is better: a regression needs to be worse by 25% and by more than 5 ms
+    assert not performance_gate.compare_metric("tr_build_latency_ms", 12.0, 10.0)[0]
+    assert not performance_gate.compare_metric("tr_build_latency_ms", 14.0, 10.0)[0]
+    assert performance_gate.compare_metric("tr_build_latency_ms", 40.0, 20.0)[0]
+
+
+class PrunedValidation:
+    def __init__(self, file_name, record_count, size_bytes, passed=True):
+        self.file_name = str(file_name)
+        self.record_count = record_count
+        self.size_bytes = size_bytes
+        self.passed = passed
+
+
+class RunResult:
+    def __init__(self, data_files, pruned_data_files):
+        self.data_files = data_files
+        self.pruned_data_files = pruned_data_files
+
+
+def test_throughput_counts_pruned_files(tmp_path):
+    # both files were deleted by the rolling pruning, the second one after the run had listed its data files
+    first_file, second_file = tmp_path / "first.hdf5", tmp_path / "second.hdf5"
+    run_nanorc = RunResult(
+        [second_file],
+        [PrunedValidation(first_file, 10, 3 * 1024 * 1024), PrunedValidation(second_file, 6, 1024 * 1024)],
+    )
+    metrics = performance_gate.throughput_metrics(run_nanorc, ["enable-triggers", "wait", "4", "disable-triggers"])
+    assert metrics == {"records_per_second": 4.0, "mb_per_second": 1.0}
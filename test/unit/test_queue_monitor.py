@@ -0,0 +1,27 @@
+import daqsystemtest.queue_monitor as queue_monitor
+
+
+def sample(time, run, **fields):
+    return {"time": time, "run": run, "queue": "ru-01/queue-a", "capacity": 100.0, **fields}
+
+
+def test_queue_time_series():
+    samples = [
+        sample(0.0, 101, number_of_elements=10.0, num_pushes=5.0, num_pops=5.0),
+        # counters that merely mention a push or a pop don't count
+        sample(2.0, 101, number_of_elements=96.0, num_pushes=40.0, num_pops=20.0, push_timeouts=7.0, pop_bytes=4096.0),
+        # the first sample of the next run has no previous sample to take a rate from
+        sample(30.0, 102, number_of_elements=0.0, num_pushes=90.0, num_pops=90.0),
+        sample(31.0, 102, number_of_elements=0.0),
+    ]
+    series = queue_monitor.queue_time_series(samples)["ru-01/queue-a"]
+    assert "push_rate_hz" not in series[0]
+    assert series[1]["push_rate_hz"] == 20.0
+    assert series[1]["pop_rate_hz"] == 10.0
+    assert series[1]["full"] and not series[0]["full"]
+    assert "push_rate_hz" not in series[2]
+    assert "push_rate_hz" not in series[3]
+
+    statistics = queue_monitor.queue_statistics({"ru-01/queue-a": series})["ru-01/queue-a"]
+    assert statistics["full_samples"] == 1
+    assert statistics["mean_push_rate_hz"] == 20.0
@@ -0,0 +1,60 @@
+import daqsystemtest.oks_snapshot as oks_snapshot
+import daqsystemtest.queue_tuning as queue_tuning
+import scan_helpers
+
+
+def queue_descriptor(uid, queue_type, capacity):
+    return (
+        f'<obj class="QueueDescriptor" id="{uid}">\n'
+        f' <attr name="queue_type" type="enum" val="{queue_type}"/>\n'
+        f' <attr name="capacity" type="u32" val="{capacity}"/>\n'
+        "</obj>\n"
+    )
+
+
+def test_allowed_queue_types():
+    # only single-producer/single-consumer queues may be tried as MPMC queues, never the other way round
+    assert queue_tuning.allowed_queue_types(queue_tuning.spsc_queue_type) == [queue_tuning.spsc_queue_type, queue_tuning.mpmc_queue_type]
+    assert queue_tuning.allowed_queue_types(queue_tuning.mpmc_queue_type) == [queue_tuning.mpmc_queue_type]
+
+
+def test_recommend_prefers_the_smallest_clean_setting():
+    results = scan_helpers.scan_results(
+        ("capacity", "queue_type", "records_per_second", "push_timeouts"),
+        [
+            (11, queue_tuning.spsc_queue_type, 10.0, 3),
+            (50, queue_tuning.mpmc_queue_type, 9.95, 0),
+            (50, queue_tuning.spsc_queue_type, 9.9, 0),
+            (200, queue_tuning.spsc_queue_type, 10.0, 0),
+        ],
+        descriptor="trigger-records",
+        drop_fraction=0.0,
+    )
+    recommendation = queue_tuning.recommend(results)["trigger-records"]
+    assert (recommendation["queue_type"], recommendation["capacity"]) == (queue_tuning.spsc_queue_type, 50)
+
+
+def test_write_overlays_writes_one_file_per_source(tmp_path):
+    first_file = tmp_path / "first.data.xml"
+    first_file.write_text("<oks-data>\n" + queue_descriptor("trigger-records", queue_tuning.spsc_queue_type, 11) + "</oks-data>\n")
+    second_file = tmp_path / "second.data.xml"
+    second_file.write_text("<oks-data>\n" + queue_descriptor("wib-eth-raw-input", queue_tuning.spsc_queue_type, 1000) + "</oks-data>\n")
+    snapshot = oks_snapshot.build_snapshot([str(first_file), str(second_file)], [tmp_path])
+    descriptors = queue_tuning.queue_descriptors(snapshot)
+    recommendations = {
+        "trigger-records": {"queue_type": queue_tuning.spsc_queue_type, "capacity": 50},
+        "wib-eth-raw-input": {"queue_type": queue_tuning.mpmc_queue_type, "capacity": 10000},
+    }
+    output_dir = tmp_path / "overlays"
+    output_dir.mkdir()
+
+    overlays = queue_tuning.write_overlays(recommendations, descriptors, snapshot, output_dir)
+
+    assert sorted(path.name for path in overlays) == ["recommended-first.data.xml", "recommended-second.data.xml"]
+    assert overlays[output_dir / "recommended-first.data.xml"] == {
+        "trigger-records": ((queue_tuning.spsc_queue_type, 11), (queue_tuning.spsc_queue_type, 50))
+    }
+    second_overlay = (output_dir / "recommended-second.data.xml").read_text()
+    assert f'val="{queue_tuning.mpmc_queue_type}"' in second_overlay
+    assert 'val="10000"' in second_overlay
+    assert "trigger-records" not in second_overlay
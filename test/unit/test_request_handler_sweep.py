@@ -0,0 +1,53 @@
+import pytest
+
+import daqsystemtest.request_handler_sweep as request_handler_sweep
+import scan_helpers
+
+
+def test_weighted_percentile():
+    values_and_weights = [(1.0, 98), (5.0, 1), (50.0, 1)]
+    assert request_handler_sweep.weighted_percentile(values_and_weights, 50) == 1.0
+    assert request_handler_sweep.weighted_percentile(values_and_weights, 99) == 5.0
+    assert request_handler_sweep.weighted_percentile(values_and_weights, 100) == 50.0
+
+
+def test_request_timeout_is_only_set_when_swept():
+    parameters = request_handler_sweep.sweep_parameters([2], request_timeouts=[None, 1000])
+    configured = request_handler_sweep.substitutions(parameters["2threads_limit0.5_size0.8"])
+    assert [substitution["obj_id"] for substitution in configured] == request_handler_sweep.default_request_handlers
+    assert all("request_timeout" not in substitution["updates"] for substitution in configured)
+    swept = request_handler_sweep.substitutions(parameters["2threads_limit0.5_size0.8_timeout1000"])
+    assert all(substitution["updates"]["request_timeout"] == 1000 for substitution in swept)
+
+
+def test_service_time_histograms(tmp_path):
+    opmon_file = scan_helpers.write_opmon_file(
+        tmp_path / "info_rhsweep.json",
+        [
+            scan_helpers.request_handler_entry("ru-01", "link0", 1, 99, 1000, 2000),
+            scan_helpers.request_handler_entry("ru-01", "link0", 2, 1, 10000, 30000),
+            scan_helpers.request_handler_entry("ru-01", "link0", 3, 0, 0, 0),  # an interval without requests
+            scan_helpers.request_handler_entry("ru-01", "link1", 1, 10, 500, 700),
+        ],
+    )
+
+    histograms = request_handler_sweep.service_time_histograms([opmon_file])
+
+    assert histograms["ru-01/link0/request_handler"] == {
+        "requests": 100,
+        "p50_interval_avg_ms": pytest.approx(1.0),
+        "p99_interval_avg_ms": pytest.approx(1.0),
+        "max_ms": pytest.approx(30.0),
+    }
+    assert histograms["ru-01/link1/request_handler"]["requests"] == 10
+
+
+def test_cheapest_within_budget():
+    results = scan_helpers.scan_results(
+        ("handler_threads", "pop_limit_pct", "worst_p99_interval_avg_ms", "request_handler_warnings"),
+        [(1, 0.5, 8.0, {}), (2, 0.5, 3.0, {}), (2, 0.8, 4.0, {}), (1, 0.8, 1.0, {"timeout": 2})],
+        data_files_passed=True,
+    )
+    cheapest = request_handler_sweep.cheapest_within_budget(results, 5.0)
+    assert (cheapest["handler_threads"], cheapest["pop_limit_pct"]) == (2, 0.8)
+    assert request_handler_sweep.cheapest_within_budget(results, 0.5) is None
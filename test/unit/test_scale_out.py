@@ -0,0 +1,54 @@
+import daqsystemtest.scale_out as scale_out
+
+
+def test_saturation_parameters_skip_what_does_not_fit(monkeypatch):
+    monkeypatch.setattr(scale_out.Topology, "fits_on_this_computer", lambda topology: topology.data_producers < 4)
+    small = scale_out.Topology(1, 1, 1)
+    parameters, skipped = scale_out.saturation_parameters([small, scale_out.Topology(2, 2, 1)], [5, 50])
+    assert [topology.name for topology in skipped] == ["2ru2s1df"]
+    assert sorted(parameters) == ["1ru1s1df_50Hz", "1ru1s1df_5Hz"]
+    assert scale_out.Topology.from_parameters(parameters["1ru1s1df_50Hz"]).name == small.name
+
+
+def scaling_results(rows):
+    "results from rows of (topology, trigger rate, trigger count, MB/s)"
+    return [
+        {**topology.parameters(), "trigger_rate_hz": trigger_rate, "trigger_count": trigger_count, "mb_per_second": mb_per_second}
+        for topology, trigger_rate, trigger_count, mb_per_second in rows
+    ]
+
+
+def test_saturation_points():
+    small = scale_out.Topology(1, 1, 1)
+    large = scale_out.Topology(2, 2, 1)
+    results = scaling_results(
+        [
+            (small, 5, 100, 1.0),
+            (small, 50, 600, 6.0),  # 60% of the 1000 requested triggers: saturated
+            (large, 5, 100, 4.0),
+            (large, 50, 990, 40.0),
+        ]
+    )
+    points = {topology.name: (throughput, saturated) for topology, throughput, saturated in scale_out.saturation_points(results, 20)}
+    assert points == {"1ru1s1df": (6.0, True), "2ru2s1df": (40.0, False)}
+
+
+def test_scaling_knee():
+    points = [
+        (scale_out.Topology(2, 2, 1), 12.0),
+        (scale_out.Topology(1, 1, 1), 6.0),
+        (scale_out.Topology(4, 2, 1), 24.0),
+    ]
+    curve, knee = scale_out.scaling_knee(points)
+    assert [topology.name for topology, throughput, efficiency in curve] == ["1ru1s1df", "2ru2s1df", "4ru2s1df"]
+    assert [efficiency for topology, throughput, efficiency in curve] == [1.0, 0.5, 0.5]
+    assert knee.name == "2ru2s1df"
+    assert scale_out.scaling_knee([]) == ([], None)
+
+
+def test_format_results_without_saturation():
+    # every topology kept up with the highest rate, so the curve says nothing about scaling
+    results = scaling_results([(scale_out.Topology(1, 1, 1), 50, 1000, 6.0), (scale_out.Topology(2, 2, 1), 50, 1000, 12.0)])
+    lines = scale_out.format_results(results, 20, 50)
+    assert lines[-1].startswith("    saturation was not reached by any topology at 50 Hz")
+    assert not any("stops scaling" in line for line in lines)
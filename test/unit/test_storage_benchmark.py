@@ -0,0 +1,32 @@
+import daqsystemtest.storage_benchmark as storage_benchmark
+
+
+def test_retry_policy_substitution():
+    point = storage_benchmark.benchmark_parameters([20], [16 * 1024 * 1024])["20Hz_16777216B_fast_retry"]
+    data_writer = storage_benchmark.substitutions(point)[-1]
+    assert (data_writer["obj_id"], data_writer["obj_class"]) == (storage_benchmark.data_writer_id, "DataWriterConf")
+    assert data_writer["updates"] == storage_benchmark.retry_policies["fast_retry"]
+
+
+def test_rollover_stalls(monkeypatch):
+    # (trigger number, trigger time, creation time) of the records of each file
+    record_times = {
+        "second.hdf5": [(4, 0.0, 105), (5, 0.0, 106)],  # opened 3 s after the last record of first.hdf5
+        "first.hdf5": [(1, 0.0, 100), (2, 0.0, 101), (3, 0.0, 102)],
+        "third.hdf5": [(6, 0.0, 107), (7, 0.0, None)],
+    }
+    monkeypatch.setattr(storage_benchmark.benchmark, "record_times", record_times.get)
+    # the usual gap between records is 1 s, so only the first rollover stalled, by 2 s
+    assert storage_benchmark.rollover_stalls(list(record_times)) == (2, [2])
+
+
+def test_write_retry_counts(tmp_path):
+    dataflow_log = tmp_path / "log_user_storage_df-01_3335.txt"
+    dataflow_log.write_text(
+        "2024-Oct-18 WARNING [dfmodules::DataStoreWrite] write of TriggerRecord 12 failed, retrying\n"
+        "2024-Oct-18 WARNING [dfmodules::DataStoreWrite] write of TriggerRecord 12 failed, retrying\n"
+        "2024-Oct-18 WARNING [dfmodules::InvalidDataReceived] unrelated\n"
+    )
+    readout_log = tmp_path / "log_user_storage_ru-01_3334.txt"
+    readout_log.write_text("2024-Oct-18 WARNING retry of a readout request\n")
+    assert storage_benchmark.write_retry_counts([dataflow_log, readout_log]) == {"df-01": 2}
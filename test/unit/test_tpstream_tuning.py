@@ -0,0 +1,45 @@
+import daqsystemtest.tpstream_tuning as tpstream_tuning
+import scan_helpers
+
+
+def test_substitution_reports_tardy_tps():
+    parameters = tpstream_tuning.tuning_parameters([62500000], [4.0])["interval62500000_inactivity4.0s"]
+    updates = tpstream_tuning.substitutions(parameters)[0]["updates"]
+    assert updates["tp_accumulation_inactivity_time_before_write_sec"] == 4.0
+    # the tardy-TP warnings are what the scan counts
+    assert updates["warn_user_when_tardy_tps_are_discarded"] is True
+
+
+def tp_writer_entry(measurement, second, data):
+    return scan_helpers.opmon_entry(measurement, "tp-stream-writer", ["tpswriter"], second, data)
+
+
+def test_tp_counts(tmp_path):
+    opmon_file = scan_helpers.write_opmon_file(
+        tmp_path / "info_tptuning.json",
+        [
+            tp_writer_entry("dfmodules.opmon.TPStreamWriterInfo", 1, {"tps_received": 100, "tps_written": 100}),
+            tp_writer_entry("dfmodules.opmon.TPStreamWriterInfo", 2, {"tps_received": 50, "tps_written": 40}),
+            tp_writer_entry("dfmodules.opmon.OtherInfo", 2, {"tps_received": 1000, "tps_written": 0}),
+        ],
+    )
+    assert tpstream_tuning.tp_counts([opmon_file]) == (150, 140)
+
+
+def test_tp_counts_not_published(tmp_path):
+    opmon_file = scan_helpers.write_opmon_file(
+        tmp_path / "info_tptuning.json",
+        [tp_writer_entry("dfmodules.opmon.TPStreamWriterInfo", 1, {"bytes_output": 10})],
+    )
+    assert tpstream_tuning.tp_counts([opmon_file]) == (None, None)
+
+
+def test_tardy_tp_warnings(tmp_path):
+    log_file = tmp_path / "log_user_tptuning_tp-stream-writer_3336.txt"
+    log_file.write_text(
+        "2024-Oct-18 WARNING [dfmodules::TardyTPsDiscarded] Tardy TPs from SourceIDs [100] were discarded\n"
+        "2024-Oct-18 WARNING [dfmodules::TardyTPsDiscarded] Tardy TPs from SourceIDs [101] were discarded\n"
+        "2024-Oct-18 WARNING [dfmodules::InvalidDataReceived] unrelated\n"
+        "2024-Oct-18 INFO tardy but not a problem\n"
+    )
+    assert tpstream_tuning.tardy_tp_warnings([log_file]) == 2
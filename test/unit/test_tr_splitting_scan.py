@@ -0,0 +1,46 @@
+import daqsystemtest.tr_splitting_scan as tr_splitting_scan
+import scan_helpers
+
+
+def test_point_result():
+    run_metrics = {"record_count": 12, "trigger_count": 4, "bytes_per_second": 2 * 1024 * 1024}
+    process_statistics = {"df-01": {"max_rss_bytes": 300}, "df-02": {"max_rss_bytes": 500}, "ru-01": {"max_rss_bytes": 900}}
+    build_latency = {"p50_interval_max_ms": 40.0, "max_ms": 120.0}
+    point = tr_splitting_scan.point_result({"max_time_window": 500000}, run_metrics, build_latency, process_statistics, True)
+    assert point["sequences_per_trigger"] == 3.0
+    assert point["build_latency_max_ms"] == 120.0
+    assert point["mb_per_second"] == 2.0
+    assert point["dataflow_max_rss_bytes"] == 500
+
+
+def splits(rows):
+    "results from rows of (max_time_window, MB/s, dataflow RSS, build latency in ms, data files passed)"
+    return scan_helpers.scan_results(
+        ("max_time_window", "mb_per_second", "dataflow_max_rss_bytes", "build_latency_p50_interval_max_ms", "data_files_passed"),
+        rows,
+    )
+
+
+def test_best_split_keeps_the_throughput():
+    results = splits(
+        [
+            (0, 10.0, 900, None, True),
+            (50000000, 9.9, 400, None, True),
+            (500000, 8.0, 100, None, True),  # less memory, but too slow
+            (2000000, 10.0, 50, None, False),
+        ]
+    )
+    assert tr_splitting_scan.best_split(results)["max_time_window"] == 50000000
+    assert tr_splitting_scan.best_split(splits([(0, 10.0, None, None, True)])) is None
+
+
+def test_best_split_keeps_the_build_latency():
+    results = splits(
+        [
+            (0, 10.0, 900, 2000.0, True),
+            (50000000, 10.0, 400, 500.0, True),  # less memory, but much slower to build
+            (500000, 10.0, 600, 100.0, True),
+            (2000000, 10.0, 700, 110.0, True),
+        ]
+    )
+    assert tr_splitting_scan.best_split(results)["max_time_window"] == 500000